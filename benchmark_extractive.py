@@ -0,0 +1,87 @@
+import sys
+import time
+import argparse
+
+from mst.config import LLMConfig, TopicConfig
+from mst.steps.caching import get_cache_backend
+from mst.steps.topic_segmentation import (
+    EXTENSION_TOPICS,
+    _generate_topic_outputs,
+    _group_sentences_by_topic,
+)
+from mst.steps.extractive import select_central_sentences
+from mst.steps.tokens import get_token_counter
+
+"""
+Compares topic summarization on the full topic text against extractively
+condensed text, using the cached topics of an already processed video.
+"""
+
+
+def run_summaries(video_path, texts, topic_config, llm_config):
+    start = time.perf_counter()
+    summaries = _generate_topic_outputs(
+        video_path,
+        texts,
+        topic_config.summary_prompt,
+        topic_config.topic_model,
+        llm_config,
+        topic_config.max_concurrency,
+    )
+    return summaries, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extractive pre-compression of topic summaries.")
+
+    # Add arguments
+    parser.add_argument("video_path", type=str, help="Path to a video with a cached topic segmentation")
+    parser.add_argument('--token-budget', type=int, default=TopicConfig().extractive_token_budget,
+                      help='Token budget of the condensed text of each topic')
+    parser.add_argument('--tokenizer', type=str, default=None,
+                      help='Tokenizer used to count tokens, defaults to the character estimate')
+    parser.add_argument('--skip-llm', action='store_true',
+                      help='Only report the token reduction, without calling the LLM')
+
+    # Parse arguments
+    args = parser.parse_args()
+
+    topics = get_cache_backend().load(args.video_path, EXTENSION_TOPICS)
+    if topics is None:
+        print(f"Error: No cached topics for {args.video_path}, run the topics step first")
+        sys.exit(1)
+
+    topic_config = TopicConfig(extractive_token_budget=args.token_budget, tokenizer=args.tokenizer)
+    llm_config = LLMConfig()
+    count_tokens = get_token_counter(topic_config.tokenizer)
+
+    grouped_sentences = _group_sentences_by_topic(topics)
+    full_texts = [" ".join(sentences) for sentences in grouped_sentences]
+
+    start = time.perf_counter()
+    condensed_texts = [
+        select_central_sentences(
+            sentences, topic_config.extractive_token_budget, count_tokens, topic_config.extractive_model
+        )
+        for sentences in grouped_sentences
+    ]
+    selection_time = time.perf_counter() - start
+
+    full_tokens = sum(count_tokens(text) for text in full_texts)
+    condensed_tokens = sum(count_tokens(text) for text in condensed_texts)
+    print(f"Topics: {len(full_texts)}")
+    print(f"Input tokens: full {full_tokens}, extractive {condensed_tokens} "
+          f"({1 - condensed_tokens / max(full_tokens, 1):.1%} reduction)")
+    print(f"Sentence selection: {selection_time:.2f}s")
+
+    if args.skip_llm:
+        return
+
+    _, full_time = run_summaries(args.video_path, full_texts, topic_config, llm_config)
+    _, condensed_time = run_summaries(args.video_path, condensed_texts, topic_config, llm_config)
+    print(f"Summary latency: full {full_time:.2f}s, extractive {condensed_time + selection_time:.2f}s "
+          f"(including selection)")
+
+
+if __name__ == "__main__":
+    main()
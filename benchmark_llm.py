@@ -0,0 +1,123 @@
+import os
+import time
+import tempfile
+import argparse
+
+from mst.config import LLMConfig, TopicConfig
+from mst.steps.entities import merge_similar_texts
+from mst.steps.llm_client import get_llm_client
+from mst.steps.llm_stub import LLMStubServer
+from mst.steps.topic_segmentation import prepare_and_generate_headlines, prepare_and_generate_summary
+
+"""
+Benchmarks the LLM-bound pipeline steps offline against the local LLM stub server.
+
+Each scenario starts its own stub server, so the pooled client, scheduler
+and counters of one scenario never leak into the next.
+"""
+
+
+def synthetic_transcript(topics, sentences_per_topic=20):
+    transcript = []
+    for topic in range(topics):
+        for i in range(sentences_per_topic):
+            start = float(len(transcript))
+            transcript.append({
+                "start": start,
+                "end": start + 1.0,
+                "transcript": f"Topic {topic} discussion point {i} about the town budget and zoning.",
+                "topic": topic,
+            })
+    return transcript
+
+
+def synthetic_persons(count):
+    names = []
+    for i in range(count):
+        names.append({"text": f"Person {i}", "score": 0.9})
+        names.append({"text": f"Persen {i}", "score": 0.7})
+    return {"Person": names}
+
+
+def llm_config_for(server, **kwargs):
+    return LLMConfig(openai_base_url=server.openai_base_url, **kwargs)
+
+
+def run_topic_steps(transcript, topic_config, llm_config):
+    start = time.perf_counter()
+    prepare_and_generate_headlines(None, transcript, config=topic_config, llm_config=llm_config)
+    prepare_and_generate_summary(None, transcript, config=topic_config, llm_config=llm_config)
+    return time.perf_counter() - start
+
+
+def bench_concurrency(args, transcript):
+    print("== Concurrency: headlines and summaries ==")
+    for max_concurrency in args.concurrency:
+        with LLMStubServer(latency=args.latency, tokens_per_second=args.tokens_per_second) as server:
+            llm_config = llm_config_for(server, scheduler_max_in_flight=max_concurrency)
+            elapsed = run_topic_steps(transcript, TopicConfig(max_concurrency=max_concurrency), llm_config)
+            print(f"max_concurrency={max_concurrency:>3}: {elapsed:6.2f}s, "
+                  f"{server.stats()['requests']} requests, peak in flight {server.stats()['max_in_flight']}")
+
+
+def bench_retries(args, transcript):
+    print(f"== Retries: {args.error_rate:.0%} injected errors ==")
+    with LLMStubServer(latency=args.latency, error_rate=args.error_rate, seed=args.seed) as server:
+        llm_config = llm_config_for(server, retry_backoff=0.05, max_retries=5)
+        elapsed = run_topic_steps(transcript, TopicConfig(), llm_config)
+        metrics = get_llm_client(llm_config).metrics.summary()
+        print(f"{elapsed:6.2f}s, {server.stats()['errors']} injected errors, "
+              f"{metrics['retries']} retries, {metrics['failures']} failed requests, "
+              f"p95 latency {metrics.get('p95_latency', 0):.2f}s")
+
+
+def bench_caching(args, transcript):
+    print("== Response cache: cold and warm runs ==")
+    with tempfile.TemporaryDirectory() as cache_dir, LLMStubServer(latency=args.latency) as server:
+        llm_config = llm_config_for(
+            server, response_cache=True, response_cache_path=os.path.join(cache_dir, "llm.sqlite")
+        )
+        cold = run_topic_steps(transcript, TopicConfig(), llm_config)
+        requests = server.stats()["requests"]
+        warm = run_topic_steps(transcript, TopicConfig(), llm_config)
+        stats = get_llm_client(llm_config).cache.stats()
+        print(f"cold {cold:6.2f}s ({requests} requests), warm {warm:6.2f}s "
+              f"({server.stats()['requests'] - requests} requests), hit rate {stats['hit_rate']:.0%}")
+
+
+def bench_entities(args):
+    print("== merge_similar_texts ==")
+    with LLMStubServer(latency=args.latency, tokens_per_second=args.tokens_per_second) as server:
+        # The first run includes creating the pooled client
+        for run in ("first", "warm"):
+            start = time.perf_counter()
+            merged = merge_similar_texts(synthetic_persons(args.persons), llm_config=llm_config_for(server))
+            print(f"{run}: {time.perf_counter() - start:6.2f}s, "
+                  f"{args.persons * 2} names merged into {len(merged['Person'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the LLM pipeline steps against a local stub server.")
+
+    # Add arguments
+    parser.add_argument('--topics', type=int, default=12, help='Number of synthetic topics')
+    parser.add_argument('--persons', type=int, default=20, help='Number of synthetic persons')
+    parser.add_argument('--latency', type=float, default=0.2, help='Stub latency per request in seconds')
+    parser.add_argument('--tokens-per-second', type=float, default=None, help='Stub generation speed')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8],
+                      help='Values of max_concurrency to compare')
+    parser.add_argument('--error-rate', type=float, default=0.2, help='Fraction of failing stub requests')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the injected errors')
+
+    # Parse arguments
+    args = parser.parse_args()
+
+    transcript = synthetic_transcript(args.topics)
+    bench_concurrency(args, transcript)
+    bench_retries(args, transcript)
+    bench_caching(args, transcript)
+    bench_entities(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import argparse
+
+import mst.steps  # noqa: F401 - registers the text artifact extensions
+from mst.config import CacheConfig
+from mst.steps.caching import cache_root_media_paths, configure_cache, create_cache_backend, migrate_cache_directory
+
+"""
+Converts `.d` cache directories of the file layout into a SQLite cache backend.
+
+With a cache root, the cache directories are named after the media digest,
+so the media files recorded in the root are migrated instead.
+"""
+
+
+def find_cache_directories(paths):
+    for path in paths:
+        if path.endswith('.d') and os.path.isdir(path):
+            yield path
+        elif os.path.isdir(path):
+            for root, dirs, _ in os.walk(path):
+                for name in sorted(dirs):
+                    if name.endswith('.d'):
+                        yield os.path.join(root, name)
+        else:
+            yield os.path.splitext(path)[0] + '.d'
+
+
+def find_cache_root_media(paths):
+    roots = [os.path.abspath(path) for path in paths]
+    for media_path in cache_root_media_paths():
+        if any(media_path == root or media_path.startswith(root + os.sep) for root in roots):
+            yield media_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate cached artifacts from .d directories to SQLite.")
+
+    # Add arguments
+    parser.add_argument("paths", nargs='+', help="Media files, .d directories or directories to search")
+    parser.add_argument('--sqlite-path', type=str, default=None,
+                      help='Single database for all videos, default one cache.sqlite per .d directory')
+    parser.add_argument('--cache-root', type=str, default=os.getenv("MST_CACHE_ROOT"),
+                      help='Shared cache root of the file layout, default $MST_CACHE_ROOT')
+    parser.add_argument('--serializer', choices=['orjson', 'msgpack', 'json'], default='json')
+    parser.add_argument('--compression', choices=['zstd'], default=None)
+    parser.add_argument('--remove', action='store_true', help='Delete the migrated files')
+
+    # Parse arguments
+    args = parser.parse_args()
+
+    # Both backends resolve videos through the cache root, as the pipeline does
+    configure_cache(CacheConfig(cache_root=args.cache_root))
+    target = create_cache_backend(CacheConfig(
+        backend="sqlite", sqlite_path=args.sqlite_path, serializer=args.serializer, compression=args.compression
+    ))
+    migrated = 0
+    if args.cache_root:
+        video_paths = find_cache_root_media(args.paths)
+    else:
+        video_paths = []
+        for cache_dir in find_cache_directories(args.paths):
+            if not os.path.isdir(cache_dir):
+                print(f"Error: {cache_dir} not found")
+                sys.exit(1)
+            # Without a cache root, any extension maps back to the same .d directory and media_id
+            video_paths.append(cache_dir[:-2] + '.media')
+    for video_path in video_paths:
+        artifacts = migrate_cache_directory(video_path, target, remove=args.remove)
+        print(f"{video_path}: migrated {', '.join(artifacts) or 'nothing'}")
+        migrated += len(artifacts)
+    print(f"Migrated {migrated} artifacts")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ environment variables as the previous per-module defaults.
 """
 
 import os
-from typing import Optional
+from typing import ClassVar, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -18,6 +18,40 @@ class LLMConfig(BaseModel):
     provider: str = "openai"
     openai_base_url: str = "http://glm-flash.cluster:9999/v1"
     openai_api_key: str = "not-needed"
+    ollama_host: Optional[str] = None
+    timeout: float = 120.0
+    max_retries: int = 3
+    retry_backoff: float = 1.0
+    retry_max_backoff: float = 30.0
+    max_connections: int = 16
+    async_max_concurrency: int = 8
+    priority: Literal["interactive", "batch"] = "interactive"
+    scheduler_max_in_flight: int = 8
+    scheduler_requests_per_second: Optional[float] = None
+    scheduler_tokens_per_second: Optional[float] = None
+    response_cache: bool = False
+    response_cache_path: str = "~/.cache/mst/llm_responses.sqlite"
+    response_cache_ttl: Optional[float] = None
+    response_cache_max_entries: int = 100000
+
+    # Fields that do not change what the model returns, left out of step cache keys
+    cache_exclude: ClassVar[frozenset[str]] = frozenset({
+        "openai_api_key",
+        "timeout",
+        "max_retries",
+        "retry_backoff",
+        "retry_max_backoff",
+        "max_connections",
+        "async_max_concurrency",
+        "priority",
+        "scheduler_max_in_flight",
+        "scheduler_requests_per_second",
+        "scheduler_tokens_per_second",
+        "response_cache",
+        "response_cache_path",
+        "response_cache_ttl",
+        "response_cache_max_entries",
+    })
 
 
 class TranscriptionConfig(BaseModel):
@@ -47,12 +81,24 @@ class StandardizeConfig(BaseModel):
     similarity_threshold: float = 0.85
 
 
+class EmbeddingConfig(BaseModel):
+    """Configuration for the shared embedding service."""
+
+    shared_model: Optional[str] = None
+    device: Optional[str] = None
+    max_batch_size: int = 64
+    max_wait_ms: float = 5.0
+    cache_size: int = 20000
+
+
 class DiarizationConfig(BaseModel):
     """Configuration for the speaker-diarization step."""
 
     diarization_model: str = "pyannote/speaker-diarization-3.1"
     hf_token: Optional[str] = None
 
+    cache_exclude: ClassVar[frozenset[str]] = frozenset({"hf_token"})
+
 
 class IntroductionsConfig(BaseModel):
     """Configuration for the speaker-introduction detection and mapping steps."""
@@ -60,12 +106,31 @@ class IntroductionsConfig(BaseModel):
     setfit_model: str = "gerald29/setfit-bge-small-v1.5-sst2-8-shot-introduction"
     speaker_map_margin: float = 1.0
     entity_map_margin: float = 0.5
+    batch_size: int = 64
+    candidate_filter: bool = True
+    # "I'm" or "this is" alone match most sentences, so they only count before a title
+    introduction_cues: list[str] = [
+        r"\bmy name is\b",
+        r"\bmy name's\b",
+        r"\b(?:i'm|i am|this is) (?:councilor|councillor|council member|commissioner|chair|chairman|chairwoman"
+        r"|mayor|selectman|selectwoman|select board member|superintendent|director|representative|senator)\b",
+        r"\bintroduce (?:myself|yourself|yourselves)\b",
+        r"\bon behalf of\b",
+    ]
+    first_turns_per_speaker: int = 2
+
+    cache_exclude: ClassVar[frozenset[str]] = frozenset({"batch_size"})
 
 
 class TopicConfig(BaseModel):
     """Configuration for the topic-segmentation step."""
 
     topic_model: str = "glm-4.7-flash"
+    topic_tree_depth: int = 32
+    local_embedding_model: Optional[str] = None
+    embedding_cache_dir: Optional[str] = "~/.cache/mst/embeddings"
+    embedding_batch_size: int = 64
+    max_concurrency: int = 4
     headline_prompt: str = (
         "You are a talented local reporter. You have been asked to provide a single"
         " descriptive headline to introduce the following section of a transcript from"
@@ -78,6 +143,85 @@ class TopicConfig(BaseModel):
         " transcript from a town meeting for the town audience. Just return your"
         " proposed summary with no explanation or justification for your choice."
     )
+    combined_generation: bool = False
+    combined_prompt: str = (
+        "You are a talented local reporter. For the following section of a transcript"
+        " from a town meeting, write a single descriptive headline to introduce it to"
+        " the town audience, and a one or two sentence max descriptive summary of it."
+        " Respond only with a JSON object with the keys \"headline\" and \"summary\"."
+    )
+    map_reduce_generation: bool = False
+    tokenizer: Optional[str] = None
+    context_limits: dict[str, int] = {}
+    default_context_limit: int = 8192
+    reserved_output_tokens: int = 512
+    chunk_prompt: str = (
+        "You are a talented local reporter. Summarize the key points of the following"
+        " part of a transcript from a town meeting in a few sentences. Only return the"
+        " summary with no explanation."
+    )
+    extractive_compression: bool = False
+    extractive_token_budget: int = 1024
+    extractive_model: str = "paraphrase-MiniLM-L6-v2"
+
+    cache_exclude: ClassVar[frozenset[str]] = frozenset({
+        "embedding_cache_dir",
+        "embedding_batch_size",
+        "max_concurrency",
+    })
+
+
+class CacheConfig(BaseModel):
+    """Configuration of the step artifact cache and which intermediates are written to it."""
+
+    write_merged: bool = False
+    write_compressed: bool = False
+    cache_root: Optional[str] = None
+    memory_cache_entries: int = 32
+    write_behind: bool = False
+    write_behind_queue: int = 8
+    backend: Literal["file", "sqlite"] = "file"
+    sqlite_path: Optional[str] = None
+    # None uses WAL only for per-video databases outside cache_root, which are never shared between hosts
+    sqlite_journal_mode: Optional[Literal["wal", "delete"]] = None
+    # orjson and msgpack need the optional `cache` extra
+    serializer: Literal["orjson", "msgpack", "json"] = "json"
+    compression: Optional[Literal["zstd"]] = None
+    compression_level: int = 3
+    lock_stale_after: float = 60.0
+    lock_poll_interval: float = 0.5
+    lock_timeout: Optional[float] = None
+    gc_max_bytes: Optional[int] = None
+    gc_ttl_days: Optional[float] = None
+    gc_keep: list[str] = [".final", ".md", ".manifest"]
+    # Evicted first to last: cheap intermediates before outputs of expensive models
+    gc_eviction_order: list[str] = [
+        ".merged",
+        ".compressed",
+        ".formatted",
+        ".sentence_merge",
+        ".corrected_transcript",
+        ".topic_tree",
+        ".topics",
+        ".speaker_map",
+        ".introductions",
+        ".topic_headlines",
+        ".topic_summary",
+        ".topic_outputs",
+        ".entities",
+        ".diarization",
+        ".raw_transcript",
+    ]
+
+
+class SchedulerConfig(BaseModel):
+    """Configuration of the scheduler running independent pipeline steps concurrently."""
+
+    max_workers: int = 4
+    # Steps running at once per resource tag; unlisted tags are not limited
+    resource_limits: dict[str, int] = {"cpu": 2, "llm": 4}
+    # Steps with any of these tags run in worker processes instead of threads
+    process_resources: list[str] = []
 
 
 class TranscriberConfig(BaseModel):
@@ -91,6 +235,9 @@ class TranscriberConfig(BaseModel):
     diarization: DiarizationConfig = Field(default_factory=DiarizationConfig)
     introductions: IntroductionsConfig = Field(default_factory=IntroductionsConfig)
     topic: TopicConfig = Field(default_factory=TopicConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    embeddings: EmbeddingConfig = Field(default_factory=EmbeddingConfig)
+    scheduler: SchedulerConfig = Field(default_factory=SchedulerConfig)
 
     @classmethod
     def from_env(cls) -> "TranscriberConfig":
@@ -105,6 +252,7 @@ class TranscriberConfig(BaseModel):
           - HF_TOKEN           (default: None)
           - SIMILAR_NAMES_MODEL (default: "glm-4.7-flash")
           - TOPIC_MODEL        (default: "glm-4.7-flash")
+          - MST_CACHE_ROOT     (default: None)
         """
         llm = LLMConfig(
             provider=os.getenv("LLM_PROVIDER", "openai"),
@@ -122,9 +270,13 @@ class TranscriberConfig(BaseModel):
         topic = TopicConfig(
             topic_model=os.getenv("TOPIC_MODEL", "glm-4.7-flash"),
         )
+        cache = CacheConfig(
+            cache_root=os.environ.get("MST_CACHE_ROOT"),
+        )
         return cls(
             llm=llm,
             diarization=diarization,
             entities=entities,
             topic=topic,
+            cache=cache,
         )
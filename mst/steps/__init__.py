@@ -7,8 +7,9 @@ from .entities import extract_nouns, extract_persons
 from .introductions import find_introductions,  create_speaker_map
 from .standardize import correct_transcript
 from .transcription import initial_transcription
-from .helpers import merge_transcript_diarization, compress_transcript, map_speakers
+from .helpers import merge_transcript_diarization, compress_transcript, map_speakers, post_process_transcript
+from .transcript import Transcript
 from .format import format_transcript, format_markdown
 from .merge_sentences import merge_transcript_segments
-from .topic_segmentation import segment_topics, prepare_and_generate_headlines, prepare_and_generate_summary, EXTENSION_TOPICS
+from .topic_segmentation import segment_topics, prepare_and_generate_headlines, prepare_and_generate_summary, prepare_and_generate_headlines_and_summary, EXTENSION_TOPICS
 from .format import EXTENSION_MARKDOWN
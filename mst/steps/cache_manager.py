@@ -0,0 +1,299 @@
+import argparse
+import os
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .caching import ArtifactLock, SQLITE_FILE
+from ..config import CacheConfig
+
+"""
+Size and age bounded garbage collection of cached artifacts across videos.
+"""
+
+# Leftover temporary files of interrupted writers
+EXTENSION_TEMPORARY = '.tmp'
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+class CacheEntry(NamedTuple):
+    """One cached artifact file."""
+
+    path: str
+    cache_dir: str
+    file_ext: str
+    size: int
+    accessed: float
+
+
+def parse_size(text: str) -> int:
+    """
+    Parses a size such as "500M" or "2.5G" into bytes.
+
+    Args:
+        text (str): Number with an optional K, M, G or T suffix.
+
+    Returns:
+        int: Size in bytes.
+    """
+    match = re.fullmatch(r'\s*([\d.]+)\s*([KMGT]?)(?:i?B)?\s*', text, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {text}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+def format_size(size: int) -> str:
+    """Formats a byte count with a binary unit."""
+    for unit in ("B", "K", "M", "G"):
+        if abs(size) < 1024:
+            return f"{size:.1f}{unit}" if unit != "B" else f"{size}B"
+        size /= 1024
+    return f"{size:.1f}T"
+
+
+class CacheManager:
+    """
+    Evicts cached artifacts across videos by age, size budget and artifact class.
+
+    Scans the `.d` cache directories under `roots`. Artifacts whose extension
+    is in `keep` are never evicted. Artifacts unused for `ttl_days` are
+    evicted. While the total size exceeds `max_bytes`, artifacts are evicted
+    by class in `eviction_order` (cheap intermediates first, unlisted classes
+    last) and least recently used first within a class. Leftover temporary
+    files are always reclaimed.
+
+    Directories holding a live lock, i.e. a job writing to them, are skipped,
+    and each artifact is removed under its own lock, so in-flight jobs are
+    never touched.
+    """
+
+    def __init__(
+        self,
+        roots: Iterable[str],
+        max_bytes: Optional[int] = None,
+        ttl_days: Optional[float] = None,
+        keep: Iterable[str] = (".final", ".md", ".manifest"),
+        eviction_order: Iterable[str] = (),
+        stale_after: float = 60.0,
+    ):
+        self.roots = list(roots)
+        self.max_bytes = max_bytes
+        self.ttl_days = ttl_days
+        self.keep = set(keep)
+        self.eviction_order = list(eviction_order)
+        self.stale_after = stale_after
+
+    @classmethod
+    def from_config(cls, roots: Iterable[str], config: Optional[CacheConfig] = None) -> "CacheManager":
+        """
+        Creates a cache manager with the eviction rules of `config`.
+
+        Args:
+            roots (Iterable[str]): Directories to scan for `.d` cache directories.
+            config: CacheConfig instance. If None, uses defaults.
+
+        Returns:
+            CacheManager: The cache manager.
+        """
+        if config is None:
+            config = CacheConfig()
+        return cls(
+            roots,
+            max_bytes=config.gc_max_bytes,
+            ttl_days=config.gc_ttl_days,
+            keep=config.gc_keep,
+            eviction_order=config.gc_eviction_order,
+            stale_after=config.lock_stale_after,
+        )
+
+    def cache_directories(self) -> Iterator[str]:
+        """Yields the `.d` cache directories under the roots."""
+        for root in self.roots:
+            if root.rstrip(os.sep).endswith('.d'):
+                yield root
+                continue
+            for parent, dirs, _ in os.walk(root):
+                for name in sorted(dirs):
+                    if name.endswith('.d'):
+                        yield os.path.join(parent, name)
+                # Cache directories hold no nested caches
+                dirs[:] = [name for name in dirs if not name.endswith('.d')]
+
+    def _in_flight(self, cache_dir: str, names: List[str]) -> bool:
+        for name in names:
+            if name.endswith('.lock'):
+                lock_file = os.path.join(cache_dir, name)
+                if not ArtifactLock(lock_file, stale_after=self.stale_after).is_stale(lock_file):
+                    return True
+        return False
+
+    def scan(self) -> Tuple[List[CacheEntry], List[str]]:
+        """
+        Lists the cached artifacts.
+
+        Returns:
+            tuple: The artifacts of idle directories and the directories skipped as in flight.
+        """
+        entries, in_flight = [], []
+        for cache_dir in self.cache_directories():
+            names = os.listdir(cache_dir)
+            if self._in_flight(cache_dir, names):
+                in_flight.append(cache_dir)
+                continue
+            for name in names:
+                if not name.startswith('cache.') or name.endswith('.lock') or name.startswith(SQLITE_FILE):
+                    continue
+                file_ext = EXTENSION_TEMPORARY if name.endswith('.tmp') else name[len('cache'):]
+                path = os.path.join(cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append(CacheEntry(path, cache_dir, file_ext, stat.st_size, max(stat.st_atime, stat.st_mtime)))
+        return entries, in_flight
+
+    def _rank(self, file_ext: str) -> int:
+        if file_ext in self.eviction_order:
+            return self.eviction_order.index(file_ext)
+        return len(self.eviction_order)
+
+    def plan(self, entries: List[CacheEntry], now: Optional[float] = None) -> List[CacheEntry]:
+        """
+        Chooses the artifacts to evict.
+
+        Args:
+            entries (List[CacheEntry]): Artifacts from `scan`.
+            now (float, optional): Current time, for testing.
+
+        Returns:
+            List[CacheEntry]: Artifacts to evict, in eviction order.
+        """
+        now = time.time() if now is None else now
+        evict = []
+        candidates = []
+        for entry in entries:
+            if entry.file_ext == EXTENSION_TEMPORARY:
+                # Temporary files younger than a lock may still be written
+                if now - entry.accessed > self.stale_after:
+                    evict.append(entry)
+            elif entry.file_ext in self.keep:
+                continue
+            elif self.ttl_days is not None and now - entry.accessed > self.ttl_days * 86400:
+                evict.append(entry)
+            else:
+                candidates.append(entry)
+
+        if self.max_bytes is not None:
+            total = sum(entry.size for entry in entries) - sum(entry.size for entry in evict)
+            for entry in sorted(candidates, key=lambda entry: (self._rank(entry.file_ext), entry.accessed)):
+                if total <= self.max_bytes:
+                    break
+                evict.append(entry)
+                total -= entry.size
+        return evict
+
+    def report(self) -> dict:
+        """
+        Scans the cache and plans the evictions without removing anything.
+
+        Returns:
+            dict: Directory and artifact counts, total and reclaimable bytes,
+                  reclaimable bytes per artifact class, in-flight directories
+                  and the planned evictions.
+        """
+        entries, in_flight = self.scan()
+        evict = self.plan(entries)
+        by_class: Dict[str, int] = {}
+        for entry in evict:
+            by_class[entry.file_ext] = by_class.get(entry.file_ext, 0) + entry.size
+        return {
+            "directories": len({entry.cache_dir for entry in entries}),
+            "entries": len(entries),
+            "total_bytes": sum(entry.size for entry in entries),
+            "reclaimable_bytes": sum(entry.size for entry in evict),
+            "reclaimable_by_class": by_class,
+            "in_flight": in_flight,
+            "evict": evict,
+        }
+
+    def _remove(self, entry: CacheEntry) -> bool:
+        if entry.file_ext == EXTENSION_TEMPORARY:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                return False
+            return True
+        # Skip the artifact if a job started writing it since the scan
+        lock = ArtifactLock(entry.path + '.lock', stale_after=self.stale_after, timeout=0)
+        try:
+            lock.acquire()
+        except TimeoutError:
+            return False
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            return False
+        finally:
+            lock.release()
+        return True
+
+    def collect(self, dry_run: bool = False) -> dict:
+        """
+        Evicts the planned artifacts.
+
+        Args:
+            dry_run (bool): Only report what would be evicted.
+
+        Returns:
+            dict: The `report`, with the number of evicted artifacts and freed bytes.
+        """
+        report = self.report()
+        evicted, freed = 0, 0
+        if not dry_run:
+            for entry in report["evict"]:
+                if self._remove(entry):
+                    evicted += 1
+                    freed += entry.size
+        report.update(evicted=evicted, freed_bytes=freed)
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the cache of transcription artifacts.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    defaults = CacheConfig()
+    gc = commands.add_parser("gc", help="Report reclaimable space and evict cached artifacts")
+    gc.add_argument("roots", nargs='+', help="Cache roots or directories holding .d cache directories")
+    gc.add_argument('--max-size', type=parse_size, default=defaults.gc_max_bytes,
+                    help='Size budget of the cache, e.g. 200G')
+    gc.add_argument('--ttl-days', type=float, default=defaults.gc_ttl_days,
+                    help='Evict artifacts unused for this many days')
+    gc.add_argument('--keep', nargs='*', default=defaults.gc_keep, help='Artifact classes never evicted')
+    gc.add_argument('--dry-run', action='store_true', help='Only report reclaimable space')
+    args = parser.parse_args()
+
+    manager = CacheManager(
+        args.roots,
+        max_bytes=args.max_size,
+        ttl_days=args.ttl_days,
+        keep=args.keep,
+        eviction_order=defaults.gc_eviction_order,
+        stale_after=defaults.lock_stale_after,
+    )
+    report = manager.collect(dry_run=args.dry_run)
+    print(f"{report['entries']} artifacts in {report['directories']} directories, "
+          f"{format_size(report['total_bytes'])} in total")
+    for file_ext, size in sorted(report["reclaimable_by_class"].items(), key=lambda item: -item[1]):
+        print(f"  {file_ext:<24} {format_size(size):>10} reclaimable")
+    if report["in_flight"]:
+        print(f"Skipped {len(report['in_flight'])} directories with jobs in flight")
+    if args.dry_run:
+        print(f"{format_size(report['reclaimable_bytes'])} reclaimable")
+    else:
+        print(f"Evicted {report['evicted']} artifacts, freed {format_size(report['freed_bytes'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,81 @@
 import os
 import json
+import atexit
+import hashlib
+import inspect
+import functools
+import queue
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import contextlib
+from collections import OrderedDict
 import shutil # Added for robust directory clearing, though os.remove could also be used for files
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from ..config import CacheConfig
+
+# Bump to invalidate every cached artifact after a change of the cache format
+CACHE_VERSION = 1
+
+EXTENSION_MANIFEST = '.manifest'
+
+SQLITE_FILE = 'cache.sqlite'
+
+_media_digests = {}
+
+# In-process locks, so threads wait on each other without polling the lock files
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_lock = threading.Lock()
+
+# Extensions of artifacts cached as text by `cached_file`
+_text_extensions = set()
+
+_cache_backend: Optional["CacheBackend"] = None
+_cache_backend_lock = threading.Lock()
+
+# Shared artifact store keyed by media content, see `configure_cache`
+_cache_root: Optional[str] = None
+
+# Marks a cache miss, so that empty results and None can be cached
+_MISSING = object()
+
+# In-process tier in front of the backend, keyed on (video path, extension, artifact key)
+_memory_cache: "OrderedDict[tuple, object]" = OrderedDict()
+_memory_cache_size = 32
+_memory_cache_lock = threading.Lock()
+
+# Background writer of the write-behind mode, None to write synchronously
+_cache_writer: Optional["WriteBehindWriter"] = None
 
 def get_cache_directory(video_path):
+    """
+    Returns the cache directory of a video, creating it if needed.
+
+    By default it is `<basename>.d` next to the media file. With a cache root
+    configured, it is `<root>/media/<sha256 of the media>.d`, so every copy of
+    the same recording shares one directory. Paths that do not exist are
+    stored under `<root>/paths`, keyed by the path.
+
+    Args:
+        video_path (str): Path to the video file.
+
+    Returns:
+        str: Path of the cache directory.
+    """
     base_name, _ = os.path.splitext(video_path)
-    cache_dir = base_name + '.d'
+    if _cache_root:
+        digest = media_digest(video_path)
+        if digest:
+            cache_dir = os.path.join(_cache_root, 'media', digest[:2], digest + '.d')
+        else:
+            path_hash = hashlib.sha256(os.path.abspath(base_name).encode('utf-8')).hexdigest()
+            cache_dir = os.path.join(_cache_root, 'paths', path_hash[:2], path_hash + '.d')
+    else:
+        cache_dir = base_name + '.d'
     os.makedirs(cache_dir, exist_ok=True)
     return cache_dir # Added return statement
 
@@ -38,86 +109,1231 @@ def clear_cache_directory(video_path: str):
         print(f"Cache directory {cache_dir} does not exist or is not a directory.")
 
 
-def load_text_file(cache_file: str): 
+def _json_default(value):
+    if isinstance(value, type) and hasattr(value, 'model_json_schema'):
+        # Pydantic classes, such as a structured response format, hash by their schema
+        return value.model_json_schema()
+    if hasattr(value, 'model_dump'):
+        # Configs list their operational fields (timeouts, concurrency, ...) in `cache_exclude`
+        return value.model_dump(mode='json', exclude=set(getattr(value, 'cache_exclude', ())))
+    if hasattr(value, 'to_records'):
+        return value.to_records()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    # A repr may hold a memory address, which would change the key on every run
+    raise TypeError(f"Cannot hash {type(value).__name__} by content; "
+                    "pass the argument in `ignore` if it does not affect the output")
+
+
+def hash_value(value) -> str:
+    """
+    Hashes a step input or output by content.
+
+    Pydantic configs, transcripts and arrays are hashed through their JSON
+    form, so a `Transcript` and the equivalent list of dicts hash the same.
+    Pydantic classes are hashed through their JSON schema.
+    Config fields named in the model's `cache_exclude` are left out.
+
+    Args:
+        value: Any step input or output.
+
+    Returns:
+        str: Hex SHA-256 digest of the value.
+
+    Raises:
+        TypeError: If the value holds an object with no content-based JSON form.
+    """
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=_json_default)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def media_digest(video_path: str):
+    """
+    Returns the SHA-256 of the media file, or None if it does not exist.
+
+    The file is hashed in chunks, once per process for a given size and
+    modification time. The digest is kept so later runs do not hash it
+    again: in the path alias under the cache root when one is configured,
+    otherwise in the manifest.
+
+    Args:
+        video_path (str): Path to the video or audio file.
+
+    Returns:
+        str | None: Hex digest of the file content.
+    """
+    if not video_path or not os.path.isfile(video_path):
+        return None
+    stat = os.stat(video_path)
+    signature = [stat.st_size, stat.st_mtime_ns]
+    path = os.path.abspath(video_path)
+    if _media_digests.get(path, (None, None))[0] == signature:
+        return _media_digests[path][1]
+    if _cache_root:
+        media = load_object_file(_alias_file(path), quiet=True) or {}
+    else:
+        media = load_manifest(video_path).get('media') or {}
+    digest = media.get('sha256') if media.get('signature') == signature else None
+    if digest is None:
+        print(f"Hashing {video_path}")
+        sha = hashlib.sha256()
+        with open(video_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        media = {'path': path, 'signature': signature, 'sha256': digest}
+        if _cache_root:
+            save_object_file(_alias_file(path), media)
+        else:
+            with get_cache_backend().lock(video_path, EXTENSION_MANIFEST):
+                manifest = load_manifest(video_path)
+                manifest['media'] = media
+                _save_manifest(video_path, manifest)
+    _media_digests[path] = (signature, digest)
+    return digest
+
+
+def _alias_file(path: str) -> str:
+    """Returns the alias recording which media digest the absolute `path` holds."""
+    path_hash = hashlib.sha256(path.encode('utf-8')).hexdigest()
+    alias_dir = os.path.join(_cache_root, 'aliases', path_hash[:2])
+    os.makedirs(alias_dir, exist_ok=True)
+    return os.path.join(alias_dir, path_hash + '.json')
+
+
+def media_id(video_path: str) -> str:
+    """
+    Identifies the video in stores shared by many videos.
+
+    Args:
+        video_path (str): Path to the video file.
+
+    Returns:
+        str: `sha256:<digest>` of the media content when a cache root is
+             configured and the file exists, otherwise the absolute path
+             without its extension.
+    """
+    digest = media_digest(video_path) if _cache_root else None
+    if digest:
+        return 'sha256:' + digest
+    return os.path.abspath(os.path.splitext(video_path)[0])
+
+
+def cache_root_media_paths() -> List[str]:
+    """
+    Returns the media files whose artifacts are stored under the cache root.
+
+    The paths come from the aliases recorded when the media were hashed.
+    Copies of the same recording share one cache directory, so only the
+    first existing path in sort order is returned per media digest.
+
+    Returns:
+        List[str]: Absolute media paths, empty without a cache root.
+    """
+    if not _cache_root:
+        return []
+    paths = {}
+    for directory, _, filenames in os.walk(os.path.join(_cache_root, 'aliases')):
+        for filename in sorted(filenames):
+            media = load_object_file(os.path.join(directory, filename), quiet=True) or {}
+            if media.get('sha256') and os.path.isfile(media.get('path', '')):
+                paths[media['sha256']] = min(paths.get(media['sha256'], media['path']), media['path'])
+    return sorted(paths.values())
+
+
+def load_manifest(video_path: str) -> dict:
+    """
+    Loads the manifest recording how each cached artifact of a video was computed.
+
+    Args:
+        video_path (str): Path to the video file.
+
+    Returns:
+        dict: `media` holds the media digest and `artifacts` maps each cache
+              extension to the key of its inputs and the hash of its output.
+    """
+    manifest = get_cache_backend().load(video_path, EXTENSION_MANIFEST, quiet=True) or {}
+    manifest.setdefault('artifacts', {})
+    return manifest
+
+
+def _save_manifest(video_path: str, manifest: dict):
+    get_cache_backend().save(video_path, EXTENSION_MANIFEST, manifest)
+
+
+def record_artifact(video_path: str, file_ext: str, key: str, output_hash: str) -> bool:
+    """
+    Records the key and output hash of a freshly computed artifact.
+
+    Args:
+        video_path (str): Path to the video file.
+        file_ext (str): Cache extension of the artifact.
+        key (str): Key from `artifact_key`.
+        output_hash (str): Hash of the artifact content.
+
+    Returns:
+        bool: True if the output differs from the previously recorded one.
+    """
+    with get_cache_backend().lock(video_path, EXTENSION_MANIFEST):
+        manifest = load_manifest(video_path)
+        previous = manifest['artifacts'].get(file_ext, {}).get('output')
+        manifest['artifacts'][file_ext] = {'key': key, 'output': output_hash}
+        _save_manifest(video_path, manifest)
+    return previous != output_hash
+
+
+class ArtifactHash(str):
+    """Recorded hash of an upstream artifact, standing in for its content in `artifact_key`."""
+
+
+class CacheInfo(NamedTuple):
+    """How a decorated step caches its output, exposed as its `cache_info` attribute."""
+
+    file_ext: str
+    version: object
+    ignore: tuple
+    decode: Optional[Callable]
+    text: bool
+    encode: Optional[Callable] = None
+
+
+def artifact_key(video_path: str, file_ext: str, inputs: dict, version=None) -> str:
+    """
+    Derives the cache key of a step from everything its output depends on.
+
+    Args:
+        video_path (str): Path to the video file, whose content is hashed.
+        file_ext (str): Cache extension identifying the step.
+        inputs (dict): Step arguments, including configs and upstream artifacts.
+                       `ArtifactHash` values are used as the hash of the argument.
+        version: Version of the step code, bumped when its output changes.
+
+    Returns:
+        str: Hex SHA-256 digest identifying the step's output.
+    """
+    return hash_value({
+        'step': file_ext,
+        'version': [CACHE_VERSION, version],
+        'media': media_digest(video_path),
+        'inputs': {
+            name: value if isinstance(value, ArtifactHash) else hash_value(value)
+            for name, value in inputs.items()
+        },
+    })
+
+
+def step_key(step, video_path: str, **kwargs) -> str:
+    """
+    Derives the key a decorated step would use, without its upstream artifacts.
+
+    Args:
+        step: Function decorated with `cached_file` or `cached_file_object`.
+        video_path (str): Path to the video file.
+        **kwargs: Step arguments. Upstream artifacts are passed as the
+                  `ArtifactHash` recorded for them in the manifest.
+
+    Returns:
+        str: The step's cache key.
+    """
+    info = step.cache_info
+    inputs = _step_inputs(inspect.signature(step), video_path, (), kwargs, info.ignore)
+    return artifact_key(video_path, info.file_ext, inputs, info.version)
+
+
+def _step_inputs(signature, video_path, args, kwargs, ignore) -> dict:
+    bound = signature.bind(video_path, *args, **kwargs)
+    bound.apply_defaults()
+    inputs = dict(list(bound.arguments.items())[1:])
+    for name in ignore:
+        inputs.pop(name, None)
+    return inputs
+
+
+def _lookup(backend: "CacheBackend", video_path: str, file_ext: str, key: str) -> bool:
+    """Returns True if the backend holds the output for `key`."""
+    if not backend.exists(video_path, file_ext):
+        return False
+    recorded = load_manifest(video_path)['artifacts'].get(file_ext)
+    # Artifacts cached before manifests existed record no inputs, so they are recomputed
+    if recorded is None or recorded['key'] != key:
+        return False
+    # Marks the artifact as recently used for the cache manager
+    backend.touch(video_path, file_ext)
+    return True
+
+
+def _load_cached(backend: "CacheBackend", video_path: str, file_ext: str, key: str, load):
+    """Returns the stored output for `key`, or `_MISSING`."""
+    writer = _cache_writer
+    if writer is not None:
+        pending = writer.pending(video_path, file_ext, key)
+        if pending is not _MISSING:
+            return pending
+    if not _lookup(backend, video_path, file_ext, key):
+        return _MISSING
+    return load(video_path, file_ext, default=_MISSING)
+
+
+def load_step_output(step, video_path: str, key: str):
+    """
+    Loads the output a decorated step cached under `key`.
+
+    Unlike calling the step, this needs none of its upstream artifacts.
+
+    Args:
+        step: Function decorated with `cached_file` or `cached_file_object`.
+        video_path (str): Path to the video file.
+        key (str): Key from `step_key`.
+
+    Returns:
+        The cached output, decoded like the step returns it.
+
+    Raises:
+        KeyError: If no output is cached under `key`.
+    """
+    info = step.cache_info
+    memory_key = (os.path.abspath(video_path), info.file_ext, key)
+    result = _memory_get(memory_key)
+    if result is not _MISSING:
+        return result
+    backend = get_cache_backend()
+    saved = _load_cached(backend, video_path, info.file_ext, key, backend.load_text if info.text else backend.load)
+    if saved is _MISSING:
+        raise KeyError(f"{info.file_ext} of {video_path} is not cached under {key}")
+    return _memory_put(memory_key, info.decode(saved) if info.decode else saved)
+
+
+def save_step_output(step, video_path: str, result, **kwargs):
+    """
+    Stores `result` as the output of a decorated step called with `kwargs`.
+
+    Lets a fused step write the artifact of a step it replaces, locked and
+    recorded in the manifest as if that step had computed it, so calling
+    the step later is a cache hit.
+
+    Args:
+        step: Function decorated with `cached_file` or `cached_file_object`.
+        video_path (str): Path to the video file.
+        result: Output of the step, encoded like the step encodes it.
+        **kwargs: Step arguments, as for `step_key`.
+    """
+    info = step.cache_info
+    key = step_key(step, video_path, **kwargs)
+    backend = get_cache_backend()
+    saved = info.encode(result) if info.encode else result
+    with backend.lock(video_path, info.file_ext) as lock:
+        _persist(backend.save_text if info.text else backend.save, lock,
+                 video_path, info.file_ext, key, step.__name__, saved)
+    _memory_put((os.path.abspath(video_path), info.file_ext, key), result)
+
+
+def stream_step_output(step, video_path: str, items, **kwargs):
+    """
+    Passes items through and stores them as the list output of a decorated step.
+
+    Streaming form of `save_step_output` for steps returning a list, so the
+    list is never held in memory. The artifact stays locked until the items
+    are exhausted, and its output hash is computed as they pass.
+
+    Args:
+        step: Function decorated with `cached_file_object`, returning a list.
+        video_path (str): Path to the video file.
+        items (Iterable): JSON-serializable items of the list.
+        **kwargs: Step arguments, as for `step_key`.
+
+    Yields:
+        The items, unchanged.
+    """
+    info = step.cache_info
+    key = step_key(step, video_path, **kwargs)
+    backend = get_cache_backend()
+    # Hashes the list exactly as `hash_value` serializes it, item by item
+    digest = hashlib.sha256(b'[')
+
+    def hashed(items):
+        for i, item in enumerate(items):
+            payload = json.dumps(item, sort_keys=True, ensure_ascii=False, default=_json_default)
+            digest.update(((', ' if i else '') + payload).encode('utf-8'))
+            yield item
+
+    with backend.lock(video_path, info.file_ext):
+        yield from backend.stream(video_path, info.file_ext, hashed(items))
+        digest.update(b']')
+        if not record_artifact(video_path, info.file_ext, key, digest.hexdigest()):
+            print(f"{step.__name__} reproduced its cached output")
+
+
+def _memory_get(memory_key: tuple):
+    with _memory_cache_lock:
+        if memory_key not in _memory_cache:
+            return _MISSING
+        _memory_cache.move_to_end(memory_key)
+        return _memory_cache[memory_key]
+
+
+def _memory_put(memory_key: tuple, result):
+    with _memory_cache_lock:
+        _memory_cache[memory_key] = result
+        _memory_cache.move_to_end(memory_key)
+        while len(_memory_cache) > _memory_cache_size:
+            _memory_cache.popitem(last=False)
+    return result
+
+
+def clear_memory_cache(video_path: Optional[str] = None):
+    """
+    Drops results held in memory by the caching decorators.
+
+    Args:
+        video_path (str, optional): Only drop the results of this video.
+    """
+    with _memory_cache_lock:
+        if video_path is None:
+            _memory_cache.clear()
+            return
+        path = os.path.abspath(video_path)
+        for memory_key in [memory_key for memory_key in _memory_cache if memory_key[0] == path]:
+            del _memory_cache[memory_key]
+
+
+def _record(video_path: str, file_ext: str, key: str, func_name: str, result):
+    if not record_artifact(video_path, file_ext, key, hash_value(result)):
+        # Downstream keys hash this content, so they still match
+        print(f"{func_name} reproduced its cached output")
+
+
+def _persist(save, lock: Optional["ArtifactLock"], video_path: str, file_ext: str, key: str, func_name: str, saved):
+    """Stores and records an artifact, in the background when write-behind is enabled."""
+    def write():
+        save(video_path, file_ext, saved)
+        _record(video_path, file_ext, key, func_name, saved)
+
+    writer = _cache_writer
+    if writer is None:
+        write()
+    else:
+        # The writer releases the lock once the artifact is stored
+        writer.submit(video_path, file_ext, key, saved, write, lock.hand_off())
+
+
+class WriteBehindWriter:
+    """
+    Stores artifacts from a background thread while the pipeline continues.
+
+    Each artifact is queued with the lock taken while it was computed, and
+    the writer releases the lock once the artifact and its manifest entry
+    are stored, so other workers wait for the write instead of computing
+    the artifact again. Until then, readers in this process are served the
+    queued value. Backend writes are atomic, so an artifact never becomes
+    visible half-written. When `max_pending` artifacts are queued, the next
+    step blocks until the writer catches up.
+
+    Failed writes are printed as they happen and raised by `flush`.
+
+    Args:
+        max_pending (int): Maximum number of queued artifacts.
+    """
+
+    def __init__(self, max_pending: int = 8):
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_pending)
+        self._pending: Dict[tuple, object] = {}
+        self._failures: List[str] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, video_path: str, file_ext: str, key: str, value, write, lock: Optional["ArtifactLock"] = None):
+        """
+        Queues an artifact to be written.
+
+        Args:
+            video_path (str): Path to the video file.
+            file_ext (str): Cache extension of the artifact.
+            key (str): Key of the artifact.
+            value: Stored value, served to readers until it is written.
+            write (callable): Stores the artifact.
+            lock (ArtifactLock, optional): Held lock, released once written.
+        """
+        with self._lock:
+            self._pending[(os.path.abspath(video_path), file_ext, key)] = value
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="cache-writer", daemon=True)
+                self._thread.start()
+                # Writes still queued at exit are not lost
+                atexit.register(self.flush, False)
+        self._queue.put((video_path, file_ext, key, write, lock))
+
+    def pending(self, video_path: str, file_ext: str, key: str):
+        """Returns the queued value of the artifact, or `_MISSING`."""
+        with self._lock:
+            return self._pending.get((os.path.abspath(video_path), file_ext, key), _MISSING)
+
+    def _run(self):
+        while True:
+            video_path, file_ext, key, write, lock = self._queue.get()
+            try:
+                write()
+            except Exception as e:
+                print(f"Failed to write cached {file_ext} of {video_path}: {e}")
+                with self._lock:
+                    self._failures.append(f"{file_ext} of {video_path}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.pop((os.path.abspath(video_path), file_ext, key), None)
+                if lock is not None:
+                    lock.release()
+                self._queue.task_done()
+
+    def flush(self, raise_errors: bool = True):
+        """
+        Waits until every queued artifact is written.
+
+        Args:
+            raise_errors (bool): Raise if writes failed since the last flush.
+
+        Raises:
+            RuntimeError: If writes failed since the last flush.
+        """
+        self._queue.join()
+        with self._lock:
+            failures, self._failures = self._failures, []
+        if failures and raise_errors:
+            raise RuntimeError(f"Failed to write {len(failures)} cached artifacts: {'; '.join(failures)}")
+
+
+def flush_cache_writes():
+    """
+    Waits until the artifacts queued in write-behind mode are stored.
+
+    Raises:
+        RuntimeError: If writes failed since the last flush.
+    """
+    writer = _cache_writer
+    if writer is not None:
+        writer.flush()
+
+
+class ArtifactLock:
+    """
+    Advisory lock on one cached artifact, shared by threads and processes.
+
+    The lock is a file created with O_EXCL, which is atomic on local
+    filesystems and NFS. It records the owner's host and pid and its
+    modification time is refreshed by a heartbeat thread while held. A lock
+    whose owner died on this host, or whose heartbeat is older than
+    `stale_after` seconds, is broken by the next worker waiting for it.
+
+    Args:
+        lock_file (str): Path of the lock file.
+        stale_after (float): Seconds without heartbeat after which the lock is stale.
+        poll_interval (float): Seconds between attempts while another process holds the lock.
+        timeout (float, optional): Seconds to wait before raising TimeoutError.
+    """
+
+    def __init__(self, lock_file: str, stale_after: float = 60.0, poll_interval: float = 0.5,
+                 timeout: Optional[float] = None):
+        self.lock_file = lock_file
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._owner = {'host': socket.gethostname(), 'pid': os.getpid(), 'token': uuid.uuid4().hex}
+        self._stop = threading.Event()
+        self._heartbeat = None
+        self._handed_off = False
+        with _thread_locks_lock:
+            self._thread_lock = _thread_locks.setdefault(os.path.abspath(lock_file), threading.Lock())
+
+    def _try_create(self) -> bool:
+        try:
+            fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w') as file:
+            json.dump(self._owner, file)
+        return True
+
+    def is_stale(self, lock_file: str) -> bool:
+        """Returns True if the owner of `lock_file` died or stopped refreshing it."""
+        try:
+            age = time.time() - os.stat(lock_file).st_mtime
+            with open(lock_file, 'r', encoding='utf-8') as file:
+                owner = json.load(file)
+        except FileNotFoundError:
+            return False
+        except ValueError:
+            # A lock file being written; judge it by age only
+            return age > self.stale_after
+        if age > self.stale_after:
+            return True
+        if owner.get('host') == self._owner['host']:
+            try:
+                os.kill(owner.get('pid'), 0)
+            except ProcessLookupError:
+                return True
+            except (PermissionError, TypeError):
+                pass
+        return False
+
+    def _break_stale(self):
+        """Moves a stale lock out of the way, restoring it if it turned out to be fresh."""
+        tomb = f"{self.lock_file}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.rename(self.lock_file, tomb)
+        except FileNotFoundError:
+            return
+        if not self.is_stale(tomb):
+            # Another worker replaced the stale lock in the meantime
+            with contextlib.suppress(OSError):
+                os.link(tomb, self.lock_file)
+        else:
+            print(f"Breaking stale cache lock {self.lock_file}")
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tomb)
+
+    def _beat(self):
+        while not self._stop.wait(self.stale_after / 3):
+            with contextlib.suppress(OSError):
+                os.utime(self.lock_file)
+
+    def acquire(self):
+        """Blocks until the lock is held."""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        if not self._thread_lock.acquire(timeout=-1 if deadline is None else self.timeout):
+            raise TimeoutError(f"Timed out waiting for {self.lock_file}")
+        try:
+            waiting = False
+            while not self._try_create():
+                if self.is_stale(self.lock_file):
+                    self._break_stale()
+                    continue
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for {self.lock_file}")
+                if not waiting:
+                    print(f"Waiting for another worker holding {self.lock_file}")
+                    waiting = True
+                time.sleep(self.poll_interval)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._beat, name="cache-lock-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def release(self):
+        """Releases the lock."""
+        self._stop.set()
+        self._heartbeat.join()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.lock_file)
+        self._thread_lock.release()
+
+    def hand_off(self) -> "ArtifactLock":
+        """
+        Keeps the lock held past the end of the `with` block.
+
+        Returns:
+            ArtifactLock: The lock, to be released by its new owner, from any thread.
+        """
+        self._handed_off = True
+        return self
+
+    def __enter__(self) -> "ArtifactLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        if self._handed_off:
+            self._handed_off = False
+            return
+        self.release()
+
+
+def _atomic_write(cache_file: str, write, mode: str = 'w'):
+    """Writes a file through a temporary file renamed into place, so readers never see it half written."""
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(cache_file), prefix=os.path.basename(cache_file) + '.',
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, **({'encoding': 'utf-8'} if 'b' not in mode else {})) as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_file, cache_file)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_file)
+        raise
+
+
+def load_text_file(cache_file: str, default=None):
     # Try to load from cache if it exists
-    if os.path.exists(cache_file):
-        print(f"Loading cached data from {cache_file}")
+    try:
         with open(cache_file, 'r', encoding='utf-8') as file:
+            print(f"Loading cached data from {cache_file}")
             return file.read()
-    else:
-        return None
+    except FileNotFoundError:
+        return default
 
         
-def cached_file(file_ext):
+def cached_file(file_ext, version=None, ignore=()):
     """
     A decorator that caches the output of a function to a file.
 
+    The cached text is reused only when the key derived from the media
+    content, the arguments and `version` matches the one in the manifest.
+    Empty texts are cached like any other. Recent texts are also kept in
+    the in-process LRU tier.
+
     Args:
         file_ext (str): The file extension used for the cache file.
+        version (optional): Version of the step code; change it to invalidate cached outputs.
+        ignore (Iterable[str], optional): Arguments that do not affect the output.
 
     Returns:
         function: A decorator that applies the caching behavior.
     """
+    _text_extensions.add(file_ext)
+
     def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
         def wrapper(video_path, *args, **kwargs):
             if video_path:
-                cache_file = get_cache_file(video_path, file_ext)                            
-                result = load_text_file(cache_file)
-                if result:
-                    return result
+                backend = get_cache_backend()
+                key = artifact_key(video_path, file_ext, _step_inputs(signature, video_path, args, kwargs, ignore), version)
+                memory_key = (os.path.abspath(video_path), file_ext, key)
+                result = _memory_get(memory_key)
+                if result is _MISSING:
+                    result = _load_cached(backend, video_path, file_ext, key, backend.load_text)
+                if result is not _MISSING:
+                    return _memory_put(memory_key, result)
 
-            # Compute the result since cache doesn't exist
-            result = func(video_path, *args, **kwargs)
+            # One worker computes the artifact while the others wait for it
+            with backend.lock(video_path, file_ext) if video_path else contextlib.nullcontext() as lock:
+                if video_path:
+                    result = _load_cached(backend, video_path, file_ext, key, backend.load_text)
+                    if result is not _MISSING:
+                        return _memory_put(memory_key, result)
 
-            if not result:  # Check for failure
-                print(f"Error in computing {func.__name__}")
-                return f"{func.__name__} failed"
+                # Compute the result since cache doesn't exist
+                result = func(video_path, *args, **kwargs)
 
-            # Save to cache
-            if video_path:
-                with open(cache_file, 'w', encoding='utf-8') as file:
-                    file.write(result)
+                # Save to cache, empty texts included
+                if video_path:
+                    _persist(backend.save_text, lock, video_path, file_ext, key, func.__name__, result)
+                    _memory_put(memory_key, result)
 
             return result
 
+        wrapper.cache_info = CacheInfo(file_ext, version, tuple(ignore), None, True)
         return wrapper
     return decorator
 
 
-def load_object_file(cache_file: str): 
+def load_object_file(cache_file: str, quiet: bool = False, default=None):
     # Try to load from cache if it exists
-    if os.path.exists(cache_file):
-        print(f"Loading cached data from {cache_file}")
+    try:
         with open(cache_file, 'r', encoding='utf-8') as file:
+            if not quiet:
+                print(f"Loading cached data from {cache_file}")
             return json.load(file)
-    else:
-        return None
+    except FileNotFoundError:
+        return default
 
 
-def cached_file_object(file_ext):
+def stream_object_file(cache_file: str, items):
+    """
+    Passes items through while writing them to cache_file as a JSON list.
+
+    The list is written to a temporary file, unique to the writer, and renamed
+    into place once the stream is exhausted, so a partially consumed stream
+    never leaves a truncated cache file behind.
+
+    Args:
+        cache_file (str): Path of the cache file to write.
+        items (Iterable): JSON-serializable items.
+
+    Yields:
+        The items, unchanged.
+    """
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(cache_file), prefix=os.path.basename(cache_file) + '.',
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write('[')
+            for i, item in enumerate(items):
+                file.write(',\n' if i else '\n')
+                json.dump(item, file, ensure_ascii=False)
+                yield item
+            file.write('\n]')
+        os.replace(tmp_file, cache_file)
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_file)
+
+
+def save_object_file(cache_file: str, result):
+    _atomic_write(cache_file, lambda file: json.dump(result, file, ensure_ascii=False, indent=4))
+
+
+def cached_file_object(file_ext, encode=None, decode=None, version=None, ignore=()):
     """
     A decorator that caches the output of a function returning a JSON-serializable object to a file.
+
+    The cache key hashes the media content, every argument except `video_path`
+    (configs and upstream artifacts included) and `version`, and is recorded
+    in the video's manifest. A step reruns only when its key changes. When an
+    upstream step reruns but reproduces the same output, the keys of the
+    steps consuming it are unchanged, so they are not rerun. The artifact is
+    locked while it is computed, so concurrent workers wait and reuse it.
+
+    Empty results such as `[]`, `{}` or None are cached like any other.
+    Recent results are also kept in a bounded in-process LRU tier, so
+    repeated calls skip reading and parsing the cache file. Results served
+    from it are shared between callers and must not be modified. With
+    `CacheConfig.write_behind`, the result is stored by a background writer
+    while the pipeline continues; see `flush_cache_writes`.
+
     Args:
         file_ext (str): The file extension used for the cache file.
+        encode (callable, optional): Converts the result to a JSON-serializable object before saving.
+        decode (callable, optional): Converts the loaded JSON object back to the result type.
+        version (optional): Version of the step code; change it to invalidate cached outputs.
+        ignore (Iterable[str], optional): Arguments that do not affect the output.
     Returns:
         function: A decorator that applies the caching behavior.
     """
     def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
         def wrapper(video_path, *args, **kwargs):
             if video_path:
-                cache_file = get_cache_file(video_path, file_ext)            
-                result = load_object_file(cache_file)
-                if result:
+                backend = get_cache_backend()
+                key = artifact_key(video_path, file_ext, _step_inputs(signature, video_path, args, kwargs, ignore), version)
+                memory_key = (os.path.abspath(video_path), file_ext, key)
+                result = _memory_get(memory_key)
+                if result is not _MISSING:
                     return result
+                saved = _load_cached(backend, video_path, file_ext, key, backend.load)
+                if saved is not _MISSING:
+                    return _memory_put(memory_key, decode(saved) if decode else saved)
 
-            # Compute the result since cache doesn't exist
-            result = func(video_path, *args, **kwargs)
+            # One worker computes the artifact while the others wait for it
+            with backend.lock(video_path, file_ext) if video_path else contextlib.nullcontext() as lock:
+                if video_path:
+                    saved = _load_cached(backend, video_path, file_ext, key, backend.load)
+                    if saved is not _MISSING:
+                        return _memory_put(memory_key, decode(saved) if decode else saved)
 
-            # Save to cache
-            if video_path:
-                with open(cache_file, 'w', encoding='utf-8') as file:
-                    json.dump(result, file, ensure_ascii=False, indent=4)
+                # Compute the result since cache doesn't exist
+                result = func(video_path, *args, **kwargs)
+
+                # Save to cache, empty results included
+                if video_path:
+                    saved = encode(result) if encode else result
+                    _persist(backend.save, lock, video_path, file_ext, key, func.__name__, saved)
+                    _memory_put(memory_key, result)
 
             return result
+
+        wrapper.cache_info = CacheInfo(file_ext, version, tuple(ignore), decode, False, encode)
         return wrapper
     return decorator
+
+
+class CacheBackend:
+    """
+    Storage of the cached artifacts of each video, addressed by cache extension.
+
+    Artifacts are either JSON-serializable objects or text, such as the
+    formatted transcript and the Markdown. `lock` returns an `ArtifactLock`
+    configured with `lock_options`.
+    """
+
+    lock_options: dict = {}
+
+    def lock_file(self, video_path: str, file_ext: str) -> str:
+        """Returns the path of the lock file guarding the artifact."""
+        return get_cache_file(video_path, file_ext) + '.lock'
+
+    def lock(self, video_path: str, file_ext: str) -> ArtifactLock:
+        """Returns an advisory lock on the artifact, used as a context manager."""
+        return ArtifactLock(self.lock_file(video_path, file_ext), **self.lock_options)
+
+    def load(self, video_path: str, file_ext: str, quiet: bool = False, default=None):
+        """Returns the cached object, or `default` if it is missing."""
+        raise NotImplementedError
+
+    def save(self, video_path: str, file_ext: str, value):
+        """Stores a JSON-serializable object."""
+        raise NotImplementedError
+
+    def load_text(self, video_path: str, file_ext: str, default=None) -> Optional[str]:
+        """Returns the cached artifact as text (objects as JSON), or `default` if it is missing."""
+        raise NotImplementedError
+
+    def save_text(self, video_path: str, file_ext: str, text: str):
+        """Stores a text artifact."""
+        raise NotImplementedError
+
+    def exists(self, video_path: str, file_ext: str) -> bool:
+        """Returns True if the artifact is cached."""
+        raise NotImplementedError
+
+    def delete(self, video_path: str, file_ext: str):
+        """Removes the artifact if it is cached."""
+        raise NotImplementedError
+
+    def touch(self, video_path: str, file_ext: str):
+        """Records that the artifact was just used."""
+
+    def list(self, video_path: str) -> List[str]:
+        """Returns the extensions of the cached artifacts of the video."""
+        raise NotImplementedError
+
+    def clear(self, video_path: str):
+        """Removes every cached artifact of the video."""
+        for file_ext in self.list(video_path):
+            self.delete(video_path, file_ext)
+
+    def stream(self, video_path: str, file_ext: str, items):
+        """
+        Passes items through and stores them as a list once the stream is exhausted.
+
+        Args:
+            video_path (str): Path to the video file.
+            file_ext (str): Cache extension of the artifact.
+            items (Iterable): JSON-serializable items.
+
+        Yields:
+            The items, unchanged.
+        """
+        stored = []
+        for item in items:
+            stored.append(item)
+            yield item
+        self.save(video_path, file_ext, stored)
+
+
+class FileCacheBackend(CacheBackend):
+    """
+    Stores each artifact as `cache<ext>` in the `.d` directory next to the video.
+
+    Objects are written as indented JSON and text as is, so the files can be
+    read directly.
+    """
+
+    def load(self, video_path: str, file_ext: str, quiet: bool = False, default=None):
+        return load_object_file(get_cache_file(video_path, file_ext), quiet=quiet, default=default)
+
+    def save(self, video_path: str, file_ext: str, value):
+        save_object_file(get_cache_file(video_path, file_ext), value)
+
+    def load_text(self, video_path: str, file_ext: str, default=None) -> Optional[str]:
+        return load_text_file(get_cache_file(video_path, file_ext), default=default)
+
+    def save_text(self, video_path: str, file_ext: str, text: str):
+        _atomic_write(get_cache_file(video_path, file_ext), lambda file: file.write(text))
+
+    def exists(self, video_path: str, file_ext: str) -> bool:
+        return os.path.exists(get_cache_file(video_path, file_ext))
+
+    def delete(self, video_path: str, file_ext: str):
+        cache_file = get_cache_file(video_path, file_ext)
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
+
+    def touch(self, video_path: str, file_ext: str):
+        with contextlib.suppress(OSError):
+            os.utime(get_cache_file(video_path, file_ext))
+
+    def list(self, video_path: str) -> List[str]:
+        return sorted(
+            filename[len('cache'):]
+            for filename in os.listdir(get_cache_directory(video_path))
+            if filename.startswith('cache.') and not filename.endswith(('.tmp', '.lock'))
+            and not filename.startswith(SQLITE_FILE)
+        )
+
+    def clear(self, video_path: str):
+        clear_cache_directory(video_path)
+
+    def stream(self, video_path: str, file_ext: str, items):
+        return stream_object_file(get_cache_file(video_path, file_ext), items)
+
+
+def _serializer(name: str):
+    """Returns the (dumps, loads) pair of a binary serializer."""
+    if name == 'orjson':
+        import orjson
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        return (lambda value: orjson.dumps(value, option=options)), orjson.loads
+    if name == 'msgpack':
+        import msgpack
+        return (lambda value: msgpack.packb(value, use_bin_type=True)), (lambda data: msgpack.unpackb(data, raw=False))
+    if name == 'json':
+        return (lambda value: json.dumps(value, ensure_ascii=False).encode('utf-8')), json.loads
+    raise ValueError(f"Unknown cache serializer: {name}")
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Stores artifacts as binary blobs in a single SQLite file.
+
+    With `path` unset, each video gets its own `cache.sqlite` in its `.d`
+    directory. With `path` set, one database holds the artifacts of a whole
+    corpus, keyed by `media_id`. Objects are
+    serialized with json, or orjson or msgpack from the `cache` extra, and
+    optionally compressed with zstd. The format is stored with every row, so artifacts written with
+    other settings stay readable.
+
+    WAL lets readers proceed while a step writes, but it relies on shared
+    memory that network filesystems do not provide. It is therefore only
+    used for per-video databases outside a cache root; a corpus database or
+    one under `cache_root`, which several hosts may open, keeps SQLite's
+    rollback journal unless `journal_mode` says otherwise.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        serializer: str = 'json',
+        compression: Optional[str] = None,
+        compression_level: int = 3,
+        journal_mode: Optional[str] = None,
+    ):
+        self.path = os.path.expanduser(path) if path else None
+        self.serializer = serializer
+        self.compression = compression
+        self.compression_level = compression_level
+        self.journal_mode = journal_mode
+        self._dumps, _ = _serializer(serializer)
+        self._connections: Dict[str, sqlite3.Connection] = {}
+        self._lock = threading.Lock()
+        if compression not in (None, 'zstd'):
+            raise ValueError(f"Unknown cache compression: {compression}")
+        if journal_mode not in (None, 'wal', 'delete'):
+            raise ValueError(f"Unknown SQLite journal mode: {journal_mode}")
+
+    def _database(self, video_path: str):
+        """Returns the connection and row key for the video."""
+        if self.path:
+            path, video = self.path, media_id(video_path)
+        else:
+            path, video = os.path.join(get_cache_directory(video_path), SQLITE_FILE), ''
+        with self._lock:
+            if path not in self._connections:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+                journal_mode = self.journal_mode or ('delete' if self.path or _cache_root else 'wal')
+                connection.execute(f"PRAGMA journal_mode={journal_mode}")
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS artifacts ("
+                    " video TEXT NOT NULL,"
+                    " ext TEXT NOT NULL,"
+                    " kind TEXT NOT NULL,"
+                    " format TEXT NOT NULL,"
+                    " value BLOB NOT NULL,"
+                    " updated REAL NOT NULL,"
+                    " PRIMARY KEY (video, ext))"
+                )
+                self._connections[path] = connection
+            return self._connections[path], video
+
+    def lock_file(self, video_path: str, file_ext: str) -> str:
+        if not self.path:
+            return super().lock_file(video_path, file_ext)
+        lock_dir = self.path + '.locks'
+        os.makedirs(lock_dir, exist_ok=True)
+        video = media_id(video_path)
+        return os.path.join(lock_dir, hashlib.sha256(f"{video}{file_ext}".encode('utf-8')).hexdigest() + '.lock')
+
+    def _encode(self, data: bytes) -> tuple:
+        if self.compression == 'zstd':
+            import zstandard
+            return zstandard.ZstdCompressor(level=self.compression_level).compress(data), '+zstd'
+        return data, ''
+
+    @staticmethod
+    def _decode(data: bytes, fmt: str) -> bytes:
+        if fmt.endswith('+zstd'):
+            import zstandard
+            return zstandard.ZstdDecompressor().decompress(data)
+        return data
+
+    def _put(self, video_path: str, file_ext: str, kind: str, data: bytes, fmt: str):
+        data, suffix = self._encode(data)
+        connection, video = self._database(video_path)
+        with self._lock:
+            connection.execute(
+                "INSERT OR REPLACE INTO artifacts (video, ext, kind, format, value, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (video, file_ext, kind, fmt + suffix, data, time.time()),
+            )
+
+    def _get(self, video_path: str, file_ext: str):
+        connection, video = self._database(video_path)
+        with self._lock:
+            row = connection.execute(
+                "SELECT kind, format, value FROM artifacts WHERE video = ? AND ext = ?", (video, file_ext)
+            ).fetchone()
+        if row is None:
+            return None
+        kind, fmt, data = row
+        data = self._decode(data, fmt)
+        if kind == 'text':
+            return kind, data.decode('utf-8')
+        return kind, _serializer(fmt.split('+')[0])[1](data)
+
+    def load(self, video_path: str, file_ext: str, quiet: bool = False, default=None):
+        row = self._get(video_path, file_ext)
+        if row is None:
+            return default
+        if not quiet:
+            print(f"Loading cached {file_ext} of {video_path}")
+        return row[1]
+
+    def save(self, video_path: str, file_ext: str, value):
+        self._put(video_path, file_ext, 'object', self._dumps(value), self.serializer)
+
+    def load_text(self, video_path: str, file_ext: str, default=None) -> Optional[str]:
+        row = self._get(video_path, file_ext)
+        if row is None:
+            return default
+        kind, value = row
+        return value if kind == 'text' else json.dumps(value, ensure_ascii=False, indent=4)
+
+    def save_text(self, video_path: str, file_ext: str, text: str):
+        self._put(video_path, file_ext, 'text', text.encode('utf-8'), 'text')
+
+    def exists(self, video_path: str, file_ext: str) -> bool:
+        connection, video = self._database(video_path)
+        with self._lock:
+            return connection.execute(
+                "SELECT 1 FROM artifacts WHERE video = ? AND ext = ?", (video, file_ext)
+            ).fetchone() is not None
+
+    def delete(self, video_path: str, file_ext: str):
+        connection, video = self._database(video_path)
+        with self._lock:
+            connection.execute("DELETE FROM artifacts WHERE video = ? AND ext = ?", (video, file_ext))
+
+    def touch(self, video_path: str, file_ext: str):
+        connection, video = self._database(video_path)
+        with self._lock:
+            connection.execute(
+                "UPDATE artifacts SET updated = ? WHERE video = ? AND ext = ?", (time.time(), video, file_ext)
+            )
+
+    def list(self, video_path: str) -> List[str]:
+        connection, video = self._database(video_path)
+        with self._lock:
+            rows = connection.execute("SELECT ext FROM artifacts WHERE video = ? ORDER BY ext", (video,)).fetchall()
+        return [row[0] for row in rows]
+
+
+def create_cache_backend(config: Optional[CacheConfig] = None) -> CacheBackend:
+    """
+    Creates the cache backend selected by `config`.
+
+    Args:
+        config: CacheConfig instance. If None, uses defaults.
+
+    Returns:
+        CacheBackend: A file or SQLite backend.
+    """
+    if config is None:
+        config = CacheConfig()
+    if config.backend == 'sqlite':
+        backend = SQLiteCacheBackend(
+            path=config.sqlite_path,
+            serializer=config.serializer,
+            compression=config.compression,
+            compression_level=config.compression_level,
+            journal_mode=config.sqlite_journal_mode,
+        )
+    else:
+        backend = FileCacheBackend()
+    backend.lock_options = {
+        'stale_after': config.lock_stale_after,
+        'poll_interval': config.lock_poll_interval,
+        'timeout': config.lock_timeout,
+    }
+    return backend
+
+
+def configure_cache(config: Optional[CacheConfig] = None) -> CacheBackend:
+    """
+    Selects the backend, cache root and write mode used by the caching decorators.
+
+    Args:
+        config: CacheConfig instance. If None, uses defaults.
+
+    Returns:
+        CacheBackend: The configured backend.
+    """
+    global _cache_backend, _cache_root, _memory_cache_size, _cache_writer
+    if config is None:
+        config = CacheConfig()
+    backend = create_cache_backend(config)
+    if _cache_writer is not None:
+        # Queued artifacts are written where they were computed for; failures were printed
+        _cache_writer.flush(raise_errors=False)
+    with _cache_backend_lock:
+        _cache_backend = backend
+        _cache_writer = WriteBehindWriter(config.write_behind_queue) if config.write_behind else None
+        _cache_root = os.path.abspath(os.path.expanduser(config.cache_root)) if config.cache_root else None
+    _memory_cache_size = config.memory_cache_entries
+    clear_memory_cache()
+    return backend
+
+
+def get_cache_backend() -> CacheBackend:
+    """
+    Gets the backend used by the caching decorators, by default the file layout.
+
+    Returns:
+        CacheBackend: The configured backend.
+    """
+    global _cache_backend
+    with _cache_backend_lock:
+        if _cache_backend is None:
+            _cache_backend = FileCacheBackend()
+        return _cache_backend
+
+
+def migrate_cache_directory(video_path: str, target: CacheBackend, source: Optional[CacheBackend] = None,
+                            remove: bool = False) -> List[str]:
+    """
+    Copies the cached artifacts of a video from one backend to another.
+
+    Artifacts written by `cached_file` are copied as text. Other artifacts are
+    copied as objects, falling back to text if they are not valid JSON.
+
+    Args:
+        video_path (str): Path to the video file.
+        target (CacheBackend): Backend to copy the artifacts to.
+        source (CacheBackend, optional): Backend to copy from, by default the file layout.
+        remove (bool): Whether to delete the artifacts from the source once copied.
+
+    Returns:
+        List[str]: Extensions of the migrated artifacts.
+    """
+    source = source or FileCacheBackend()
+    migrated = []
+    for file_ext in source.list(video_path):
+        text = None
+        if file_ext not in _text_extensions:
+            try:
+                target.save(video_path, file_ext, source.load(video_path, file_ext, quiet=True))
+            except ValueError:
+                text = source.load_text(video_path, file_ext)
+        else:
+            text = source.load_text(video_path, file_ext)
+        if text is not None:
+            target.save_text(video_path, file_ext, text)
+        migrated.append(file_ext)
+        if remove:
+            source.delete(video_path, file_ext)
+    return migrated
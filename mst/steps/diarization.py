@@ -1,19 +1,20 @@
-import torch
 import traceback
-from typing import Dict, Any, Optional
-from pyannote.audio import Pipeline
+from typing import TYPE_CHECKING, Dict, Any, Optional
 
 from .caching import cached_file_object
 from ..config import DiarizationConfig
 
+if TYPE_CHECKING:
+    from pyannote.audio import Pipeline
+
 """
 Module for speaker diarization using pyannote.audio.
 """
 
-_diarization_pipelines: Dict[str, Pipeline] = {}
+_diarization_pipelines: Dict[str, "Pipeline"] = {}
 
 
-def get_diarization_pipeline(config: Optional[DiarizationConfig] = None) -> Pipeline:
+def get_diarization_pipeline(config: Optional[DiarizationConfig] = None) -> "Pipeline":
     """
     Gets or initializes the pyannote diarization pipeline for the given model.
 
@@ -27,6 +28,9 @@ def get_diarization_pipeline(config: Optional[DiarizationConfig] = None) -> Pipe
         config = DiarizationConfig()
     model_name = config.diarization_model
     if model_name not in _diarization_pipelines:
+        import torch
+        from pyannote.audio import Pipeline
+
         pipeline = Pipeline.from_pretrained(
             model_name,
             token=config.hf_token,
@@ -36,10 +40,11 @@ def get_diarization_pipeline(config: Optional[DiarizationConfig] = None) -> Pipe
         _diarization_pipelines[model_name] = pipeline
     return _diarization_pipelines[model_name]
 
-@cached_file_object('.diarization')
+# Diarization only listens to the audio, so it does not wait for the transcript
+@cached_file_object('.diarization', ignore=('transcript',))
 def identify_speakers(
     video_path: str,
-    transcript: str,
+    transcript: Optional[str] = None,
     config: Optional[DiarizationConfig] = None,
 ) -> dict:
     """
@@ -50,7 +55,8 @@ def identify_speakers(
 
     Args:
         video_path (str): Path to the video or audio file.
-        transcript (str): The transcript to use for diarization.
+        transcript (str, optional): Unused; diarization depends on the audio only.
+        config: DiarizationConfig instance. If None, uses defaults.
 
     Returns:
         dict: Dictionary containing speaker segment information.
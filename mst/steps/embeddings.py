@@ -0,0 +1,248 @@
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+
+import numpy as np
+
+from ..config import EmbeddingConfig
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+"""
+Shared in-process embedding service used by standardization, introductions and topics.
+"""
+
+_embedding_service: Optional["EmbeddingService"] = None
+_embedding_service_lock = threading.Lock()
+
+
+class EmbeddingService:
+    """
+    Owns the sentence encoders of the pipeline and serves embeddings from them.
+
+    Each encoder is loaded once and shared by every step that asks for it.
+    Requests from concurrent callers are micro-batched into a single
+    `encode` call per model, and vectors are kept in a shared LRU cache keyed
+    on (model, text), so repeated texts are never encoded twice. When
+    `EmbeddingConfig.shared_model` is set, every model name resolves to that
+    model and a single encoder serves all steps. Pinned encoders, such as
+    the body of the SetFit introduction classifier whose head expects it,
+    keep serving their own name; set the shared model to the SetFit model
+    for a single encoder.
+    """
+
+    def __init__(self, config: Optional[EmbeddingConfig] = None):
+        self.config = config or EmbeddingConfig()
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self._encoders: Dict[str, "SentenceTransformer"] = {}
+        self._pinned: Set[str] = set()
+        self._cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._requests: "queue.Queue[tuple]" = queue.Queue()
+        self._waiting = 0
+        self._worker: Optional[threading.Thread] = None
+
+    def resolve(self, model_name: str) -> str:
+        """Returns the model that serves requests for `model_name`."""
+        if model_name in self._pinned:
+            return model_name
+        return self.config.shared_model or model_name
+
+    def get_encoder(self, model_name: str) -> "SentenceTransformer":
+        """
+        Gets or loads the encoder serving `model_name`.
+
+        Args:
+            model_name (str): Name of the SentenceTransformer model.
+
+        Returns:
+            SentenceTransformer: The shared encoder instance.
+        """
+        model_name = self.resolve(model_name)
+        with self._lock:
+            if model_name not in self._encoders:
+                from sentence_transformers import SentenceTransformer
+
+                self._encoders[model_name] = SentenceTransformer(model_name, device=self.config.device)
+            return self._encoders[model_name]
+
+    def register_encoder(
+        self, model_name: str, encoder: "SentenceTransformer", pinned: bool = False
+    ) -> "SentenceTransformer":
+        """
+        Registers an already loaded encoder, unless one is already owned for the model.
+
+        Args:
+            model_name (str): Name to register the encoder under.
+            encoder (SentenceTransformer): Loaded encoder, e.g. the body of a SetFit model.
+            pinned (bool): Serve `model_name` with this encoder even when a
+                shared model is configured, for encoders a trained head depends on.
+
+        Returns:
+            SentenceTransformer: The encoder the service uses for `model_name`.
+        """
+        with self._lock:
+            if pinned:
+                self._pinned.add(model_name)
+        model_name = self.resolve(model_name)
+        with self._lock:
+            return self._encoders.setdefault(model_name, encoder)
+
+    def encode(
+        self, texts: List[str], model_name: str, normalize: bool = False, batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Embeds `texts`, encoding only the texts missing from the shared cache.
+
+        Args:
+            texts (List[str]): Texts to embed.
+            model_name (str): Name of the SentenceTransformer model.
+            normalize (bool): Whether to scale the vectors to unit length.
+            batch_size (int, optional): Largest encoder batch for these texts.
+                Defaults to `EmbeddingConfig.max_batch_size`.
+
+        Returns:
+            np.ndarray: One embedding per text, in order.
+        """
+        model_name = self.resolve(model_name)
+        keys = [(model_name, text) for text in texts]
+        vectors = {}
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    vectors[key] = self._cache[key]
+            missing = list(dict.fromkeys(text for name, text in keys if (name, text) not in vectors))
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            future = Future()
+            with self._lock:
+                self._waiting += 1
+                self._start_worker()
+            self._requests.put((model_name, missing, future, batch_size))
+            for text, vector in zip(missing, future.result()):
+                vectors[(model_name, text)] = vector
+            self._store(model_name, missing, vectors)
+
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        result = np.stack([vectors[key] for key in keys])
+        if normalize:
+            result = result / np.linalg.norm(result, axis=1, keepdims=True)
+        return result
+
+    def embeddings_func(self, model_name: str):
+        """
+        Returns a TreeSeg embeddings function served by this service.
+
+        The function takes the list of texts first and ignores the endpoint
+        arguments TreeSeg passes to remote embedding functions.
+
+        Args:
+            model_name (str): Name of the SentenceTransformer model.
+
+        Returns:
+            callable: Function returning one embedding (as a list) per text.
+        """
+        def embed(chunk, *args, **kwargs):
+            if isinstance(chunk, str):
+                return self.encode([chunk], model_name)[0].tolist()
+            return self.encode(list(chunk), model_name).tolist()
+        return embed
+
+    def _store(self, model_name: str, texts: List[str], vectors: dict):
+        with self._lock:
+            for text in texts:
+                self._cache[(model_name, text)] = vectors[(model_name, text)]
+            while len(self._cache) > self.config.cache_size:
+                self._cache.popitem(last=False)
+
+    def _start_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="embedding-service", daemon=True)
+            self._worker.start()
+
+    def _collect(self) -> List[tuple]:
+        """Takes one request, then any others arriving while callers are still waiting."""
+        requests = [self._requests.get()]
+        size = len(requests[0][1])
+        while size < self.config.max_batch_size:
+            with self._lock:
+                others_waiting = self._waiting > len(requests)
+            try:
+                if others_waiting:
+                    request = self._requests.get(timeout=self.config.max_wait_ms / 1000)
+                else:
+                    request = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            requests.append(request)
+            size += len(request[1])
+        return requests
+
+    def _run(self):
+        while True:
+            requests = self._collect()
+            by_model: Dict[str, List[tuple]] = {}
+            for request in requests:
+                by_model.setdefault(request[0], []).append(request)
+            for model_name, model_requests in by_model.items():
+                texts = [text for _, batch, _, _ in model_requests for text in batch]
+                # Micro-batched requests are encoded with the smallest batch any of them asked for
+                batch_size = min(
+                    request_batch_size or self.config.max_batch_size
+                    for _, _, _, request_batch_size in model_requests
+                )
+                try:
+                    vectors = self.get_encoder(model_name).encode(
+                        texts, batch_size=batch_size, convert_to_numpy=True
+                    )
+                    self.batches += 1
+                except Exception as e:
+                    for _, _, future, _ in model_requests:
+                        future.set_exception(e)
+                    continue
+                start = 0
+                for _, batch, future, _ in model_requests:
+                    future.set_result(vectors[start:start + len(batch)])
+                    start += len(batch)
+            with self._lock:
+                self._waiting -= len(requests)
+
+
+def configure_embedding_service(config: Optional[EmbeddingConfig] = None) -> EmbeddingService:
+    """
+    Applies `config` to the shared embedding service.
+
+    Loaded encoders and cached vectors are kept, so reconfiguring is cheap.
+
+    Args:
+        config: EmbeddingConfig instance. If None, uses defaults.
+
+    Returns:
+        EmbeddingService: The shared embedding service.
+    """
+    service = get_embedding_service()
+    service.config = config or EmbeddingConfig()
+    return service
+
+
+def get_embedding_service() -> EmbeddingService:
+    """
+    Gets or initializes the embedding service shared by all pipeline steps.
+
+    Returns:
+        EmbeddingService: The shared embedding service.
+    """
+    global _embedding_service
+    with _embedding_service_lock:
+        if _embedding_service is None:
+            _embedding_service = EmbeddingService()
+    return _embedding_service
@@ -1,6 +1,5 @@
 import traceback
-from typing import List, Dict, Any, Optional
-from gliner import GLiNER
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 import math
 
 from .caching import cached_file_object
@@ -8,14 +7,17 @@ from .models import NounList
 from .llm_client import get_llm_client
 from ..config import EntityConfig, LLMConfig
 
+if TYPE_CHECKING:
+    from gliner import GLiNER
+
 """
 Handles Named Entity Recognition (NER) tasks for transcript processing.
 """
 
-_entity_models: Dict[str, GLiNER] = {}
+_entity_models: Dict[str, "GLiNER"] = {}
 
 
-def get_entity_model(model_name: str = "urchade/gliner_medium-v2.1") -> GLiNER:
+def get_entity_model(model_name: str = "urchade/gliner_medium-v2.1") -> "GLiNER":
     """
     Gets or initializes the GLiNER entity model for the given model name.
 
@@ -26,6 +28,8 @@ def get_entity_model(model_name: str = "urchade/gliner_medium-v2.1") -> GLiNER:
         GLiNER: The initialized GLiNER model instance.
     """
     if model_name not in _entity_models:
+        from gliner import GLiNER
+
         _entity_models[model_name] = GLiNER.from_pretrained(model_name)
     return _entity_models[model_name]
 
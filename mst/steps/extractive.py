@@ -0,0 +1,61 @@
+from typing import List
+
+from .embeddings import get_embedding_service
+from .tokens import TokenCounter, estimate_tokens
+
+"""
+Extractive condensation of topic text before LLM summarization.
+"""
+
+
+def score_sentence_centrality(sentences: List[str], model_name: str = "paraphrase-MiniLM-L6-v2") -> List[float]:
+    """
+    Scores each sentence by its cosine similarity to the topic centroid.
+
+    With normalized embeddings this ranks sentences the same way as their
+    summed similarity to every other sentence, at linear cost.
+
+    Args:
+        sentences (List[str]): Sentences of one topic.
+        model_name (str): SentenceTransformer model used for the embeddings.
+
+    Returns:
+        List[float]: One centrality score per sentence.
+    """
+    embeddings = get_embedding_service().encode(sentences, model_name, normalize=True)
+    return (embeddings @ embeddings.sum(axis=0)).tolist()
+
+
+def select_central_sentences(
+    sentences: List[str],
+    max_tokens: int,
+    count_tokens: TokenCounter = estimate_tokens,
+    model_name: str = "paraphrase-MiniLM-L6-v2",
+) -> str:
+    """
+    Keeps the most central sentences of a topic that fit in `max_tokens`.
+
+    Sentences are taken greedily by centrality and returned in their
+    original order. Text that already fits is returned unchanged.
+
+    Args:
+        sentences (List[str]): Sentences of one topic, in chronological order.
+        max_tokens (int): Token budget for the condensed text.
+        count_tokens (TokenCounter): Token counter for the sentences.
+        model_name (str): SentenceTransformer model used for the embeddings.
+
+    Returns:
+        str: The condensed topic text.
+    """
+    sentence_tokens = [count_tokens(sentence) for sentence in sentences]
+    if sum(sentence_tokens) <= max_tokens:
+        return " ".join(sentences)
+
+    scores = score_sentence_centrality(sentences, model_name)
+    selected = []
+    used_tokens = 0
+    for i in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+        if used_tokens + sentence_tokens[i] <= max_tokens:
+            selected.append(i)
+            used_tokens += sentence_tokens[i]
+    return " ".join(sentences[i] for i in sorted(selected))
@@ -1,12 +1,12 @@
 import os
 import json
-import torch
 import logging
 import traceback
 import re
 from typing import List, Dict, Any
 
 from .caching import cached_file, cached_file_object
+from .transcript import Transcript
 
 """
 Module for formatting transcript output in various formats.
@@ -15,28 +15,27 @@ Module for formatting transcript output in various formats.
 EXTENSION_MARKDOWN = '.md'
 
 @cached_file('.formatted')
-def format_transcript(video_path: str, transcripts: str) -> str:
+def format_transcript(video_path: str, transcripts) -> str:
     """
     Formats the final transcript as plain text.
 
     Args:
         video_path (str): Path to the video file (used for caching).
-        transcripts (str): The final transcript data.
+        transcripts (Transcript | list): The final transcript data.
 
     Returns:
         str: Formatted transcript as plain text.
     """
     try:
-        formatted = "# Transcribed Video\n\n"
+        transcripts = Transcript.coerce(transcripts)
+        lines = ["# Transcribed Video\n\n"]
         # This is a simplified formatting - enhance as needed
-        for entry in transcripts:
-            speaker = entry['speaker_name']
-            transcript = entry['transcript']
-            formatted += f"{speaker}:{transcript}\n"
-        return formatted
+        for i in range(len(transcripts)):
+            lines.append(f"{transcripts.speaker_name(i)}:{transcripts.text(i)}\n")
+        return "".join(lines)
     except Exception as e:
         print(f"Error formatting transcript: {e}")
-        return transcript
+        raise
 
 def _create_anchor_link(subheading):
     """
@@ -58,7 +57,7 @@ def _create_anchor_link(subheading):
 
 @cached_file(EXTENSION_MARKDOWN)
 def format_markdown(video_path: str,
-                    transcripts: List[Dict[str, Any]],
+                    transcripts,
                     nouns_list: Dict[str, List[Dict[str, Any]]],
                     topic_headlines: list,
                     topic_summary: list) -> str:
@@ -67,7 +66,7 @@ def format_markdown(video_path: str,
 
     Args:
         video_path (str): Path to the video file (used for caching).
-        transcripts (List[Dict[str, Any]]): The final transcript data.
+        transcripts (Transcript | list): The final transcript data.
         nouns_list (Dict[str, List[Dict[str, Any]]]): A dictionary of extracted nouns/entities.
         topic_headlines (list): A list of topic headlines.
         topic_summary (list): A list of topic summaries.
@@ -76,16 +75,17 @@ def format_markdown(video_path: str,
         str: Formatted transcript as Markdown.
     """
     try:
+        transcripts = Transcript.coerce(transcripts)
         formatted = "# Transcribed Video\n\n"
         current_topic = None
 
         ''' TOC '''
         formatted += "# Table of Content\n"
-        for entry in transcripts:
-            topic = entry.get('topic', None)
+        for i in range(len(transcripts)):
+            topic = transcripts.topic_at(i)
 
             if topic != current_topic:
-                start = entry.get('start')
+                start = transcripts.start[i]
                 headline = topic_headlines[topic]
                 headline_anchor = _create_anchor_link(headline)
                 formatted += f"\n- [{headline}](#{headline_anchor})   ({start})\n\n"
@@ -96,14 +96,14 @@ def format_markdown(video_path: str,
         formatted += "\n# Transcript\n"
         current_speaker = None
         ''' Transcript '''
-        for entry in transcripts:
-            speaker = entry.get('speaker_name', 'UNKNOWN') # Use .get for safety
-            topic = entry.get('topic', None)
-            transcript_text = entry.get('transcript', '[TRANSCRIPT MISSING]')
+        for i in range(len(transcripts)):
+            speaker = transcripts.speaker_name(i) or 'UNKNOWN'
+            topic = transcripts.topic_at(i)
+            transcript_text = transcripts.text(i)
 
             # Add speaker heading only when the topic changes
             if topic != current_topic:
-                start = entry.get('start')
+                start = transcripts.start[i]
                 headline = topic_headlines[topic]
                 formatted += f"\n\n## {headline}\n"
                 current_topic = topic
@@ -111,7 +111,7 @@ def format_markdown(video_path: str,
 
             # Add speaker heading only when the speaker changes
             if speaker != current_speaker:
-                start = entry.get('start')
+                start = transcripts.start[i]
                 formatted += f"\n### {speaker} ({start})\n"
                 current_speaker = speaker
 
@@ -131,4 +131,4 @@ def format_markdown(video_path: str,
     except Exception as e:
         print(f"Error formatting transcript: {e}")
         # Attempt to return a basic representation even on error
-        return json.dumps(transcripts, indent=2)
+        return json.dumps(list(transcripts), indent=2)
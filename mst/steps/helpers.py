@@ -1,38 +1,37 @@
 import os
 import json
-import torch
 import logging
 import traceback
-from typing import List, Dict, Any
+from array import array
+from typing import List, Dict, Any, Iterator, Optional
 
-from .caching import cached_file, cached_file_object
+from .caching import cached_file, cached_file_object, save_step_output, stream_step_output
+from .speaker_index import SpeakerIndex
+from .transcript import Transcript
+from ..config import CacheConfig
 
 """
 Helper functions for transcript processing and manipulation.
 """
 
-@cached_file_object('.merged')
-def merge_transcript_diarization(video_path: str, transcript: list, diarization: list):
+def iter_merged_segments(transcript: list, diarization: list) -> Iterator[Dict[str, Any]]:
     """
-    Merges transcript and diarization information into a unified format.
+    Yields transcript segments split and labelled by diarization turns.
 
-    This function combines transcript segments with speaker diarization information
-    to create a unified transcript with speaker labels.
+    Generator form of `merge_transcript_diarization`, so the merged transcript
+    can be streamed into later steps without materializing it.
 
     Args:
-        video_path (str): Path to the video file (used for caching).
         transcript (list): List of transcript segments.
         diarization (list): List of speaker diarization segments.
 
-    Returns:
-        list: Merged transcript with speaker information.
+    Yields:
+        Dict[str, Any]: Merged segments with speaker and duration.
     """
-    # Create a new list to store merged results
-    merged = []
-
     # Sort both arrays by start time just to be safe
     transcript = sorted(transcript, key=lambda x: x["start"])
-    diarization = sorted(diarization, key=lambda x: x["start"])
+    speaker_index = SpeakerIndex(diarization)
+    diarization = speaker_index.turns
 
     # Keep track of current position in both arrays
     t_idx = 0  # transcript index
@@ -40,7 +39,8 @@ def merge_transcript_diarization(video_path: str, transcript: list, diarization:
 
     # Handle case where one or both arrays are empty
     if not transcript or not diarization:
-        return transcript if transcript else []
+        yield from transcript
+        return
 
     current_time = min(transcript[0]["start"], diarization[0]["start"])
     max_time = max(
@@ -63,35 +63,39 @@ def merge_transcript_diarization(video_path: str, transcript: list, diarization:
         # If no transcript in this segment, create a silent segment
         if not curr_trans or (curr_diar and curr_diar["end"] < curr_trans["start"]):
             if curr_diar:
-                merged.append({
+                yield {
                     "start": current_time,
                     "end": min(next_end, curr_diar["end"]),
                     "transcript": "[SILENCE]",
                     "speaker": curr_diar["speaker"],
                     "duration": min(next_end, curr_diar["end"]) - current_time
-                })
+                }
             else:
-                merged.append({
+                yield {
                     "start": current_time,
                     "end": next_end,
                     "transcript": "[SILENCE]",
                     "speaker": "UNKNOWN",
                     "duration": next_end - current_time
-                })
+                }
         # If we have a transcript segment
         else:
-            speaker = "UNKNOWN"
-            # Find overlapping diarization segment
-            if curr_diar and curr_diar["start"] <= curr_trans["end"] and curr_diar["end"] >= curr_trans["start"]:
-                speaker = curr_diar["speaker"]
+            # Pick the speaker talking most during this piece of the transcript
+            speaker, _ = speaker_index.best_match(current_time, next_end)
+            if speaker is None:
+                # Zero-length pieces or turns touching the segment edge
+                if curr_diar and curr_diar["start"] <= curr_trans["end"] and curr_diar["end"] >= curr_trans["start"]:
+                    speaker = curr_diar["speaker"]
+                else:
+                    speaker = "UNKNOWN"
 
-            merged.append({
+            yield {
                 "start": current_time,
                 "end": next_end,
                 "transcript": curr_trans["transcript"],
                 "speaker": speaker,
                 "duration": next_end - current_time,
-            })
+            }
 
         # Update indices and current_time
         current_time = next_end
@@ -101,68 +105,155 @@ def merge_transcript_diarization(video_path: str, transcript: list, diarization:
         if curr_diar and next_end >= curr_diar["end"]:
             d_idx += 1
 
-    return merged
-
-@cached_file_object('.compressed')
-def compress_transcript(video_path: str, entries: list):
+@cached_file_object('.merged')
+def merge_transcript_diarization(video_path: str, transcript: list, diarization: list):
     """
-    Compresses repeated sentences in the transcript.
+    Merges transcript and diarization information into a unified format.
 
-    This function combines consecutive segments with the same speaker and text
-    to reduce redundancy in the transcript.
+    This function combines transcript segments with speaker diarization information
+    to create a unified transcript with speaker labels.
 
     Args:
         video_path (str): Path to the video file (used for caching).
-        entries (list): List of transcript entries.
+        transcript (list): List of transcript segments.
+        diarization (list): List of speaker diarization segments.
+
+    Returns:
+        list: Merged transcript with speaker information.
+    """
+    return list(iter_merged_segments(transcript, diarization))
+
+def _compress_columns(entries: Transcript) -> Transcript:
+    """
+    Combines consecutive repeats of the same text, column by column.
+
+    Args:
+        entries (Transcript): Transcript entries with speaker and duration.
 
     Returns:
-        list: Compressed transcript with redundant segments removed.
+        Transcript: Compressed transcript, keeping the speaker of the longest repeat.
     """
-    ''' Compress repreated senstences '''
     if not entries:
-        return []
-
-    compressed = []
-    current = dict(entries[0])  # Create a copy of the first entry
-    duration_max = current['duration']
-
-    for entry in entries[1:]:
-        # Check if current entry matches the previous one in transcript and speaker
-        if (entry['transcript'] == current['transcript'] and
-            entry['start'] == current['end']):  # Check if times are consecutive
-            # Update the end time to the current entry's end time
-            current['end'] = entry['end']
-            current['duration'] = current['duration'] + entry['duration']
-            if entry['duration'] > duration_max:
+        return entries
+
+    firsts = []
+    ends = []
+    durations = []
+    speakers = []
+
+    current = 0
+    current_end = entries.end[0]
+    current_duration = entries.duration[0]
+    current_speaker = entries.speaker_ids[0]
+    duration_max = current_duration
+
+    for i in range(1, len(entries)):
+        # Check if current entry matches the previous one in transcript and consecutive in time
+        if entries.text(i) == entries.text(current) and entries.start[i] == current_end:
+            current_end = entries.end[i]
+            current_duration += entries.duration[i]
+            if entries.duration[i] > duration_max:
                 # Select one corresponding to largest duration
-                current['speaker'] = entry['speaker']
-                duration_max = entry['duration']
+                current_speaker = entries.speaker_ids[i]
+                duration_max = entries.duration[i]
         else:
-            # Add the completed entry to our result and start a new one
-            current['duration'] = round(current['duration'],2)
-            compressed.append(current)
-            current = dict(entry)  # Create a copy of the new entry
-            duration_max = current['duration']
+            firsts.append(current)
+            ends.append(current_end)
+            durations.append(round(current_duration, 2))
+            speakers.append(current_speaker)
+            current = i
+            current_end = entries.end[i]
+            current_duration = entries.duration[i]
+            current_speaker = entries.speaker_ids[i]
+            duration_max = current_duration
     # Don't forget to add the last entry
-    current['duration'] = round(current['duration'],2)
-    compressed.append(current)
+    firsts.append(current)
+    ends.append(current_end)
+    durations.append(round(current_duration, 2))
+    speakers.append(current_speaker)
+
+    return entries.take(
+        firsts,
+        end=memoryview(array('d', ends)),
+        duration=memoryview(array('d', durations)),
+        speaker_ids=memoryview(array('q', speakers)),
+    )
+
+@cached_file_object('.compressed', encode=Transcript.to_records, decode=Transcript.from_records)
+def compress_transcript(video_path: str, entries) -> Transcript:
+    """
+    Compresses repeated sentences in the transcript.
 
-    return compressed
+    This function combines consecutive segments with the same speaker and text
+    to reduce redundancy in the transcript.
 
-@cached_file_object('.final')
-def map_speakers(video_path: str, transcripts: list, speaker_to_name: dict):
+    Args:
+        video_path (str): Path to the video file (used for caching).
+        entries (Transcript | list): Transcript entries.
+
+    Returns:
+        Transcript: Compressed transcript with redundant segments removed.
+    """
+    return _compress_columns(Transcript.coerce(entries))
+
+def map_speakers(video_path: str, transcripts, speaker_to_name: dict) -> Transcript:
     """
     Maps speaker IDs to actual names in the transcript.
 
+    Renaming the speaker column is cheap, so the result is not cached; the
+    `.final` artifact belongs to `post_process_transcript`.
+
+    Args:
+        video_path (str): Path to the video file, unused.
+        transcripts (Transcript | list): Transcript entries.
+        speaker_to_name (dict): Mapping of speaker IDs to names.
+
+    Returns:
+        Transcript: Transcript with speaker names mapped.
+    """
+    return Transcript.coerce(transcripts).with_speaker_names(speaker_to_name)
+
+# The cache policy only decides which intermediates are written
+@cached_file_object('.final', encode=Transcript.to_records, decode=Transcript.from_records, ignore=('config',))
+def post_process_transcript(
+    video_path: str,
+    transcript: list,
+    diarization: list,
+    speaker_to_name: dict,
+    config: Optional[CacheConfig] = None,
+) -> Transcript:
+    """
+    Merges diarization, compresses and maps speaker names in a single pass.
+
+    Fused form of `merge_transcript_diarization`, `compress_transcript` and
+    `map_speakers`: segments stream from the merge straight into a columnar
+    transcript, which is then compressed and mapped column by column. The
+    `.merged` and `.compressed` artifacts are only written when the cache
+    policy asks for them, keyed as if `merge_transcript_diarization` and
+    `compress_transcript` had produced them, so those steps reuse them.
+
     Args:
         video_path (str): Path to the video file (used for caching).
-        transcripts (list): List of transcript entries.
+        transcript (list): List of corrected transcript segments.
+        diarization (list): List of speaker diarization segments.
         speaker_to_name (dict): Mapping of speaker IDs to names.
+        config: CacheConfig instance. If None, uses defaults.
 
     Returns:
-        list: Transcript with speaker names mapped.
+        Transcript: Final transcript with speaker names mapped.
     """
-    return  [transcript | {'speaker_name': speaker_to_name.get(transcript['speaker'],transcript['speaker'])} for transcript in transcripts]
+    if config is None:
+        config = CacheConfig()
+    segments = iter_merged_segments(transcript, diarization)
+    if video_path and config.write_merged:
+        segments = stream_step_output(
+            merge_transcript_diarization, video_path, segments, transcript=transcript, diarization=diarization
+        )
+    merged = Transcript.from_records(segments)
+    compressed = _compress_columns(merged)
+    if video_path and config.write_compressed:
+        save_step_output(compress_transcript, video_path, compressed, entries=merged)
+    return compressed.with_speaker_names(speaker_to_name)
 
 def flatten_texts(input_dict: Dict[str, List[Dict[str, Any]]]) -> List[str]:
     """
@@ -1,27 +1,154 @@
+import re
 import traceback
-from typing import List, Dict, Any, Optional
-from setfit import SetFitModel
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+
+import numpy as np
 
 from .caching import cached_file_object
+from .embeddings import get_embedding_service
 from .entities import extract_persons
+from .speaker_index import SpeakerIndex
 from ..config import IntroductionsConfig
 
+if TYPE_CHECKING:
+    from setfit import SetFitModel
+
+
+_introduction_models: Dict[str, "SetFitModel"] = {}
+
+
+def get_introduction_model(model_name: str = "gerald29/setfit-bge-small-v1.5-sst2-8-shot-introduction") -> "SetFitModel":
+    """
+    Gets or initializes the SetFit introduction classifier for the given model name.
+
+    Args:
+        model_name: Name of the SetFit model to load.
+
+    Returns:
+        SetFitModel: The initialized SetFit model instance.
+    """
+    if model_name not in _introduction_models:
+        from setfit import SetFitModel
+
+        imodel = SetFitModel.from_pretrained(model_name)
+        # Let the embedding service own the sentence encoder so other steps can share it.
+        # The classifier head was trained on this body, so a shared model never replaces it.
+        imodel.model_body = get_embedding_service().register_encoder(model_name, imodel.model_body, pinned=True)
+        _introduction_models[model_name] = imodel
+    return _introduction_models[model_name]
+
+
+def _predict_introduction_labels(imodel: "SetFitModel", sentences: List[str], config: IntroductionsConfig) -> list:
+    """
+    Classifies sentences, embedding them through the shared embedding service.
+
+    Models with a differentiable head fall back to `SetFitModel.predict`.
+
+    Args:
+        imodel (SetFitModel): The introduction classifier.
+        sentences (List[str]): Sentences to classify.
+        config (IntroductionsConfig): Introductions configuration.
+
+    Returns:
+        list: One label per sentence.
+    """
+    if imodel.has_differentiable_head:
+        return imodel.predict(sentences, batch_size=config.batch_size)
+    embeddings = get_embedding_service().encode(
+        sentences, config.setfit_model, normalize=imodel.normalize_embeddings, batch_size=config.batch_size
+    )
+    predictions = np.asarray(imodel.model_head.predict(embeddings))
+    # Heads trained on string labels already predict them; only class indices are mapped
+    if imodel.labels and np.issubdtype(predictions.dtype, np.integer):
+        return [imodel.labels[int(prediction)] for prediction in predictions]
+    return list(predictions)
+
+
+def _has_introduction_cue(text: str, cues: List[re.Pattern]) -> bool:
+    return any(cue.search(text) for cue in cues)
+
+
+def select_introduction_candidates(
+    transcripts: List[Dict[str, Any]],
+    diarization: Optional[List[Dict[str, Any]]] = None,
+    config: Optional[IntroductionsConfig] = None,
+) -> List[int]:
+    """
+    Cheap first stage of introduction detection.
+
+    A segment is a candidate when it contains a lexical introduction cue
+    (e.g. "my name is", "I'm councilor") or belongs to one of the first
+    turns of a diarized speaker, since people usually introduce themselves
+    when they first speak. A turn is a run of consecutive segments matched
+    to the same speaker.
+
+    Args:
+        transcripts (List[Dict[str, Any]]): Transcript segments.
+        diarization (List[Dict[str, Any]], optional): Speaker turns used to find
+                                                      each speaker's first turns.
+        config: IntroductionsConfig instance. If None, uses defaults.
+
+    Returns:
+        List[int]: Indices of the candidate segments, in transcript order.
+    """
+    if config is None:
+        config = IntroductionsConfig()
+    cues = [re.compile(cue, re.IGNORECASE) for cue in config.introduction_cues]
+    speaker_index = SpeakerIndex(diarization or [])
+    turns_seen: Dict[str, int] = {}
+    previous_speaker = None
+    candidates = []
+    for i, item in enumerate(transcripts):
+        speaker, _ = speaker_index.best_match(item['start'], item['end'])
+        is_first_turn = False
+        if speaker is not None:
+            if speaker != previous_speaker:
+                turns_seen[speaker] = turns_seen.get(speaker, 0) + 1
+            is_first_turn = turns_seen[speaker] <= config.first_turns_per_speaker
+        previous_speaker = speaker
+        if is_first_turn or _has_introduction_cue(item['transcript'], cues):
+            candidates.append(i)
+    return candidates
+
 
 @cached_file_object('.introductions')
 def find_introductions(
     video_path: str,
     transcripts,
     config: Optional[IntroductionsConfig] = None,
+    diarization: Optional[List[Dict[str, Any]]] = None,
 ):
-    ''' Identify segments that are speaker introductions using a trained setfit model '''
+    """
+    Identify segments that are speaker introductions using a trained SetFit model.
+
+    When `config.candidate_filter` is set, only the segments kept by
+    `select_introduction_candidates` are sent to the classifier.
+
+    Args:
+        video_path (str): Path to the video file (used for caching).
+        transcripts (list): Transcript segments.
+        config: IntroductionsConfig instance. If None, uses defaults.
+        diarization (list, optional): Speaker turns for the first-turn filter.
+
+    Returns:
+        list: The transcript segments classified as introductions.
+    """
     if config is None:
         config = IntroductionsConfig()
     try:
-        imodel = SetFitModel.from_pretrained(config.setfit_model)
-        sentences = [item['transcript'] for item in transcripts]
-        labels = imodel.predict(sentences)
+        if config.candidate_filter:
+            candidates = [transcripts[i] for i in select_introduction_candidates(transcripts, diarization, config)]
+        else:
+            candidates = list(transcripts)
+        print(f"Classifying {len(candidates)} of {len(transcripts)} segments "
+              f"({len(transcripts) - len(candidates)} classifier invocations avoided)")
+        if not candidates:
+            return []
+        imodel = get_introduction_model(config.setfit_model)
+        sentences = [item['transcript'] for item in candidates]
+        labels = _predict_introduction_labels(imodel, sentences, config)
         # Filter the transcripts where the corresponding label is 'introduction'
-        filtered_transcripts = [transcript for transcript, label in zip(transcripts, labels) if label == 'introduction']
+        filtered_transcripts = [transcript for transcript, label in zip(candidates, labels) if label == 'introduction']
         return filtered_transcripts
     except Exception as e:
         print(f"Error extracting speaker introductions: {e}")
@@ -69,42 +196,16 @@ def map_entities_to_speakers(video_path: str, ner_data, diarization_data, margin
               'overlap_duration': The duration of the actual overlap with the matched speaker.
                                   If no match, this will be 0.
     """
+    speaker_index = SpeakerIndex(diarization_data)
     results = []
 
     for entity in ner_data:
         # Create a copy to avoid modifying the original input
         processed_entity = entity.copy()
 
-        entity_start = processed_entity['start']
-        entity_end = processed_entity['end']
-
-        best_match_speaker = None
-        max_overlap_duration = 0.0
-
-        for segment in diarization_data:
-            speaker_start = segment['start']
-            speaker_end = segment['end']
-            speaker_id = segment['speaker']
-
-            # Condition for potential match: entity overlaps with expanded speaker segment
-            # Expanded speaker segment: [speaker_start - margin, speaker_end + margin]
-            # Overlap condition:
-            # max(entity_start, speaker_start - margin) < min(entity_end, speaker_end + margin)
-
-            potential_match_start = speaker_start - margin
-            potential_match_end = speaker_end + margin
-
-            if max(entity_start, potential_match_start) < min(entity_end, potential_match_end):
-                # This speaker segment is a candidate. Now calculate actual overlap.
-                # Actual overlap is between [entity_start, entity_end] and [speaker_start, speaker_end]
-                overlap_start = max(entity_start, speaker_start)
-                overlap_end = min(entity_end, speaker_end)
-
-                current_overlap_duration = round(max(0, overlap_end - overlap_start),2)
-
-                if current_overlap_duration > max_overlap_duration:
-                    max_overlap_duration = current_overlap_duration
-                    best_match_speaker = speaker_id
+        best_match_speaker, max_overlap_duration = speaker_index.best_match(
+            processed_entity['start'], processed_entity['end'], margin
+        )
 
         processed_entity['matched_speaker'] = best_match_speaker
         processed_entity['overlap_duration'] = max_overlap_duration
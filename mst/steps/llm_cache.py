@@ -0,0 +1,140 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from .caching import hash_value
+
+"""
+Persistent SQLite cache of LLM responses keyed on the request content.
+"""
+
+
+def request_key(provider: str, model: str, messages: list, schema: Optional[dict] = None, params: Optional[dict] = None) -> str:
+    """
+    Hashes everything that determines an LLM response.
+
+    Args:
+        provider (str): LLM provider name.
+        model (str): Model name.
+        messages (list): Chat messages.
+        schema (dict, optional): JSON schema of the structured response, if any.
+        params (dict, optional): Other request parameters. Pydantic response
+                                 formats are hashed through their JSON schema.
+
+    Returns:
+        str: Hex SHA-256 digest identifying the request.
+
+    Raises:
+        TypeError: If a message or parameter has no content-based JSON form.
+    """
+    return hash_value(
+        {"provider": provider, "model": model, "messages": messages, "schema": schema, "params": params or {}}
+    )
+
+
+class LLMResponseCache:
+    """
+    SQLite store of LLM responses with a time-to-live and a size cap.
+
+    Entries older than `ttl` seconds are treated as missing and deleted.
+    When more than `max_entries` responses are stored, the least recently
+    used ones are evicted. The database runs in WAL mode so several
+    pipeline processes can share one cache file.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups not found, including expired entries.
+        expired (int): Entries dropped because they outlived the TTL.
+        evicted (int): Entries dropped by the size cap.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_entries: int = 100000):
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the cached response for `key`, or None.
+
+        Args:
+            key (str): Request key from `request_key`.
+
+        Returns:
+            Any | None: The JSON-decoded response.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        """
+        Stores a JSON-serializable response, evicting the oldest entries over the size cap.
+
+        Args:
+            key (str): Request key from `request_key`.
+            value (Any): The response.
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            count = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                self._connection.execute(
+                    "DELETE FROM responses WHERE key IN"
+                    " (SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+                self.evicted += count - self.max_entries
+
+    def stats(self) -> dict:
+        """
+        Returns the hit/miss counters and the number of stored responses.
+
+        Returns:
+            dict: Cache statistics.
+        """
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "entries": entries,
+        }
@@ -1,13 +1,38 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
 from abc import ABC, abstractmethod
-from typing import Optional, TypeVar, Type
-from openai import OpenAI
-from ollama import chat as ollama_chat
+from typing import Awaitable, Callable, Dict, Optional, TypeVar, Type
+
+import httpx
+import openai
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+from ollama import AsyncClient as OllamaAsyncHttpClient, Client as OllamaHttpClient, ResponseError
 from pydantic import BaseModel
 
+from .llm_cache import LLMResponseCache, request_key
+from .llm_scheduler import LLMScheduler, get_llm_scheduler
+from .tokens import estimate_tokens
 from ..config import LLMConfig
 
 T = TypeVar("T", bound=BaseModel)
 
+_llm_clients: Dict[str, "LLMClient"] = {}
+_llm_clients_lock = threading.Lock()
+
+# Status codes worth retrying: rate limiting and server-side failures
+_TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _for_running_loop(instances: "weakref.WeakKeyDictionary", factory: Callable):
+    """Returns the instance created by `factory` for the running event loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in instances:
+        instances[loop] = factory()
+    return instances[loop]
+
 
 class LLMClient(ABC):
     @abstractmethod
@@ -20,14 +45,28 @@ class LLMClient(ABC):
         """Send a chat request and return a validated Pydantic model instance."""
         pass
 
+    async def achat(self, model: str, messages: list[dict], **kwargs) -> str:
+        """Async `chat`. Runs the blocking call in a worker thread unless overridden."""
+        return await asyncio.to_thread(self.chat, model, messages, **kwargs)
+
+    async def aparse(self, model: str, messages: list[dict], response_model: Type[T], **kwargs) -> T:
+        """Async `parse`. Runs the blocking call in a worker thread unless overridden."""
+        return await asyncio.to_thread(self.parse, model, messages, response_model, **kwargs)
+
 
 class OllamaClient(LLMClient):
+    def __init__(self, host: Optional[str] = None, timeout: Optional[float] = None):
+        self._client = OllamaHttpClient(host=host, timeout=timeout)
+        # Async HTTP clients are bound to the event loop they were created in
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_factory = lambda: OllamaAsyncHttpClient(host=host, timeout=timeout)
+
     def chat(self, model: str, messages: list[dict], **kwargs) -> str:
-        response = ollama_chat(model=model, messages=messages, **kwargs)
+        response = self._client.chat(model=model, messages=messages, **kwargs)
         return response.message.content
 
     def parse(self, model: str, messages: list[dict], response_model: Type[T], **kwargs) -> T:
-        response = ollama_chat(
+        response = self._client.chat(
             model=model,
             messages=messages,
             format=response_model.model_json_schema(),
@@ -35,23 +74,76 @@ class OllamaClient(LLMClient):
         )
         return response_model.model_validate_json(response.message.content)
 
+    async def achat(self, model: str, messages: list[dict], **kwargs) -> str:
+        client = _for_running_loop(self._async_clients, self._async_factory)
+        response = await client.chat(model=model, messages=messages, **kwargs)
+        return response.message.content
 
-class OpenAIClient(LLMClient):
-    def __init__(self, base_url: str, api_key: str):
-        self._client = OpenAI(base_url=base_url, api_key=api_key)
-
-    def chat(self, model: str, messages: list[dict], **kwargs) -> str:
-        response_format = kwargs.pop("response_format", None)
-        response = self._client.chat.completions.create(
+    async def aparse(self, model: str, messages: list[dict], response_model: Type[T], **kwargs) -> T:
+        client = _for_running_loop(self._async_clients, self._async_factory)
+        response = await client.chat(
             model=model,
             messages=messages,
-            **(kwargs if not response_format else {"response_format": response_format})
+            format=response_model.model_json_schema(),
+            **kwargs,
+        )
+        return response_model.model_validate_json(response.message.content)
+
+
+class OpenAIClient(LLMClient):
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        timeout: Optional[float] = None,
+        max_connections: int = 16,
+    ):
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        # Retries are handled by RetryingLLMClient, so the SDK does not retry on its own
+        self._client = OpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            timeout=timeout,
+            max_retries=0,
+            http_client=DefaultHttpxClient(limits=limits),
         )
+        # Async HTTP clients are bound to the event loop they were created in
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_factory = lambda: AsyncOpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            timeout=timeout,
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(limits=limits),
+        )
+
+    @staticmethod
+    def _chat_kwargs(kwargs: dict) -> dict:
+        response_format = kwargs.pop("response_format", None)
+        return kwargs if not response_format else {"response_format": response_format}
+
+    @staticmethod
+    def _content(response) -> str:
         content = response.choices[0].message.content
         if content is None:
             raise ValueError("LLM returned None content")
         return content
 
+    @staticmethod
+    def _parsed(response):
+        parsed = response.choices[0].message.parsed
+        if parsed is None:
+            raise ValueError("LLM structured output returned None")
+        return parsed
+
+    def chat(self, model: str, messages: list[dict], **kwargs) -> str:
+        response = self._client.chat.completions.create(
+            model=model,
+            messages=messages,
+            **self._chat_kwargs(kwargs)
+        )
+        return self._content(response)
+
     def parse(self, model: str, messages: list[dict], response_model: Type[T], **kwargs) -> T:
         response = self._client.beta.chat.completions.parse(
             model=model,
@@ -59,20 +151,292 @@ class OpenAIClient(LLMClient):
             response_format=response_model,
             **kwargs,
         )
-        parsed = response.choices[0].message.parsed
-        if parsed is None:
-            raise ValueError("LLM structured output returned None")
+        return self._parsed(response)
+
+    async def achat(self, model: str, messages: list[dict], **kwargs) -> str:
+        client = _for_running_loop(self._async_clients, self._async_factory)
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            **self._chat_kwargs(kwargs)
+        )
+        return self._content(response)
+
+    async def aparse(self, model: str, messages: list[dict], response_model: Type[T], **kwargs) -> T:
+        client = _for_running_loop(self._async_clients, self._async_factory)
+        response = await client.beta.chat.completions.parse(
+            model=model,
+            messages=messages,
+            response_format=response_model,
+            **kwargs,
+        )
+        return self._parsed(response)
+
+
+class LLMMetrics:
+    """Thread-safe request counts and per-request latencies of an LLM client."""
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.latencies: list[float] = []
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, attempts: int, failed: bool = False):
+        with self._lock:
+            self.requests += 1
+            self.retries += attempts - 1
+            self.failures += int(failed)
+            self.latencies.append(latency)
+
+    def summary(self) -> dict:
+        """
+        Summarizes the recorded requests.
+
+        Returns:
+            dict: Request, retry and failure counts with mean, p50 and p95 latency in seconds.
+        """
+        with self._lock:
+            latencies = sorted(self.latencies)
+            summary = {"requests": self.requests, "retries": self.retries, "failures": self.failures}
+        if latencies:
+            summary["mean_latency"] = sum(latencies) / len(latencies)
+            summary["p50_latency"] = latencies[len(latencies) // 2]
+            summary["p95_latency"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return summary
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Returns True for errors worth retrying: timeouts, dropped connections,
+    rate limiting and server-side failures.
+
+    Args:
+        error (Exception): The error raised by an LLM request.
+
+    Returns:
+        bool: Whether the request should be retried.
+    """
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in _TRANSIENT_STATUS_CODES
+    if isinstance(error, ResponseError):
+        return error.status_code in _TRANSIENT_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+class RetryingLLMClient(LLMClient):
+    """
+    Wraps an LLM client with jittered exponential-backoff retries and latency metrics.
+
+    Only transient errors are retried, up to `max_retries` times. Each
+    request, including its retries, is recorded in `metrics`. Async requests
+    are limited to `max_concurrency` in flight per event loop; cancelling
+    the awaiting task cancels the request and any pending retry.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+        max_concurrency: int = 8,
+    ):
+        self.client = client
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_concurrency = max_concurrency
+        self.metrics = LLMMetrics()
+        self._sleep = sleep
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _backoff_delay(self, attempt: int) -> float:
+        # Full jitter: a random wait up to the exponential backoff
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def _call(self, request: Callable[[], T]) -> T:
+        start = time.perf_counter()
+        attempt = 1
+        while True:
+            try:
+                result = request()
+            except Exception as e:
+                if attempt > self.max_retries or not is_transient_error(e):
+                    self.metrics.record(time.perf_counter() - start, attempt, failed=True)
+                    raise
+                self._sleep(self._backoff_delay(attempt))
+                attempt += 1
+                continue
+            self.metrics.record(time.perf_counter() - start, attempt)
+            return result
+
+    async def _acall(self, request: Callable[[], Awaitable[T]]) -> T:
+        semaphore = _for_running_loop(self._semaphores, lambda: asyncio.Semaphore(self.max_concurrency))
+        async with semaphore:
+            start = time.perf_counter()
+            attempt = 1
+            while True:
+                try:
+                    result = await request()
+                except Exception as e:
+                    if attempt > self.max_retries or not is_transient_error(e):
+                        self.metrics.record(time.perf_counter() - start, attempt, failed=True)
+                        raise
+                    await asyncio.sleep(self._backoff_delay(attempt))
+                    attempt += 1
+                    continue
+                self.metrics.record(time.perf_counter() - start, attempt)
+                return result
+
+    def chat(self, model: str, messages: list[dict], **kwargs) -> str:
+        return self._call(lambda: self.client.chat(model, messages, **kwargs))
+
+    def parse(self, model: str, messages: list[dict], response_model: Type[T], **kwargs) -> T:
+        return self._call(lambda: self.client.parse(model, messages, response_model, **kwargs))
+
+    async def achat(self, model: str, messages: list[dict], **kwargs) -> str:
+        return await self._acall(lambda: self.client.achat(model, messages, **kwargs))
+
+    async def aparse(self, model: str, messages: list[dict], response_model: Type[T], **kwargs) -> T:
+        return await self._acall(lambda: self.client.aparse(model, messages, response_model, **kwargs))
+
+
+class ScheduledLLMClient(LLMClient):
+    """
+    Routes every request through a shared `LLMScheduler`.
+
+    Requests are admitted by the scheduler with this client's priority and
+    an estimate of their prompt tokens.
+    """
+
+    def __init__(self, client: LLMClient, scheduler: LLMScheduler, priority: str = "interactive"):
+        self.client = client
+        self.scheduler = scheduler
+        self.priority = priority
+
+    @staticmethod
+    def _tokens(messages: list[dict]) -> int:
+        return sum(estimate_tokens(str(message.get("content", ""))) for message in messages)
+
+    def chat(self, model: str, messages: list[dict], **kwargs) -> str:
+        with self.scheduler.slot(self.priority, self._tokens(messages)):
+            return self.client.chat(model, messages, **kwargs)
+
+    def parse(self, model: str, messages: list[dict], response_model: Type[T], **kwargs) -> T:
+        with self.scheduler.slot(self.priority, self._tokens(messages)):
+            return self.client.parse(model, messages, response_model, **kwargs)
+
+    async def achat(self, model: str, messages: list[dict], **kwargs) -> str:
+        async with self.scheduler.aslot(self.priority, self._tokens(messages)):
+            return await self.client.achat(model, messages, **kwargs)
+
+    async def aparse(self, model: str, messages: list[dict], response_model: Type[T], **kwargs) -> T:
+        async with self.scheduler.aslot(self.priority, self._tokens(messages)):
+            return await self.client.aparse(model, messages, response_model, **kwargs)
+
+
+class CachingLLMClient(LLMClient):
+    """
+    Replays LLM responses from a persistent cache keyed on the request content.
+
+    The key covers the provider, model, messages, structured response schema
+    and remaining request parameters, so any change to the request misses.
+    Failed requests are not cached.
+    """
+
+    def __init__(self, client: LLMClient, cache: LLMResponseCache, provider: str):
+        self.client = client
+        self.cache = cache
+        self.provider = provider
+
+    def chat(self, model: str, messages: list[dict], **kwargs) -> str:
+        key = request_key(self.provider, model, messages, params=kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        content = self.client.chat(model, messages, **kwargs)
+        self.cache.put(key, content)
+        return content
+
+    def parse(self, model: str, messages: list[dict], response_model: Type[T], **kwargs) -> T:
+        key = request_key(self.provider, model, messages, response_model.model_json_schema(), kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return response_model.model_validate(cached)
+        parsed = self.client.parse(model, messages, response_model, **kwargs)
+        self.cache.put(key, parsed.model_dump(mode="json"))
+        return parsed
+
+    async def achat(self, model: str, messages: list[dict], **kwargs) -> str:
+        key = request_key(self.provider, model, messages, params=kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        content = await self.client.achat(model, messages, **kwargs)
+        self.cache.put(key, content)
+        return content
+
+    async def aparse(self, model: str, messages: list[dict], response_model: Type[T], **kwargs) -> T:
+        key = request_key(self.provider, model, messages, response_model.model_json_schema(), kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return response_model.model_validate(cached)
+        parsed = await self.client.aparse(model, messages, response_model, **kwargs)
+        self.cache.put(key, parsed.model_dump(mode="json"))
         return parsed
 
 
+def _create_llm_client(config: LLMConfig) -> LLMClient:
+    if config.provider == "ollama":
+        client = OllamaClient(host=config.ollama_host, timeout=config.timeout)
+    else:
+        client = OpenAIClient(
+            config.openai_base_url,
+            config.openai_api_key,
+            timeout=config.timeout,
+            max_connections=config.max_connections,
+        )
+    # Each attempt, including retries, is admitted by the endpoint's scheduler
+    client = ScheduledLLMClient(client, get_llm_scheduler(config), config.priority)
+    client = RetryingLLMClient(
+        client,
+        max_retries=config.max_retries,
+        backoff=config.retry_backoff,
+        max_backoff=config.retry_max_backoff,
+        max_concurrency=config.async_max_concurrency,
+    )
+    if config.response_cache:
+        cache = LLMResponseCache(
+            config.response_cache_path,
+            ttl=config.response_cache_ttl,
+            max_entries=config.response_cache_max_entries,
+        )
+        client = CachingLLMClient(client, cache, config.provider)
+    return client
+
+
 def get_llm_client(config: Optional[LLMConfig] = None) -> LLMClient:
-    """Factory function to get the appropriate LLM client based on config.
+    """Gets or creates the long-lived LLM client for the given config.
+
+    Clients are pooled by config, so every step sharing an LLMConfig reuses
+    the same HTTP connection pool. Requests time out after `config.timeout`
+    seconds and transient errors are retried with jittered backoff. Every
+    attempt is admitted by the process-wide scheduler of the endpoint, with
+    the priority, rate limits and in-flight cap of the config. With
+    `config.response_cache`, responses are replayed from a SQLite cache.
 
     Args:
         config: LLMConfig instance. If None, uses default LLMConfig values.
     """
     if config is None:
         config = LLMConfig()
-    if config.provider == "ollama":
-        return OllamaClient()
-    return OpenAIClient(config.openai_base_url, config.openai_api_key)
+    key = config.model_dump_json()
+    with _llm_clients_lock:
+        if key not in _llm_clients:
+            _llm_clients[key] = _create_llm_client(config)
+        return _llm_clients[key]
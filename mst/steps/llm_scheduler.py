@@ -0,0 +1,249 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+
+from ..config import LLMConfig
+
+"""
+Process-wide scheduling of LLM requests to a shared endpoint.
+"""
+
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+_llm_schedulers: Dict[str, "LLMScheduler"] = {}
+_llm_schedulers_lock = threading.Lock()
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _TokenBucket:
+    """
+    Continuously refilled bucket holding up to one second of `rate`.
+
+    A request larger than the bucket waits for a full bucket and leaves it in
+    debt, so later requests wait until the whole amount has been refilled.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def delay(self, amount: float) -> float:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float):
+        self.level -= amount
+
+
+class LLMScheduler:
+    """
+    Admits LLM requests to one endpoint by priority, rate and concurrency.
+
+    Waiting requests are served strictly by priority class ("interactive"
+    before "batch"), first come first served within a class. A request
+    starts once fewer than `max_in_flight` requests are running and the
+    request and token buckets allow it. Queue depth and wait times are
+    recorded for `stats`.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        requests_per_second: Optional[float] = None,
+        tokens_per_second: Optional[float] = None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self._request_bucket = _TokenBucket(requests_per_second) if requests_per_second else None
+        self._token_bucket = _TokenBucket(tokens_per_second) if tokens_per_second else None
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._waits: Dict[str, list] = {priority: [] for priority in PRIORITIES}
+        self._condition = threading.Condition()
+        # Tasks waiting in `aacquire`, by queue entry, with their loop and wake-up future
+        self._async_waiters: Dict[tuple, tuple] = {}
+
+    def _rate_delay(self, tokens: int) -> float:
+        delay = 0.0
+        if self._request_bucket:
+            delay = max(delay, self._request_bucket.delay(1))
+        if self._token_bucket:
+            delay = max(delay, self._token_bucket.delay(tokens))
+        return delay
+
+    def _enqueue(self, priority: str) -> tuple:
+        entry = (PRIORITIES[priority], next(self._sequence))
+        heapq.heappush(self._waiting, entry)
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiting))
+        return entry
+
+    def _ready_delay(self, entry: tuple, tokens: int) -> Optional[float]:
+        """Seconds until `entry` may start, or None while it is not first in line or no slot is free."""
+        if self._waiting[0] != entry or self.in_flight >= self.max_in_flight:
+            return None
+        return self._rate_delay(tokens)
+
+    def _grant(self, priority: str, tokens: int, enqueued: float):
+        heapq.heappop(self._waiting)
+        if self._request_bucket:
+            self._request_bucket.take(1)
+        if self._token_bucket:
+            self._token_bucket.take(tokens)
+        self.in_flight += 1
+        self._waits[priority].append(time.monotonic() - enqueued)
+        # The next request in line may be able to start as well
+        self._notify()
+
+    def _dequeue(self, entry: tuple):
+        self._waiting.remove(entry)
+        heapq.heapify(self._waiting)
+        self._notify()
+
+    def _notify(self):
+        """Wakes every waiting thread and task to re-check the queue."""
+        self._condition.notify_all()
+        for loop, wakeup in self._async_waiters.values():
+            loop.call_soon_threadsafe(_wake, wakeup)
+
+    def acquire(self, priority: str = "interactive", tokens: int = 0):
+        """
+        Blocks until the request may start and takes an in-flight slot.
+
+        Args:
+            priority (str): "interactive" or "batch".
+            tokens (int): Estimated tokens of the request.
+        """
+        enqueued = time.monotonic()
+        with self._condition:
+            entry = self._enqueue(priority)
+            try:
+                while True:
+                    delay = self._ready_delay(entry, tokens)
+                    if delay is not None and delay <= 0:
+                        break
+                    self._condition.wait(delay)
+            except BaseException:
+                self._dequeue(entry)
+                raise
+            self._grant(priority, tokens, enqueued)
+
+    async def aacquire(self, priority: str = "interactive", tokens: int = 0):
+        """
+        Async `acquire`, waiting on the event loop instead of blocking a thread.
+
+        Args:
+            priority (str): "interactive" or "batch".
+            tokens (int): Estimated tokens of the request.
+        """
+        loop = asyncio.get_running_loop()
+        enqueued = time.monotonic()
+        with self._condition:
+            entry = self._enqueue(priority)
+        try:
+            while True:
+                with self._condition:
+                    delay = self._ready_delay(entry, tokens)
+                    if delay is not None and delay <= 0:
+                        self._grant(priority, tokens, enqueued)
+                        return
+                    # Registered under the lock, so a wake-up sent before the await is kept
+                    wakeup = loop.create_future()
+                    self._async_waiters[entry] = (loop, wakeup)
+                try:
+                    await asyncio.wait_for(wakeup, delay)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    with self._condition:
+                        self._async_waiters.pop(entry, None)
+        except BaseException:
+            with self._condition:
+                self._dequeue(entry)
+            raise
+
+    def release(self):
+        """Frees the in-flight slot taken by `acquire`."""
+        with self._condition:
+            self.in_flight -= 1
+            self._notify()
+
+    @contextmanager
+    def slot(self, priority: str = "interactive", tokens: int = 0):
+        """Holds an in-flight slot for the duration of the block."""
+        self.acquire(priority, tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self, priority: str = "interactive", tokens: int = 0):
+        """Async `slot`. A task cancelled while queued leaves the queue without taking a slot."""
+        await self.aacquire(priority, tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        """
+        Returns queue and wait-time metrics.
+
+        Returns:
+            dict: Current and maximum queue depth, requests in flight, and
+                  per-priority request counts with mean and p95 wait in seconds.
+        """
+        with self._condition:
+            stats = {
+                "queue_depth": len(self._waiting),
+                "max_queue_depth": self.max_queue_depth,
+                "in_flight": self.in_flight,
+            }
+            for priority, waits in self._waits.items():
+                waits = sorted(waits)
+                stats[priority] = {
+                    "requests": len(waits),
+                    "mean_wait": sum(waits) / len(waits) if waits else 0.0,
+                    "p95_wait": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0,
+                }
+        return stats
+
+
+def get_llm_scheduler(config: Optional[LLMConfig] = None) -> LLMScheduler:
+    """
+    Gets or creates the process-wide scheduler for the endpoint of `config`.
+
+    Every client talking to the same endpoint shares one scheduler, whatever
+    its priority. The limits of the first config seen for an endpoint apply.
+
+    Args:
+        config: LLMConfig instance. If None, uses default LLMConfig values.
+
+    Returns:
+        LLMScheduler: The endpoint's scheduler.
+    """
+    if config is None:
+        config = LLMConfig()
+    endpoint = config.ollama_host if config.provider == "ollama" else config.openai_base_url
+    key = f"{config.provider}:{endpoint}"
+    with _llm_schedulers_lock:
+        if key not in _llm_schedulers:
+            _llm_schedulers[key] = LLMScheduler(
+                max_in_flight=config.scheduler_max_in_flight,
+                requests_per_second=config.scheduler_requests_per_second,
+                tokens_per_second=config.scheduler_tokens_per_second,
+            )
+        return _llm_schedulers[key]
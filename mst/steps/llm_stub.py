@@ -0,0 +1,269 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+"""
+Local stub of the OpenAI and Ollama chat APIs for offline tests and benchmarks.
+"""
+
+_LIST_ITEM = re.compile(r'^\s*-\s+(.+?)\s*$', re.MULTILINE)
+
+
+def _prompt_text(messages: list) -> str:
+    for message in reversed(messages):
+        if message.get("role", "user") == "user":
+            content = message.get("content", "")
+            return content if isinstance(content, str) else json.dumps(content)
+    return ""
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def _value_for_schema(schema: dict, prompt: str, name: str = "", definitions: Optional[dict] = None):
+    """Builds a deterministic value matching `schema` from the prompt text."""
+    definitions = definitions or schema.get("$defs", {})
+    if "$ref" in schema:
+        schema = definitions.get(schema["$ref"].split("/")[-1], {})
+    kind = schema.get("type")
+    if kind == "object" or "properties" in schema:
+        return {
+            key: _value_for_schema(value, prompt, key, definitions)
+            for key, value in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        items = _LIST_ITEM.findall(prompt)
+        # Echo "- item" lines the way a deduplicating model would
+        return sorted(set(items)) if items else prompt.split()[:3]
+    if kind == "integer":
+        return 0
+    if kind == "number":
+        return 0.0
+    if kind == "boolean":
+        return False
+    words = prompt.split()
+    return f"{name or 'reply'}: {' '.join(words[-8:])}".strip()
+
+
+class LLMStubServer:
+    """
+    Threaded HTTP server answering OpenAI and Ollama chat requests.
+
+    Serves `POST /v1/chat/completions` (plain and `json_schema` structured
+    output) and `POST /api/chat` (with an optional `format` schema). Replies
+    are deterministic: text replies quote the end of the prompt and
+    structured replies fill the requested schema from it.
+
+    Each request takes `latency` seconds plus `completion_tokens` divided
+    by `tokens_per_second`. A fraction `error_rate` of requests, chosen with
+    a seeded random generator, fails with HTTP `error_status`, and the first
+    `fail_first` requests always fail.
+
+    Attributes:
+        requests (int): Requests received.
+        errors (int): Requests answered with an injected error.
+        max_in_flight (int): Largest number of requests served at once.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        tokens_per_second: Optional[float] = None,
+        completion_tokens: int = 20,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        fail_first: int = 0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.fail_first = fail_first
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openai_base_url(self) -> str:
+        """Base URL for `LLMConfig.openai_base_url`."""
+        return self.url + "/v1"
+
+    def start(self) -> "LLMStubServer":
+        """Serves requests from a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="llm-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving and closes the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "LLMStubServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self) -> dict:
+        """Returns request, error and concurrency counters."""
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors, "max_in_flight": self.max_in_flight}
+
+    def _begin(self) -> bool:
+        """Counts a request and returns True if an error should be injected."""
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self.requests <= self.fail_first or self._random.random() < self.error_rate
+            self.errors += int(fail)
+            return fail
+
+    def _end(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _delay(self):
+        delay = self.latency
+        if self.tokens_per_second:
+            delay += self.completion_tokens / self.tokens_per_second
+        if delay:
+            time.sleep(delay)
+
+    def _reply(self, messages: list, schema: Optional[dict]) -> str:
+        prompt = _prompt_text(messages)
+        if schema is not None:
+            return json.dumps(_value_for_schema(schema, prompt))
+        return _value_for_schema({"type": "string"}, prompt)
+
+    def _openai_response(self, body: dict) -> dict:
+        response_format = body.get("response_format") or {}
+        schema = None
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"].get("schema", {})
+        elif response_format.get("type") == "json_object":
+            schema = {"type": "object"}
+        content = self._reply(body.get("messages", []), schema)
+        prompt_tokens = sum(_estimate_tokens(_prompt_text([m])) for m in body.get("messages", []))
+        return {
+            "id": f"chatcmpl-stub-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content, "refusal": None},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "total_tokens": prompt_tokens + self.completion_tokens,
+            },
+        }
+
+    def _ollama_response(self, body: dict) -> dict:
+        schema = body.get("format")
+        if schema == "json":
+            schema = {"type": "object"}
+        return {
+            "model": body.get("model", "stub"),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "message": {"role": "assistant", "content": self._reply(body.get("messages", []), schema)},
+            "done": True,
+            "done_reason": "stop",
+            "eval_count": self.completion_tokens,
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, payload: dict):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path.rstrip("/").endswith("/chat/completions"):
+                    build = server._openai_response
+                elif self.path.rstrip("/") == "/api/chat":
+                    build = server._ollama_response
+                else:
+                    self._send(404, {"error": f"unknown path {self.path}"})
+                    return
+                fail = server._begin()
+                try:
+                    server._delay()
+                    if fail:
+                        self._send(server.error_status, {"error": {"message": "injected error", "type": "stub"}})
+                    else:
+                        self._send(200, build(body))
+                finally:
+                    server._end()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local OpenAI/Ollama compatible LLM stub server.")
+    parser.add_argument('--host', type=str, default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.0, help='Fixed seconds per request')
+    parser.add_argument('--tokens-per-second', type=float, default=None, help='Simulated generation speed')
+    parser.add_argument('--completion-tokens', type=int, default=20, help='Simulated tokens per reply')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests failing')
+    parser.add_argument('--error-status', type=int, default=503, help='HTTP status of injected errors')
+    args = parser.parse_args()
+
+    server = LLMStubServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+    )
+    print(f"LLM stub serving OpenAI at {server.openai_base_url} and Ollama at {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-import spacy
 from typing import List, Dict, Optional
 
 from .caching import cached_file, cached_file_object
@@ -143,6 +142,8 @@ def merge_transcript_segments(
         config = MergeSentencesConfig()
 
     # Load spaCy model and add sentencizer
+    import spacy
+
     nlp = spacy.load(config.spacy_model)
     if "sentencizer" not in nlp.pipe_names:
         nlp.add_pipe("sentencizer")
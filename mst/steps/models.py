@@ -8,3 +8,7 @@ class CorrectedText(BaseModel):
 
 class Speaker_Mapping(BaseModel):
     speaker_mapping: dict[str, str]
+
+class TopicHeadlineSummary(BaseModel):
+    headline: str
+    summary: str
@@ -0,0 +1,186 @@
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .caching import ArtifactHash, get_cache_backend, load_manifest, load_step_output, step_key
+from .diarization import identify_speakers
+from .entities import extract_nouns
+from .helpers import post_process_transcript
+from .introductions import create_speaker_map, find_introductions
+from .merge_sentences import merge_transcript_segments
+from .standardize import correct_transcript
+from .transcription import initial_transcription
+from ..config import TranscriberConfig
+
+"""
+Plans pipeline runs backwards from the requested artifacts, loading the newest valid cached ones.
+"""
+
+
+class PipelineStep(NamedTuple):
+    """
+    One cached step of the pipeline.
+
+    Attributes:
+        title (str): Name printed when the step runs.
+        step (Callable): Function decorated with `cached_file_object`.
+        inputs (Dict[str, str]): Step argument -> cache extension of the upstream step producing it.
+        configs (Dict[str, str]): Step argument -> `TranscriberConfig` field passed to it.
+        resources (Tuple[str, ...]): Resource tags, such as "cpu" for model
+            inference or "llm" for LLM requests, limited by the scheduler.
+    """
+
+    title: str
+    step: Callable
+    inputs: Dict[str, str]
+    configs: Dict[str, str]
+    resources: Tuple[str, ...] = ()
+
+    @property
+    def output(self) -> str:
+        """Cache extension of the artifact the step produces."""
+        return self.step.cache_info.file_ext
+
+
+TRANSCRIPTION_STEPS = [
+    PipelineStep("Initial transcription", initial_transcription, {}, {"config": "transcription"}, ("cpu",)),
+    PipelineStep("Merge Sentences", merge_transcript_segments,
+                 {"segments": ".raw_transcript"}, {"config": "merge_sentences"}, ("cpu",)),
+    PipelineStep("Entity extraction", extract_nouns,
+                 {"transcript": ".sentence_merge"}, {"config": "entities", "llm_config": "llm"}, ("cpu", "llm")),
+    PipelineStep("Transcript correction", correct_transcript,
+                 {"raw_transcript": ".sentence_merge", "nouns": ".entities"}, {"config": "standardize"}, ("cpu",)),
+    PipelineStep("Diarization / Speaker identification", identify_speakers,
+                 {}, {"config": "diarization"}, ("cpu",)),
+    # Use raw transcript as sentence merge can cause timing mismatch
+    PipelineStep("Filter transcript by speaker introductions", find_introductions,
+                 {"transcripts": ".raw_transcript", "diarization": ".diarization"}, {"config": "introductions"},
+                 ("cpu",)),
+    PipelineStep("Extract persons from introductions", create_speaker_map,
+                 {"speaker_introductions": ".introductions", "speaker_mapping": ".diarization"},
+                 {"config": "introductions"}),
+    PipelineStep("Merge diarization, compress and map speaker names", post_process_transcript,
+                 {"transcript": ".corrected_transcript", "diarization": ".diarization", "speaker_to_name": ".speaker_map"},
+                 {"config": "cache"}),
+]
+
+
+class PipelinePlanner:
+    """
+    Runs the pipeline backwards from the requested artifacts.
+
+    The key every step would use is derived from the current configs and
+    the output hashes recorded in the manifest, without loading any
+    artifact. A requested artifact whose recorded key matches is loaded
+    directly; otherwise its step runs and its inputs are resolved the same
+    way. A fully cached meeting thus loads only the requested artifacts,
+    even if the intermediates were evicted, and never touches a model.
+    """
+
+    def __init__(self, config: Optional[TranscriberConfig] = None, steps: Iterable[PipelineStep] = TRANSCRIPTION_STEPS):
+        self.config = config or TranscriberConfig()
+        self.steps: List[PipelineStep] = list(steps)
+        self._by_output = {step.output: step for step in self.steps}
+
+    def _configs(self, step: PipelineStep) -> dict:
+        return {name: getattr(self.config, field) for name, field in step.configs.items()}
+
+    def valid_keys(self, video_path: str) -> Dict[str, str]:
+        """
+        Finds the cached artifacts that are valid for the current configs.
+
+        An artifact is valid if the manifest records it under the key its
+        step would use now, i.e. its own configs and the recorded outputs of
+        its upstream steps, all valid in turn, are unchanged.
+
+        Args:
+            video_path (str): Path to the video file.
+
+        Returns:
+            Dict[str, str]: Cache extension -> key of each valid artifact.
+        """
+        recorded = load_manifest(video_path)['artifacts']
+        valid = {}
+        for step in self.steps:
+            if not all(upstream in valid for upstream in step.inputs.values()):
+                continue
+            hashes = {name: ArtifactHash(recorded[upstream]['output']) for name, upstream in step.inputs.items()}
+            key = step_key(step.step, video_path, **hashes, **self._configs(step))
+            if recorded.get(step.output, {}).get('key') == key:
+                valid[step.output] = key
+        return valid
+
+    def number(self, step: PipelineStep) -> int:
+        """Returns the position of the step in the pipeline, counting from 1."""
+        return self.steps.index(step) + 1
+
+    def arguments(self, step: PipelineStep, values: dict) -> dict:
+        """
+        Builds the arguments of a step.
+
+        Args:
+            step (PipelineStep): The step.
+            values (dict): Cache extension -> artifact, holding the step's inputs.
+
+        Returns:
+            dict: Keyword arguments for the step function.
+        """
+        return {**{name: values[upstream] for name, upstream in step.inputs.items()}, **self._configs(step)}
+
+    def plan(self, video_path: str, targets: Iterable[str], skip: Iterable[str] = ()) -> Tuple[dict, List[PipelineStep]]:
+        """
+        Works backwards from the requested artifacts, loading the valid cached ones.
+
+        Args:
+            video_path (str): Path to the video file.
+            targets (Iterable[str]): Cache extensions of the requested artifacts.
+            skip (Iterable[str]): Steps not to run; their cached artifact is used as it is.
+
+        Returns:
+            tuple: Cache extension -> loaded artifact, and the steps to run, in pipeline order.
+        """
+        valid = self.valid_keys(video_path)
+        skip = set(skip)
+        values, run = {}, set()
+
+        def visit(output: str):
+            if output in values or output in run:
+                return
+            step = self._by_output[output]
+            if output in valid:
+                try:
+                    values[output] = load_step_output(step.step, video_path, valid[output])
+                    print(f'Step {self.number(step)}: {step.title} (cached)')
+                    return
+                except KeyError:
+                    pass
+            if output in skip:
+                print(f'Skipping step {self.number(step)}: {step.title}')
+                values[output] = get_cache_backend().load(video_path, output)
+                return
+            run.add(output)
+            for upstream in step.inputs.values():
+                visit(upstream)
+
+        for output in targets:
+            visit(output)
+        return values, [step for step in self.steps if step.output in run]
+
+    def run(self, video_path: str, targets: Iterable[str], skip: Iterable[str] = ()) -> dict:
+        """
+        Produces the requested artifacts, loading or running as little as possible.
+
+        The planned steps run one after another; see `PipelineScheduler` to
+        run independent steps concurrently.
+
+        Args:
+            video_path (str): Path to the video file.
+            targets (Iterable[str]): Cache extensions of the requested artifacts.
+            skip (Iterable[str]): Steps not to run; their cached artifact is used as it is.
+
+        Returns:
+            dict: Cache extension -> artifact, for the targets and whatever was resolved on the way.
+        """
+        values, steps = self.plan(video_path, targets, skip)
+        for step in steps:
+            print(f'Step {self.number(step)}: {step.title}')
+            values[step.output] = step.step(video_path, **self.arguments(step, values))
+        return values
@@ -0,0 +1,123 @@
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Optional
+
+from .caching import configure_cache, flush_cache_writes
+from .embeddings import configure_embedding_service
+from .planner import TRANSCRIPTION_STEPS, PipelinePlanner, PipelineStep
+from ..config import TranscriberConfig
+
+"""
+Runs the planned pipeline steps as a DAG, starting each step as soon as its inputs are ready.
+"""
+
+
+def _configure_worker(config: TranscriberConfig):
+    """Applies the pipeline configuration in a worker process."""
+    configure_embedding_service(config.embeddings)
+    configure_cache(config.cache)
+
+
+def _run_in_worker(step, video_path: str, arguments: dict):
+    result = step(video_path, **arguments)
+    # The parent relies on the artifact being stored when the step returns
+    flush_cache_writes()
+    return result
+
+
+class PipelineScheduler:
+    """
+    Runs independent pipeline steps concurrently.
+
+    The steps still to run are found by `PipelinePlanner`. A step starts as
+    soon as the artifacts it declares as inputs are available, so for example
+    diarization, which depends on the audio only, overlaps transcription.
+    At most `resource_limits[tag]` steps carrying a resource tag run at once,
+    which keeps model inference ("cpu") and LLM requests ("llm") from
+    oversubscribing the machine or the endpoint. Ready steps start in
+    pipeline order.
+
+    Steps run in a thread pool, or in a process pool if they carry a tag
+    of `process_resources`. Both pools are created on first use and kept,
+    so models loaded by worker processes stay loaded for the next video.
+    """
+
+    def __init__(self, config: Optional[TranscriberConfig] = None, steps: Iterable[PipelineStep] = TRANSCRIPTION_STEPS):
+        self.config = config or TranscriberConfig()
+        self.planner = PipelinePlanner(self.config, steps)
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _executor(self, step: PipelineStep) -> Executor:
+        scheduler = self.config.scheduler
+        with self._lock:
+            if set(step.resources) & set(scheduler.process_resources):
+                if self._processes is None:
+                    self._processes = ProcessPoolExecutor(
+                        scheduler.max_workers, initializer=_configure_worker, initargs=(self.config,)
+                    )
+                return self._processes
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(scheduler.max_workers, thread_name_prefix="pipeline-step")
+            return self._threads
+
+    def _fits(self, step: PipelineStep, in_use: Counter) -> bool:
+        limits = self.config.scheduler.resource_limits
+        return all(in_use[tag] < limits[tag] for tag in step.resources if tag in limits)
+
+    def _submit(self, step: PipelineStep, video_path: str, values: dict):
+        executor = self._executor(step)
+        arguments = self.planner.arguments(step, values)
+        if isinstance(executor, ProcessPoolExecutor):
+            return executor.submit(_run_in_worker, step.step, video_path, arguments)
+        return executor.submit(step.step, video_path, **arguments)
+
+    def run(self, video_path: str, targets: Iterable[str], skip: Iterable[str] = ()) -> dict:
+        """
+        Produces the requested artifacts, running ready steps concurrently.
+
+        Args:
+            video_path (str): Path to the video file.
+            targets (Iterable[str]): Cache extensions of the requested artifacts.
+            skip (Iterable[str]): Steps not to run; their cached artifact is used as it is.
+
+        Returns:
+            dict: Cache extension -> artifact, for the targets and whatever was resolved on the way.
+        """
+        values, waiting = self.planner.plan(video_path, targets, skip)
+        in_use = Counter()
+        running: Dict[object, PipelineStep] = {}
+        try:
+            while waiting or running:
+                for step in list(waiting):
+                    if len(running) >= self.config.scheduler.max_workers:
+                        break
+                    if all(upstream in values for upstream in step.inputs.values()) and self._fits(step, in_use):
+                        print(f'Step {self.planner.number(step)}: {step.title}')
+                        waiting.remove(step)
+                        in_use.update(step.resources)
+                        running[self._submit(step, video_path, values)] = step
+                if not running:
+                    raise RuntimeError(f"Pipeline steps can never start: {[step.title for step in waiting]}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    in_use.subtract(step.resources)
+                    values[step.output] = future.result()
+        except BaseException:
+            for future in running:
+                future.cancel()
+            # Steps already started finish before the error is raised
+            wait(running)
+            raise
+        return values
+
+    def shutdown(self):
+        """Stops the worker threads and processes."""
+        with self._lock:
+            for executor in (self._threads, self._processes):
+                if executor is not None:
+                    executor.shutdown()
+            self._threads = self._processes = None
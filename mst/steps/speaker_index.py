@@ -0,0 +1,138 @@
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Any, Optional, Tuple
+
+"""
+Sorted interval index over diarization turns for fast speaker lookups.
+"""
+
+
+class _CenteredNode:
+    """Node of a centered interval tree holding the turns that contain `center`."""
+
+    def __init__(self, center: float, by_start: List[int], by_end: List[int]):
+        self.center = center
+        self.by_start = by_start
+        self.by_end = by_end
+        self.left: Optional["_CenteredNode"] = None
+        self.right: Optional["_CenteredNode"] = None
+
+
+class SpeakerIndex:
+    """
+    Index over diarization turns answering max-overlap speaker queries.
+
+    A turn overlaps a query interval either because it contains the query
+    start, or because it starts inside the query. The turns containing a
+    point are found in a centered interval tree, and the turns starting
+    inside the query by bisecting the start times, so a lookup costs
+    O(log D + k) for the k overlapping turns of D, however long the turns.
+    """
+
+    def __init__(self, diarization: List[Dict[str, Any]]):
+        """
+        Builds the index.
+
+        Args:
+            diarization (List[Dict[str, Any]]): Speaker turns, each with
+                                                'start', 'end' and 'speaker'.
+        """
+        self.turns = sorted(diarization, key=lambda turn: turn['start'])
+        self._starts = [turn['start'] for turn in self.turns]
+        self._root = self._build(list(range(len(self.turns))))
+
+    def _build(self, indices: List[int]) -> Optional[_CenteredNode]:
+        if not indices:
+            return None
+        endpoints = sorted(value for i in indices for value in (self.turns[i]['start'], self.turns[i]['end']))
+        center = endpoints[len(endpoints) // 2]
+        left, right, here = [], [], []
+        for i in indices:
+            if self.turns[i]['end'] < center:
+                left.append(i)
+            elif self.turns[i]['start'] > center:
+                right.append(i)
+            else:
+                here.append(i)
+        node = _CenteredNode(
+            center,
+            by_start=here,
+            by_end=sorted(here, key=lambda i: self.turns[i]['end'], reverse=True),
+        )
+        node.left = self._build(left)
+        node.right = self._build(right)
+        return node
+
+    def _containing(self, point: float) -> List[int]:
+        """Indices of the turns with start <= point < end."""
+        hits = []
+        node = self._root
+        while node is not None:
+            if point < node.center:
+                # Every turn of the node ends at or after the center, past the point
+                for i in node.by_start:
+                    if self.turns[i]['start'] > point:
+                        break
+                    hits.append(i)
+                node = node.left
+            else:
+                # Every turn of the node starts at or before the center, so at or before the point
+                for i in node.by_end:
+                    if self.turns[i]['end'] <= point:
+                        break
+                    hits.append(i)
+                node = node.right if point > node.center else None
+        return hits
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def overlapping(self, start: float, end: float, margin: float = 0.0) -> List[int]:
+        """
+        Finds the turns whose margin-expanded interval overlaps [start, end].
+
+        Args:
+            start (float): Query start time in seconds.
+            end (float): Query end time in seconds.
+            margin (float): Seconds by which each turn is conceptually expanded
+                            on both sides.
+
+        Returns:
+            List[int]: Indices into `turns` of the candidate turns, in start order.
+        """
+        if start >= end:
+            return []
+        # Expanding the turns by the margin is expanding the query by it
+        low, high = start - margin, end + margin
+        inside = range(bisect_right(self._starts, low), bisect_left(self._starts, high))
+        if not margin:
+            # Without a margin, instantaneous turns overlap nothing
+            inside = [i for i in inside if self.turns[i]['start'] < self.turns[i]['end']]
+        return sorted(self._containing(low)) + list(inside)
+
+    def best_match(self, start: float, end: float, margin: float = 0.0) -> Tuple[Optional[str], float]:
+        """
+        Finds the speaker with the largest actual overlap with [start, end].
+
+        Candidate turns are selected with the margin applied, but the overlap
+        duration is measured against the unexpanded turn. Ties go to the
+        earliest turn.
+
+        Args:
+            start (float): Query start time in seconds.
+            end (float): Query end time in seconds.
+            margin (float): Margin in seconds used to select candidate turns.
+
+        Returns:
+            Tuple[Optional[str], float]: The matched speaker (None if no turn
+                                         overlaps) and the overlap duration,
+                                         rounded to two decimals.
+        """
+        best_speaker = None
+        max_overlap_duration = 0.0
+        for i in self.overlapping(start, end, margin):
+            turn = self.turns[i]
+            overlap_duration = round(max(0, min(end, turn['end']) - max(start, turn['start'])), 2)
+            if overlap_duration > max_overlap_duration:
+                max_overlap_duration = overlap_duration
+                best_speaker = turn['speaker']
+        return best_speaker, max_overlap_duration
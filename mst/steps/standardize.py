@@ -1,31 +1,32 @@
 import traceback
-from typing import List, Dict, Any, Optional
-from sentence_transformers import SentenceTransformer, util
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 
 from .caching import cached_file, cached_file_object
+from .embeddings import get_embedding_service
 from .helpers import flatten_texts
 from ..config import StandardizeConfig
 
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
 """
 Module for standardizing transcript text using AI-based phonetic similarity.
 """
 
-_noun_correction_models: Dict[str, SentenceTransformer] = {}
-
-
-def get_noun_correction_model(model_name: str = "paraphrase-MiniLM-L6-v2") -> SentenceTransformer:
+def get_noun_correction_model(model_name: str = "paraphrase-MiniLM-L6-v2") -> "SentenceTransformer":
     """
     Gets or initializes the sentence transformer model for noun standardization.
 
+    The model is owned by the shared embedding service, so other steps using
+    the same model reuse this instance.
+
     Args:
         model_name: Name of the SentenceTransformer model to load.
 
     Returns:
         SentenceTransformer: The initialized sentence transformer model.
     """
-    if model_name not in _noun_correction_models:
-        _noun_correction_models[model_name] = SentenceTransformer(model_name)
-    return _noun_correction_models[model_name]
+    return get_embedding_service().get_encoder(model_name)
 
 def standardize_nouns_ai(
     transcript: list,
@@ -35,6 +36,9 @@ def standardize_nouns_ai(
     """
     Standardizes nouns using AI-based phonetic similarity via embeddings, preserving line feeds.
 
+    The distinct words to compare are embedded in one request to the shared
+    embedding service rather than one encode call per word.
+
     Args:
         transcript (list): List of transcript segments with start, end, and transcript fields.
         noun_list (list): List of standard noun spellings.
@@ -46,11 +50,28 @@ def standardize_nouns_ai(
     if config is None:
         config = StandardizeConfig()
 
-    # Load the model
-    noun_correction_model = get_noun_correction_model(config.sentence_transformer_model)
+    service = get_embedding_service()
+    model_name = config.sentence_transformer_model
 
     # Compute embeddings for standard nouns
-    noun_embeddings = noun_correction_model.encode(noun_list, convert_to_tensor=True)
+    noun_embeddings = service.encode(noun_list, model_name)
+
+    # Compute embeddings for every distinct word that is not a standard noun
+    words_to_match = list(dict.fromkeys(
+        word.lower()
+        for row in transcript
+        for word in row['transcript'].split()
+        if word.lower() not in noun_list
+    ))
+    best_matches = {}
+    if words_to_match and len(noun_list):
+        from sentence_transformers import util
+
+        # Calculate cosine similarity with all standard nouns
+        similarities = util.cos_sim(service.encode(words_to_match, model_name), noun_embeddings)
+        max_similarities, best_match_idxs = similarities.max(dim=1)
+        for word_lower, max_similarity, best_match_idx in zip(words_to_match, max_similarities, best_match_idxs):
+            best_matches[word_lower] = (max_similarity.item(), best_match_idx.item())
 
     # Split transcript into lines, preserving line breaks
     output = []
@@ -74,12 +95,7 @@ def standardize_nouns_ai(
                 standardized_words.append(word)
                 continue
 
-            # Compute embedding for current word
-            word_embedding = noun_correction_model.encode(word_lower, convert_to_tensor=True)
-
-            # Calculate cosine similarity with all standard nouns
-            similarities = util.cos_sim(word_embedding, noun_embeddings)[0]
-            max_similarity, best_match_idx = similarities.max(), similarities.argmax()
+            max_similarity, best_match_idx = best_matches.get(word_lower, (0.0, None))
 
             # If similarity is high enough, replace with standard form
             if max_similarity > config.similarity_threshold:
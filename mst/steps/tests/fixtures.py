@@ -0,0 +1,49 @@
+import functools
+import os
+import tempfile
+import unittest
+
+from .. import caching
+from ..caching import cached_file, cached_file_object
+
+
+class CacheTestCase(unittest.TestCase):
+    """
+    Runs each test against a fresh media file and the default cache configuration.
+
+    Attributes:
+        tmp (str): Temporary directory holding the media file and its cache.
+        video_path (str): Media file, holding b"audio".
+        calls (list): Names of the steps made with `step` that computed, in order.
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(caching.configure_cache)
+        caching.configure_cache()
+        self.tmp = tmp.name
+        self.video_path = os.path.join(self.tmp, "meeting.wav")
+        with open(self.video_path, "wb") as file:
+            file.write(b"audio")
+        self.calls = []
+
+    def step(self, file_ext, func, text=False, **options):
+        """
+        Makes a cached step of `func` that records its calls in `calls`.
+
+        Args:
+            file_ext (str): Cache extension of the step.
+            func (callable): Step body, taking the video path first.
+            text (bool): Cache with `cached_file` instead of `cached_file_object`.
+            **options: Options of the decorator, such as `encode` or `ignore`.
+
+        Returns:
+            callable: The cached step.
+        """
+        @functools.wraps(func)
+        def record(video_path, *args, **kwargs):
+            self.calls.append(func.__name__)
+            return func(video_path, *args, **kwargs)
+
+        return (cached_file if text else cached_file_object)(file_ext, **options)(record)
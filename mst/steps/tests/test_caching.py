@@ -0,0 +1,413 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from .. import cache_manager, caching
+from ..caching import get_cache_file, load_object_file, save_object_file
+from ...config import CacheConfig, LLMConfig, StandardizeConfig, TopicConfig
+from .fixtures import CacheTestCase
+
+
+class TestContentAddressedCache(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        def upper(video_path, words, config=None):
+            return [word.upper() for word in words]
+
+        def count(video_path, words, verbose=False):
+            return {"count": len(words)}
+
+        self.upper = self.step('.upper', upper)
+        self.count = self.step('.count', count, ignore=('verbose',))
+
+    def run_steps(self, words, config=None, verbose=False):
+        return self.count(self.video_path, self.upper(self.video_path, words, config=config), verbose=verbose)
+
+    def test_reruns_only_changed_steps(self):
+        self.assertEqual(self.run_steps(["a", "b"]), {"count": 2})
+        self.run_steps(["a", "b"], verbose=True)
+        self.assertEqual(self.calls, ["upper", "count"])
+
+        self.run_steps(["a", "b"], config=StandardizeConfig(similarity_threshold=0.9))
+        # The new config reruns upper, whose identical output cuts off count
+        self.assertEqual(self.calls, ["upper", "count", "upper"])
+
+        self.run_steps(["a", "b", "c"])
+        self.assertEqual(self.calls, ["upper", "count", "upper", "upper", "count"])
+
+    def test_media_content_and_version_are_part_of_the_key(self):
+        self.run_steps(["a"])
+        with open(self.video_path, "wb") as file:
+            file.write(b"other audio")
+        os.utime(self.video_path, ns=(0, 0))
+        self.run_steps(["a"])
+        self.assertEqual(self.calls, ["upper", "count"] * 2)
+        key = caching.artifact_key(self.video_path, '.upper', {"words": ["a"]})
+        self.assertNotEqual(key, caching.artifact_key(self.video_path, '.upper', {"words": ["a"]}, version=2))
+
+    def test_manifest_and_legacy_artifacts(self):
+        # Artifacts without a manifest entry may come from any inputs, so they are recomputed
+        save_object_file(get_cache_file(self.video_path, '.upper'), ["LEGACY"])
+        self.assertEqual(self.upper(self.video_path, ["a"]), ["A"])
+        self.assertEqual(self.upper(self.video_path, ["a"]), ["A"])
+        self.assertEqual(self.calls, ["upper"])
+
+        self.count(self.video_path, ["A"])
+        manifest = caching.load_manifest(self.video_path)
+        self.assertEqual(manifest["artifacts"][".count"]["output"], caching.hash_value({"count": 1}))
+        self.assertEqual(manifest["media"]["sha256"], hashlib.sha256(b"audio").hexdigest())
+
+    def test_operational_config_fields_keep_the_key(self):
+        self.upper(self.video_path, ["a"], config=LLMConfig())
+        self.upper(self.video_path, ["a"], config=LLMConfig(priority="batch", response_cache=True, timeout=5.0))
+        self.assertEqual(self.calls, ["upper"])
+        self.upper(self.video_path, ["a"], config=LLMConfig(openai_base_url="http://other:9999/v1"))
+        self.assertEqual(self.calls, ["upper"] * 2)
+
+        self.upper(self.video_path, ["a"], config=TopicConfig())
+        self.upper(self.video_path, ["a"], config=TopicConfig(max_concurrency=16, embedding_cache_dir=None))
+        self.assertEqual(self.calls, ["upper"] * 3)
+        self.upper(self.video_path, ["a"], config=TopicConfig(headline_prompt="Write a headline."))
+        self.assertEqual(self.calls, ["upper"] * 4)
+
+    def test_inputs_without_content_hash_are_rejected(self):
+        with self.assertRaises(TypeError):
+            self.upper(self.video_path, ["a"], config=object())
+        self.assertEqual(self.calls, [])
+
+
+class TestCacheBackends(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.transcript = [{"start": 0.0, "end": 1.5, "transcript": "Hello.", "speaker": "SPEAKER_00"}]
+
+    def roundtrip(self, backend):
+        backend.save(self.video_path, ".raw_transcript", self.transcript)
+        backend.save_text(self.video_path, ".md", "# Meeting\n")
+        list(backend.stream(self.video_path, ".merged", iter(self.transcript)))
+        self.assertEqual(backend.load(self.video_path, ".raw_transcript"), self.transcript)
+        self.assertEqual(backend.load_text(self.video_path, ".md"), "# Meeting\n")
+        self.assertEqual(json.loads(backend.load_text(self.video_path, ".merged")), self.transcript)
+        self.assertEqual(backend.list(self.video_path), [".md", ".merged", ".raw_transcript"])
+        backend.delete(self.video_path, ".md")
+        self.assertFalse(backend.exists(self.video_path, ".md"))
+        backend.clear(self.video_path)
+        self.assertEqual(backend.list(self.video_path), [])
+
+    def test_file_backend(self):
+        self.roundtrip(caching.FileCacheBackend())
+
+    def test_sqlite_backends(self):
+        self.roundtrip(caching.SQLiteCacheBackend(serializer="json"))
+        self.roundtrip(caching.SQLiteCacheBackend(path=os.path.join(self.tmp, "corpus.sqlite")))
+
+    def test_sqlite_journal_mode(self):
+        def journal_mode(backend):
+            connection, _ = backend._database(self.video_path)
+            return connection.execute("PRAGMA journal_mode").fetchone()[0]
+
+        self.assertEqual(journal_mode(caching.SQLiteCacheBackend()), "wal")
+        # A corpus database may sit on a network filesystem shared by several hosts
+        corpus = os.path.join(self.tmp, "corpus.sqlite")
+        self.assertEqual(journal_mode(caching.SQLiteCacheBackend(path=corpus)), "delete")
+        self.assertEqual(journal_mode(caching.SQLiteCacheBackend(path=corpus, journal_mode="wal")), "wal")
+        caching.configure_cache(CacheConfig(cache_root=os.path.join(self.tmp, "root")))
+        self.assertEqual(journal_mode(caching.SQLiteCacheBackend()), "delete")
+
+    def test_decorated_steps_use_configured_backend(self):
+        caching.configure_cache(CacheConfig(backend="sqlite", sqlite_path=os.path.join(self.tmp, "corpus.sqlite")))
+
+        def value(video_path, value):
+            return {"value": value}
+
+        step = self.step(".steps", value)
+        self.assertEqual(step(self.video_path, 1), step(self.video_path, 1))
+        self.assertEqual(self.calls, ["value"])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, "meeting.d")))
+
+    def test_migrate_file_layout(self):
+        files = caching.FileCacheBackend()
+        files.save(self.video_path, ".raw_transcript", self.transcript)
+        files.save_text(self.video_path, ".md", "# Meeting\n")
+        target = caching.SQLiteCacheBackend()
+        migrated = caching.migrate_cache_directory(self.video_path, target, remove=True)
+        self.assertEqual(migrated, [".md", ".raw_transcript"])
+        self.assertEqual(files.list(self.video_path), [])
+        self.assertEqual(target.load(self.video_path, ".raw_transcript"), self.transcript)
+        self.assertEqual(target.load_text(self.video_path, ".md"), "# Meeting\n")
+
+
+class TestCacheLocking(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.lock_file = os.path.join(self.tmp, "cache.final.lock")
+
+    def write_lock(self, owner, age=0.0):
+        with open(self.lock_file, "w") as file:
+            json.dump(owner, file)
+        os.utime(self.lock_file, (time.time() - age, time.time() - age))
+
+    def test_concurrent_workers_compute_once(self):
+        def slow(video_path, value):
+            time.sleep(0.2)
+            return [value]
+
+        step = self.step(".slow", slow)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: step(self.video_path, 1), range(4)))
+        self.assertEqual(results, [[1]] * 4)
+        self.assertEqual(self.calls, ["slow"])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.tmp, "meeting.d"))), ["cache.manifest", "cache.slow"])
+
+    def test_breaks_stale_locks(self):
+        # Owner process no longer running on this host
+        self.write_lock({"host": socket.gethostname(), "pid": 2 ** 22 + 1})
+        with caching.ArtifactLock(self.lock_file, poll_interval=0.01, timeout=1.0):
+            self.assertTrue(os.path.exists(self.lock_file))
+        self.assertFalse(os.path.exists(self.lock_file))
+
+        # Owner on another node stopped refreshing the lock
+        self.write_lock({"host": "other-node", "pid": 1}, age=120)
+        with caching.ArtifactLock(self.lock_file, stale_after=60, poll_interval=0.01, timeout=1.0):
+            pass
+
+    def test_waits_for_live_locks(self):
+        self.write_lock({"host": "other-node", "pid": 1})
+        with self.assertRaises(TimeoutError):
+            caching.ArtifactLock(self.lock_file, poll_interval=0.01, timeout=0.1).acquire()
+        self.assertTrue(os.path.exists(self.lock_file))
+
+    def test_failed_writes_keep_previous_file(self):
+        cache_dir = os.path.join(self.tmp, "meeting.d")
+        os.makedirs(cache_dir)
+        cache_file = os.path.join(cache_dir, "cache.topics")
+        save_object_file(cache_file, [1])
+        with self.assertRaises(TypeError):
+            save_object_file(cache_file, [object()])
+        self.assertEqual(load_object_file(cache_file), [1])
+        self.assertEqual(os.listdir(cache_dir), ["cache.topics"])
+
+
+class TestSharedCacheRoot(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.media_dir = os.path.join(self.tmp, "media")
+        self.root = os.path.join(self.tmp, "shared")
+        os.makedirs(self.media_dir)
+        for name in ("meeting.wav", "meeting-redownload.wav"):
+            with open(os.path.join(self.media_dir, name), "wb") as file:
+                file.write(b"same audio")
+        os.chmod(self.media_dir, 0o555)
+        self.addCleanup(os.chmod, self.media_dir, 0o755)
+        caching.configure_cache(CacheConfig(cache_root=self.root))
+
+    def test_identical_media_share_artifacts(self):
+        def words(video_path, text):
+            return text.split()
+
+        step = self.step(".words", words)
+        first = os.path.join(self.media_dir, "meeting.wav")
+        second = os.path.join(self.media_dir, "meeting-redownload.wav")
+        self.assertEqual(step(first, "a b"), step(second, "a b"))
+        self.assertEqual(self.calls, ["words"])
+
+        digest = hashlib.sha256(b"same audio").hexdigest()
+        self.assertEqual(caching.get_cache_directory(second),
+                         os.path.join(self.root, "media", digest[:2], digest + ".d"))
+        self.assertEqual(caching.media_id(first), "sha256:" + digest)
+        aliases = [name for _, _, names in os.walk(os.path.join(self.root, "aliases")) for name in names]
+        self.assertEqual(len(aliases), 2)
+        # Nothing is written next to the read-only media
+        self.assertEqual(sorted(os.listdir(self.media_dir)), ["meeting-redownload.wav", "meeting.wav"])
+
+    def test_migrate_cache_root(self):
+        first = os.path.join(self.media_dir, "meeting.wav")
+        second = os.path.join(self.media_dir, "meeting-redownload.wav")
+        transcript = [{"start": 0.0, "end": 1.0, "text": "Hello."}]
+        caching.get_cache_backend().save(first, ".raw_transcript", transcript)
+        caching.media_digest(second)
+        # Both copies share one cache directory, so it is migrated once
+        self.assertEqual(caching.cache_root_media_paths(), [second])
+
+        target = caching.SQLiteCacheBackend(path=os.path.join(self.tmp, "corpus.sqlite"))
+        self.assertEqual(caching.migrate_cache_directory(second, target), [".raw_transcript"])
+        self.assertEqual(target.load(first, ".raw_transcript"), transcript)
+
+    def test_missing_media_keyed_by_path(self):
+        cache_dir = caching.get_cache_directory(os.path.join(self.media_dir, "missing.wav"))
+        self.assertTrue(cache_dir.startswith(os.path.join(self.root, "paths")))
+
+
+class TestCacheManager(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.root = os.path.join(self.tmp, "videos")
+        self.now = time.time()
+
+    def artifact(self, video, file_ext, size, age_days=0.0):
+        cache_dir = os.path.join(self.root, video + ".d")
+        os.makedirs(cache_dir, exist_ok=True)
+        path = os.path.join(cache_dir, "cache" + file_ext)
+        with open(path, "wb") as file:
+            file.write(b"x" * size)
+        accessed = self.now - age_days * 86400
+        os.utime(path, (accessed, accessed))
+        return path
+
+    def manager(self, **kwargs):
+        return cache_manager.CacheManager.from_config([self.root], CacheConfig(**kwargs))
+
+    def evicted(self, manager):
+        entries, _ = manager.scan()
+        return [os.path.relpath(entry.path, self.root) for entry in manager.plan(entries, now=self.now)]
+
+    def test_budget_evicts_cheap_and_old_artifacts_first(self):
+        self.artifact("a", ".final", 100, age_days=30)
+        self.artifact("a", ".raw_transcript", 100, age_days=30)
+        self.artifact("a", ".merged", 100, age_days=1)
+        self.artifact("b", ".merged", 100, age_days=2)
+        self.artifact("b", ".corrected_transcript", 100, age_days=3)
+        self.assertEqual(self.evicted(self.manager(gc_max_bytes=250)), [
+            os.path.join("b.d", "cache.merged"),
+            os.path.join("a.d", "cache.merged"),
+            os.path.join("b.d", "cache.corrected_transcript"),
+        ])
+        self.assertEqual(self.evicted(self.manager()), [])
+
+    def test_ttl_and_leftover_temporary_files(self):
+        self.artifact("a", ".md", 10, age_days=90)
+        self.artifact("a", ".topics", 10, age_days=90)
+        self.artifact("a", ".entities", 10, age_days=1)
+        self.artifact("a", ".final.1234.tmp", 10, age_days=1)
+        self.assertEqual(sorted(self.evicted(self.manager(gc_ttl_days=30))), [
+            os.path.join("a.d", "cache.final.1234.tmp"),
+            os.path.join("a.d", "cache.topics"),
+        ])
+
+    def test_collect_skips_in_flight_jobs(self):
+        self.artifact("a", ".merged", 100)
+        busy = self.artifact("b", ".merged", 100)
+        with caching.ArtifactLock(os.path.join(self.root, "b.d", "cache.final.lock")):
+            report = self.manager(gc_max_bytes=0).collect()
+        self.assertEqual(report["in_flight"], [os.path.join(self.root, "b.d")])
+        self.assertEqual((report["evicted"], report["freed_bytes"]), (1, 100))
+        self.assertTrue(os.path.exists(busy))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "a.d", "cache.merged")))
+
+    def test_parse_size(self):
+        self.assertEqual(cache_manager.parse_size("512"), 512)
+        self.assertEqual(cache_manager.parse_size("1.5K"), 1536)
+        self.assertEqual(cache_manager.parse_size("2GiB"), 2 * 1024 ** 3)
+
+
+class TestMemoryAndNegativeCache(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        def introductions(video_path, sentences):
+            return [sentence for sentence in sentences if "I'm" in sentence]
+
+        self.introductions = self.step(".introductions", introductions)
+
+    def test_empty_results_are_cached(self):
+        self.assertEqual(self.introductions(self.video_path, ["Hello."]), [])
+        caching.clear_memory_cache()
+        self.assertEqual(self.introductions(self.video_path, ["Hello."]), [])
+        self.assertEqual(self.calls, ["introductions"])
+
+    def test_empty_texts_are_cached(self):
+        def markdown(video_path, sentences):
+            return "".join(sentences)
+
+        markdown = self.step(".md", markdown, text=True)
+        self.assertEqual(markdown(self.video_path, []), "")
+        caching.clear_memory_cache()
+        self.assertEqual(markdown(self.video_path, []), "")
+        self.assertEqual(self.calls, ["markdown"])
+
+    def test_memory_tier_skips_the_backend(self):
+        self.introductions(self.video_path, ["I'm Pat."])
+        with mock.patch.object(caching.FileCacheBackend, "load", side_effect=AssertionError):
+            self.assertEqual(self.introductions(self.video_path, ["I'm Pat."]), ["I'm Pat."])
+        caching.clear_memory_cache(self.video_path)
+        self.assertEqual(self.introductions(self.video_path, ["I'm Pat."]), ["I'm Pat."])
+        self.assertEqual(len(self.calls), 1)
+
+    def test_memory_tier_is_bounded(self):
+        caching.configure_cache(CacheConfig(memory_cache_entries=1))
+        self.introductions(self.video_path, ["I'm Pat."])
+        self.introductions(self.video_path, ["I'm Sam."])
+        with mock.patch.object(caching.FileCacheBackend, "load", wraps=caching.FileCacheBackend().load) as load:
+            self.introductions(self.video_path, ["I'm Sam."])
+            self.assertEqual(load.call_count, 0)
+            # Evicted from memory, and the file now holds the other result
+            self.introductions(self.video_path, ["I'm Pat."])
+        self.assertEqual(len(self.calls), 3)
+
+
+class TestWriteBehind(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        caching.configure_cache(CacheConfig(write_behind=True, write_behind_queue=2))
+
+        def entities(video_path, sentences):
+            return {"Person": [{"text": sentence} for sentence in sentences]}
+
+        self.entities = self.step(".entities", entities)
+
+    def test_artifacts_are_written_behind_the_pipeline(self):
+        release = threading.Event()
+        save = caching.FileCacheBackend.save
+
+        def slow_save(backend, video_path, file_ext, value):
+            if file_ext == ".entities":
+                release.wait(5)
+            save(backend, video_path, file_ext, value)
+
+        with mock.patch.object(caching.FileCacheBackend, "save", slow_save):
+            result = self.entities(self.video_path, ["Pat"])
+            self.assertFalse(os.path.exists(get_cache_file(self.video_path, ".entities")))
+            # Served from the queue until written
+            caching.clear_memory_cache()
+            self.assertEqual(self.entities(self.video_path, ["Pat"]), result)
+            release.set()
+            caching.flush_cache_writes()
+        self.assertEqual(load_object_file(get_cache_file(self.video_path, ".entities")), result)
+        self.assertIn(".entities", caching.load_manifest(self.video_path)["artifacts"])
+        self.assertFalse(os.path.exists(get_cache_file(self.video_path, ".entities") + ".lock"))
+        self.assertEqual(self.calls, ["entities"])
+
+    def test_failed_writes_are_reported_on_flush(self):
+        save = caching.FileCacheBackend.save
+
+        def failing_save(backend, video_path, file_ext, value):
+            if file_ext == ".entities":
+                raise OSError("disk full")
+            save(backend, video_path, file_ext, value)
+
+        with mock.patch.object(caching.FileCacheBackend, "save", failing_save):
+            self.entities(self.video_path, ["Pat"])
+            with self.assertRaisesRegex(RuntimeError, "disk full"):
+                caching.flush_cache_writes()
+        self.assertFalse(os.path.exists(get_cache_file(self.video_path, ".entities")))
+        self.assertFalse(os.path.exists(get_cache_file(self.video_path, ".entities") + ".lock"))
+        # Reported once
+        caching.flush_cache_writes()
+
+
+if __name__ == "__main__":
+    unittest.main()
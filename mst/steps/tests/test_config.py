@@ -6,11 +6,14 @@ import os
 import unittest
 
 from ...config import (
+    CacheConfig,
     DiarizationConfig,
+    EmbeddingConfig,
     EntityConfig,
     IntroductionsConfig,
     LLMConfig,
     MergeSentencesConfig,
+    SchedulerConfig,
     StandardizeConfig,
     TopicConfig,
     TranscriptionConfig,
@@ -25,6 +28,12 @@ class TestLLMConfig(unittest.TestCase):
         self.assertEqual(cfg.provider, "openai")
         self.assertEqual(cfg.openai_base_url, "http://glm-flash.cluster:9999/v1")
         self.assertEqual(cfg.openai_api_key, "not-needed")
+        self.assertEqual(cfg.timeout, 120.0)
+        self.assertEqual(cfg.max_retries, 3)
+        self.assertFalse(cfg.response_cache)
+        self.assertEqual(cfg.async_max_concurrency, 8)
+        self.assertEqual(cfg.priority, "interactive")
+        self.assertIsNone(cfg.scheduler_requests_per_second)
 
     def test_custom_values(self):
         cfg = LLMConfig(provider="ollama", openai_base_url="http://localhost:11434", openai_api_key="key")
@@ -81,6 +90,9 @@ class TestIntroductionsConfig(unittest.TestCase):
         self.assertEqual(cfg.setfit_model, "gerald29/setfit-bge-small-v1.5-sst2-8-shot-introduction")
         self.assertAlmostEqual(cfg.speaker_map_margin, 1.0)
         self.assertAlmostEqual(cfg.entity_map_margin, 0.5)
+        self.assertEqual(cfg.batch_size, 64)
+        self.assertTrue(cfg.candidate_filter)
+        self.assertEqual(cfg.first_turns_per_speaker, 2)
 
 
 class TestTopicConfig(unittest.TestCase):
@@ -88,10 +100,59 @@ class TestTopicConfig(unittest.TestCase):
     def test_defaults(self):
         cfg = TopicConfig()
         self.assertEqual(cfg.topic_model, "glm-4.7-flash")
+        self.assertEqual(cfg.topic_tree_depth, 32)
+        self.assertEqual(cfg.embedding_batch_size, 64)
+        self.assertEqual(cfg.max_concurrency, 4)
+        self.assertFalse(cfg.combined_generation)
+        self.assertFalse(cfg.map_reduce_generation)
+        self.assertIsNone(cfg.tokenizer)
+        self.assertEqual(cfg.default_context_limit, 8192)
+        self.assertFalse(cfg.extractive_compression)
+        self.assertEqual(cfg.extractive_token_budget, 1024)
         self.assertIn("headline", cfg.headline_prompt.lower())
         self.assertIn("summary", cfg.summary_prompt.lower())
 
 
+class TestCacheConfig(unittest.TestCase):
+
+    def test_defaults(self):
+        cfg = CacheConfig()
+        self.assertFalse(cfg.write_merged)
+        self.assertFalse(cfg.write_compressed)
+        self.assertIsNone(cfg.cache_root)
+        self.assertEqual(cfg.memory_cache_entries, 32)
+        self.assertFalse(cfg.write_behind)
+        self.assertEqual(cfg.write_behind_queue, 8)
+        self.assertEqual(cfg.backend, "file")
+        self.assertIsNone(cfg.sqlite_path)
+        self.assertEqual(cfg.serializer, "json")
+        self.assertIsNone(cfg.compression)
+        self.assertEqual(cfg.lock_stale_after, 60.0)
+        self.assertIsNone(cfg.lock_timeout)
+        self.assertIsNone(cfg.gc_max_bytes)
+        self.assertEqual(cfg.gc_keep, [".final", ".md", ".manifest"])
+        self.assertEqual(cfg.gc_eviction_order[0], ".merged")
+        self.assertEqual(cfg.gc_eviction_order[-1], ".raw_transcript")
+
+
+class TestEmbeddingConfig(unittest.TestCase):
+
+    def test_defaults(self):
+        cfg = EmbeddingConfig()
+        self.assertIsNone(cfg.shared_model)
+        self.assertEqual(cfg.max_batch_size, 64)
+        self.assertEqual(cfg.cache_size, 20000)
+
+
+class TestSchedulerConfig(unittest.TestCase):
+
+    def test_defaults(self):
+        cfg = SchedulerConfig()
+        self.assertEqual(cfg.max_workers, 4)
+        self.assertEqual(cfg.resource_limits, {"cpu": 2, "llm": 4})
+        self.assertEqual(cfg.process_resources, [])
+
+
 class TestTranscriberConfig(unittest.TestCase):
 
     def test_no_args_construction(self):
@@ -105,13 +166,16 @@ class TestTranscriberConfig(unittest.TestCase):
         self.assertIsInstance(cfg.diarization, DiarizationConfig)
         self.assertIsInstance(cfg.introductions, IntroductionsConfig)
         self.assertIsInstance(cfg.topic, TopicConfig)
+        self.assertIsInstance(cfg.cache, CacheConfig)
+        self.assertIsInstance(cfg.embeddings, EmbeddingConfig)
+        self.assertIsInstance(cfg.scheduler, SchedulerConfig)
 
     def test_from_env_defaults(self):
         """from_env() with no env vars set should match pure defaults."""
         env_backup = {}
         env_vars = [
             "LLM_PROVIDER", "OPENAI_BASE_URL", "OPENAI_API_KEY",
-            "HF_TOKEN", "SIMILAR_NAMES_MODEL", "TOPIC_MODEL",
+            "HF_TOKEN", "SIMILAR_NAMES_MODEL", "TOPIC_MODEL", "MST_CACHE_ROOT",
         ]
         # Remove any env vars to test defaults
         for var in env_vars:
@@ -125,6 +189,7 @@ class TestTranscriberConfig(unittest.TestCase):
             self.assertIsNone(cfg.diarization.hf_token)
             self.assertEqual(cfg.entities.similar_names_model, "glm-4.7-flash")
             self.assertEqual(cfg.topic.topic_model, "glm-4.7-flash")
+            self.assertIsNone(cfg.cache.cache_root)
         finally:
             # Restore env vars
             for var, val in env_backup.items():
@@ -137,17 +202,20 @@ class TestTranscriberConfig(unittest.TestCase):
         os.environ["HF_TOKEN"] = "test-hf-token"
         os.environ["SIMILAR_NAMES_MODEL"] = "custom-model"
         os.environ["TOPIC_MODEL"] = "my-topic-model"
+        os.environ["MST_CACHE_ROOT"] = "/mnt/shared/mst"
         try:
             cfg = TranscriberConfig.from_env()
             self.assertEqual(cfg.llm.provider, "ollama")
             self.assertEqual(cfg.diarization.hf_token, "test-hf-token")
             self.assertEqual(cfg.entities.similar_names_model, "custom-model")
             self.assertEqual(cfg.topic.topic_model, "my-topic-model")
+            self.assertEqual(cfg.cache.cache_root, "/mnt/shared/mst")
         finally:
             del os.environ["LLM_PROVIDER"]
             del os.environ["HF_TOKEN"]
             del os.environ["SIMILAR_NAMES_MODEL"]
             del os.environ["TOPIC_MODEL"]
+            del os.environ["MST_CACHE_ROOT"]
 
 
 if __name__ == "__main__":
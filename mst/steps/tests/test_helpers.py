@@ -1,9 +1,41 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
 import unittest
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import mock
 
+import httpx
+import numpy as np
+import openai
 
-from ..introductions import map_entities_to_speakers
+
+from ..introductions import map_entities_to_speakers, select_introduction_candidates
 from ..merge_sentences import merge_transcript_segments, _map_sentences_to_segments
-from ..helpers import compress_transcript
+from ..helpers import compress_transcript, map_speakers, merge_transcript_diarization, post_process_transcript
+from ..speaker_index import SpeakerIndex
+from ..transcript import Transcript
+from .. import helpers, introductions, topic_segmentation
+from ..tokens import register_token_counter, split_text_by_tokens
+from .. import extractive
+from ..embeddings import EmbeddingService
+from .. import standardize
+from .. import llm_client
+from ..llm_cache import LLMResponseCache, request_key
+from ..llm_scheduler import LLMScheduler
+from ..models import NounList, TopicHeadlineSummary
+from ..llm_stub import LLMStubServer
+from .. import caching
+from ..caching import get_cache_file, load_object_file, save_object_file
+from ...config import (
+    CacheConfig, EmbeddingConfig, IntroductionsConfig, LLMConfig, TopicConfig,
+)
 
 class TestMapSpeakers(unittest.TestCase):
 
@@ -174,6 +206,75 @@ class TestMapSpeakers(unittest.TestCase):
         self.assertEqual(speaker_map[2]['matched_speaker'],'SPEAKER_00')        
 
             
+
+
+class TestSpeakerIndex(unittest.TestCase):
+
+    def diarization(self):
+        return [
+            {"start": 32, "end": 52.79, "speaker": "SPEAKER_03"},
+            {"start": 3.0, "end": 17.1, "speaker": "SPEAKER_01"},
+            {"start": 53.23, "end": 71.20, "speaker": "SPEAKER_04"},
+            {"start": 17.3, "end": 30.5, "speaker": "SPEAKER_02"},
+        ]
+
+    def test_turns_sorted(self):
+        index = SpeakerIndex(self.diarization())
+        self.assertEqual([turn["speaker"] for turn in index.turns],
+                         ["SPEAKER_01", "SPEAKER_02", "SPEAKER_03", "SPEAKER_04"])
+
+    def test_overlapping_with_margin(self):
+        index = SpeakerIndex(self.diarization())
+        self.assertEqual(index.overlapping(30.8, 31.5), [])
+        self.assertEqual(index.overlapping(30.8, 31.6, margin=0.5), [1, 2])
+
+    def test_best_match(self):
+        index = SpeakerIndex(self.diarization())
+        self.assertEqual(index.best_match(16.0, 20.0), ("SPEAKER_02", 2.7))
+        self.assertEqual(index.best_match(100.0, 105.0, margin=1.0), (None, 0.0))
+
+    def test_nested_turns(self):
+        index = SpeakerIndex([
+            {"start": 0.0, "end": 100.0, "speaker": "SPEAKER_LONG"},
+            {"start": 40.0, "end": 45.0, "speaker": "SPEAKER_SHORT"},
+        ])
+        self.assertEqual(index.overlapping(80.0, 90.0), [0])
+        self.assertEqual(index.best_match(80.0, 90.0), ("SPEAKER_LONG", 10.0))
+
+    def test_early_long_turn_does_not_slow_lookups(self):
+        diarization = [{"start": 0.0, "end": 1000.0, "speaker": "SPEAKER_CHAIR"}] + [
+            {"start": float(i), "end": i + 1.0, "speaker": f"SPEAKER_{i % 5}"} for i in range(1000)
+        ]
+        index = SpeakerIndex(diarization)
+
+        class CountingTurns(list):
+            reads = 0
+
+            def __getitem__(self, i):
+                CountingTurns.reads += 1
+                return super().__getitem__(i)
+
+        index.turns = CountingTurns(index.turns)
+        hits = index.overlapping(900.2, 901.5)
+        self.assertEqual([index.turns[i]["speaker"] for i in hits], ["SPEAKER_CHAIR", "SPEAKER_0", "SPEAKER_1"])
+        # The turns between the long one and the query are never visited
+        self.assertLess(CountingTurns.reads, 40)
+        self.assertEqual(index.overlapping(999.5, 1000.5), [0, 1000])
+
+    def test_empty(self):
+        index = SpeakerIndex([])
+        self.assertEqual(index.best_match(0.0, 1.0), (None, 0.0))
+
+    def test_merge_uses_max_overlap_speaker(self):
+        transcript = [{"start": 3.0, "end": 8.0, "transcript": "Thank you."}]
+        diarization = [
+            {"start": 2.0, "end": 7.0, "speaker": "SPEAKER_01"},
+            {"start": 3.0, "end": 4.0, "speaker": "SPEAKER_02"},
+        ]
+        merged = merge_transcript_diarization(None, transcript, diarization)
+        # After the short turn ends, the longer turn is still talking
+        self.assertEqual((merged[-1]["start"], merged[-1]["end"], merged[-1]["speaker"]), (4.0, 8.0, "SPEAKER_01"))
+
         
 from ..merge_sentences import merge_transcript_segments
         
@@ -269,7 +370,896 @@ class TestTranscriberCompress(unittest.TestCase):
             "speaker": "SPEAKER_00",
             "duration": 3.51})
 
-    
+
+class TestTranscript(unittest.TestCase):
+
+    def records(self):
+        return [
+            {"start": 0.0, "end": 2.5, "transcript": "Good evening.", "speaker": "SPEAKER_00", "duration": 2.5},
+            {"start": 2.5, "end": 4.0, "transcript": "Thank you.", "speaker": "SPEAKER_01", "duration": 1.5},
+            {"start": 4.0, "end": 9.0, "transcript": "I call this meeting to order.", "speaker": "SPEAKER_00", "duration": 5.0},
+        ]
+
+    def test_round_trip(self):
+        transcript = Transcript.from_records(self.records())
+        self.assertEqual(len(transcript), 3)
+        self.assertEqual(transcript.to_records(), self.records())
+
+    def test_slice_is_view(self):
+        transcript = Transcript.from_records(self.records())
+        view = transcript[1:]
+        self.assertEqual(view.to_records(), self.records()[1:])
+        self.assertEqual(view[-1]["transcript"], "I call this meeting to order.")
+        self.assertIs(view.start.obj, transcript.start.obj)
+
+    def test_topics(self):
+        records = [record | {"topic": topic} for record, topic in zip(self.records(), [0, None, 1])]
+        transcript = Transcript.from_records(records)
+        self.assertEqual(transcript.topic_at(1), None)
+        self.assertEqual(transcript.to_records(), records)
+
+    def test_fields_missing_from_the_first_record(self):
+        records = [{"start": 0.0, "end": 2.0, "transcript": "Good evening."}] + self.records()[1:]
+        records[2] = records[2] | {"topic": 1}
+        transcript = Transcript.from_records(records)
+        self.assertEqual(transcript[0], records[0] | {"speaker": None, "duration": 2.0, "topic": None})
+        self.assertEqual(transcript[1:].to_records(), [records[1] | {"topic": None}, records[2]])
+
+    def test_unknown_fields_are_kept(self):
+        records = self.records()
+        records[1] = records[1] | {"words": [{"word": "Thanks", "probability": 0.9}]}
+        records[2] = records[2] | {"confidence": 0.8}
+        transcript = Transcript.from_records(records)
+        self.assertEqual(transcript.to_records(), records)
+        self.assertEqual(transcript[1:].to_records(), records[1:])
+        self.assertEqual(transcript.take([2, 0]).to_records(), [records[2], records[0]])
+        self.assertEqual(map_speakers(None, transcript, {})[1]["words"], records[1]["words"])
+
+    def test_map_speakers(self):
+        mapped = map_speakers(None, self.records(), {"SPEAKER_00": "Doug Lucente"})
+        self.assertEqual([entry["speaker_name"] for entry in mapped],
+                         ["Doug Lucente", "SPEAKER_01", "Doug Lucente"])
+        self.assertEqual([entry["speaker"] for entry in mapped],
+                         ["SPEAKER_00", "SPEAKER_01", "SPEAKER_00"])
+
+    def test_compress_keeps_distinct_entries(self):
+        compressed = compress_transcript(None, Transcript.from_records(self.records()))
+        self.assertEqual(compressed, self.records())
+
+
+
+class TestPostProcessTranscript(unittest.TestCase):
+
+    def inputs(self):
+        transcript = [
+            {"start": 0.0, "end": 2.0, "transcript": "Good evening."},
+            {"start": 2.0, "end": 6.0, "transcript": "I'm Patrick Mayor, Precinct 3."},
+            {"start": 8.0, "end": 9.0, "transcript": "Thank you."},
+        ]
+        diarization = [
+            {"start": 0.0, "end": 2.2, "speaker": "SPEAKER_00"},
+            {"start": 2.2, "end": 6.5, "speaker": "SPEAKER_01"},
+            {"start": 7.5, "end": 9.0, "speaker": "SPEAKER_00"},
+        ]
+        return transcript, diarization, {"SPEAKER_01": "Patrick Mayor"}
+
+    def test_matches_separate_steps(self):
+        transcript, diarization, speaker_map = self.inputs()
+        merged = merge_transcript_diarization(None, transcript, diarization)
+        expected = map_speakers(None, compress_transcript(None, merged), speaker_map)
+        fused = post_process_transcript(None, transcript, diarization, speaker_map)
+        self.assertEqual(fused, expected)
+
+    def test_cache_policy(self):
+        transcript, diarization, speaker_map = self.inputs()
+        with tempfile.TemporaryDirectory() as tmp:
+            video_path = os.path.join(tmp, "meeting.wav")
+            post_process_transcript(video_path, transcript, diarization, speaker_map,
+                                    config=CacheConfig(write_compressed=True))
+            cached = sorted(os.listdir(os.path.join(tmp, "meeting.d")))
+        self.assertEqual(cached, ["cache.compressed", "cache.final", "cache.manifest"])
+
+    def test_intermediates_are_keyed_like_the_separate_steps(self):
+        transcript, diarization, speaker_map = self.inputs()
+        with tempfile.TemporaryDirectory() as tmp:
+            video_path = os.path.join(tmp, "meeting.wav")
+            post_process_transcript(video_path, transcript, diarization, speaker_map,
+                                    config=CacheConfig(write_merged=True, write_compressed=True))
+            caching.clear_memory_cache()
+            with mock.patch.object(helpers, "iter_merged_segments", side_effect=AssertionError), \
+                    mock.patch.object(helpers, "_compress_columns", side_effect=AssertionError):
+                merged = merge_transcript_diarization(video_path, transcript, diarization)
+                compressed = compress_transcript(video_path, merged)
+            artifacts = caching.load_manifest(video_path)["artifacts"]
+        self.assertEqual(artifacts[".merged"]["output"], caching.hash_value(merged))
+        self.assertEqual(map_speakers(None, compressed, speaker_map),
+                         post_process_transcript(None, transcript, diarization, speaker_map))
+
+
+
+class TestIntroductionCandidates(unittest.TestCase):
+
+    def transcript(self):
+        return [
+            {"start": 0.0, "end": 2.0, "transcript": "Good evening everyone."},
+            {"start": 2.0, "end": 4.0, "transcript": "Let's get started."},
+            {"start": 4.0, "end": 6.0, "transcript": "First item on the agenda."},
+            {"start": 6.0, "end": 9.0, "transcript": "My name is Alice Wonderland."},
+            {"start": 9.0, "end": 12.0, "transcript": "The budget is attached."},
+        ]
+
+    def test_lexical_cues_only(self):
+        config = IntroductionsConfig(first_turns_per_speaker=0)
+        transcript = self.transcript() + [
+            {"start": 12.0, "end": 14.0, "transcript": "I'm not sure this is right."},
+            {"start": 14.0, "end": 16.0, "transcript": "Hi, I'm Councilor Bob Smith."},
+        ]
+        self.assertEqual(select_introduction_candidates(transcript, [], config), [3, 6])
+
+    def test_first_turns_per_speaker(self):
+        diarization = [
+            {"start": 0.0, "end": 4.0, "speaker": "SPEAKER_00"},
+            {"start": 4.0, "end": 6.0, "speaker": "SPEAKER_01"},
+            {"start": 6.0, "end": 9.0, "speaker": "SPEAKER_00"},
+            {"start": 9.0, "end": 12.0, "speaker": "SPEAKER_01"},
+        ]
+        config = IntroductionsConfig(first_turns_per_speaker=1)
+        # Both segments of the first turn of SPEAKER_00 count as one turn
+        self.assertEqual(select_introduction_candidates(self.transcript(), diarization, config), [0, 1, 2, 3])
+
+
+class FakeHead:
+    def __init__(self, predictions):
+        self.predictions = predictions
+
+    def predict(self, embeddings):
+        return self.predictions[:len(embeddings)]
+
+
+class TestIntroductionLabels(unittest.TestCase):
+
+    def predict(self, predictions, labels):
+        encoder = CharacterEncoder()
+        service = EmbeddingService()
+        service.register_encoder("setfit", encoder)
+        imodel = SimpleNamespace(
+            has_differentiable_head=False, normalize_embeddings=False,
+            model_head=FakeHead(predictions), labels=labels,
+        )
+        config = IntroductionsConfig(setfit_model="setfit", batch_size=3)
+        with mock.patch.object(introductions, "get_embedding_service", return_value=service):
+            result = introductions._predict_introduction_labels(imodel, ["My name is Alice.", "Budget."], config)
+        self.assertEqual(encoder.batch_sizes, [3])
+        return result
+
+    def test_class_indices_are_mapped_to_labels(self):
+        self.assertEqual(self.predict(np.array([1, 0]), ["other", "introduction"]), ["introduction", "other"])
+
+    def test_string_labels_are_kept(self):
+        predictions = np.array(["introduction", "other"], dtype=object)
+        self.assertEqual(self.predict(predictions, ["other", "introduction"]), ["introduction", "other"])
+
+
+
+class FakeLLMClient:
+    """Records concurrency and echoes the last line of the prompt."""
+
+    def __init__(self, delay=0.05, barrier=None):
+        self.delay = delay
+        self.barrier = barrier
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def chat(self, model, messages, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.barrier is not None:
+                self.barrier.wait(5)
+            time.sleep(self.delay)
+            text = messages[-1]['content'].splitlines()[-1]
+            if text == "fail":
+                raise RuntimeError("endpoint unavailable")
+            return text.upper()
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def parse(self, model, messages, response_model, **kwargs):
+        text = messages[-1]['content'].splitlines()[-1]
+        if text == "invalid":
+            raise ValueError("LLM structured output returned None")
+        return response_model(headline=text.upper(), summary=f"About {text}.")
+
+
+class TestTopicOutputs(unittest.TestCase):
+
+    def test_concurrent_generation_keeps_order(self):
+        client = FakeLLMClient()
+        texts = ["budget", "", "fail", "zoning", "parks", "schools"]
+        with mock.patch.object(topic_segmentation, "get_llm_client", return_value=client):
+            outputs = topic_segmentation._generate_topic_outputs(None, texts, "Prompt", max_concurrency=3)
+        self.assertEqual(outputs, [
+            "BUDGET", "", "Error: Could not generate LLM output for topic 2", "ZONING", "PARKS", "SCHOOLS",
+        ])
+        self.assertLessEqual(client.max_in_flight, 3)
+        self.assertGreater(client.max_in_flight, 1)
+
+    def test_headlines_and_summary_share_one_wave(self):
+        # All six requests must be in flight at once to pass the barrier
+        client = FakeLLMClient(barrier=threading.Barrier(6))
+        transcript = [{"start": float(i), "end": i + 1.0, "transcript": text, "topic": i}
+                      for i, text in enumerate(["budget", "zoning", "parks"])]
+        with mock.patch.object(topic_segmentation, "get_llm_client", return_value=client):
+            headlines, summary = topic_segmentation.prepare_and_generate_headlines_and_summary(
+                None, transcript, config=TopicConfig(max_concurrency=6)
+            )
+        self.assertEqual(headlines, ["BUDGET", "ZONING", "PARKS"])
+        self.assertEqual(summary, headlines)
+        self.assertLessEqual(client.max_in_flight, 6)
+
+    def test_combined_generation_is_cached_as_its_own_step(self):
+        transcript = [
+            {"start": 0.0, "end": 1.0, "transcript": "budget", "topic": 0},
+            {"start": 1.0, "end": 2.0, "transcript": "invalid", "topic": 1},
+        ]
+        config = TopicConfig(combined_generation=True)
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(topic_segmentation, "get_llm_client", return_value=FakeLLMClient(delay=0)):
+            video_path = os.path.join(tmp, "meeting.wav")
+            headlines, summary = topic_segmentation.prepare_and_generate_headlines_and_summary(
+                video_path, transcript, config=config
+            )
+            with mock.patch.object(topic_segmentation, "get_llm_client", side_effect=AssertionError):
+                cached = topic_segmentation.prepare_and_generate_headlines_and_summary(
+                    video_path, transcript, config=config
+                )
+            manifest = caching.load_manifest(video_path)["artifacts"]
+        self.assertEqual(headlines, ["BUDGET", "INVALID"])
+        self.assertEqual(summary, ["About budget.", "INVALID"])
+        self.assertEqual(cached, (headlines, summary))
+        self.assertIn(topic_segmentation.EXTENSION_TOPIC_OUTPUTS, manifest)
+        self.assertNotIn(topic_segmentation.EXTENSION_TOPIC_HEADLINES, manifest)
+
+    def test_cached_outputs_skip_map_reduce(self):
+        transcript = [{"start": 0.0, "end": 1.0, "transcript": "budget", "topic": 0}]
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(topic_segmentation, "get_llm_client", return_value=FakeLLMClient(delay=0)):
+            video_path = os.path.join(tmp, "meeting.wav")
+            first = topic_segmentation.prepare_and_generate_headlines_and_summary(video_path, transcript)
+            with mock.patch.object(topic_segmentation, "_prepare_topic_texts", side_effect=AssertionError):
+                second = topic_segmentation.prepare_and_generate_headlines_and_summary(video_path, transcript)
+        self.assertEqual(first, (["BUDGET"], ["BUDGET"]))
+        self.assertEqual(second, first)
+
+
+
+class FirstWordClient:
+    """Summarizes a transcript section down to its first word."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, model, messages, **kwargs):
+        self.calls += 1
+        word = messages[-1]['content'].splitlines()[-1].split()[0]
+        if word == "Fail":
+            raise RuntimeError("endpoint unavailable")
+        return word
+
+
+class TestMapReduceTopics(unittest.TestCase):
+
+    def setUp(self):
+        register_token_counter("words", lambda text: len(text.split()))
+
+    def config(self):
+        return TopicConfig(
+            map_reduce_generation=True, tokenizer="words", default_context_limit=11, reserved_output_tokens=0,
+            headline_prompt="Headline", summary_prompt="Summary", combined_prompt="Both", chunk_prompt="Condense",
+        )
+
+    def test_split_text_by_tokens(self):
+        text = "One two three. Four five six. Seven eight nine ten eleven twelve."
+        chunks = split_text_by_tokens(text, 6, lambda text: len(text.split()))
+        self.assertEqual(chunks, ["One two three. Four five six.", "Seven eight nine ten eleven twelve."])
+
+    def test_only_oversized_topics_are_condensed(self):
+        texts = [
+            "Budget one two three four five. Zoning one two three four five. Parks one two three four five.",
+            "Short topic.",
+        ]
+        client = FirstWordClient()
+        with mock.patch.object(topic_segmentation, "get_llm_client", return_value=client):
+            fitted = topic_segmentation._fit_topic_texts_to_context(texts, self.config())
+        self.assertEqual(fitted, ["Budget\nZoning\nParks", "Short topic."])
+        self.assertEqual(client.calls, 3)
+
+    def test_failed_chunks_fall_back_to_their_text(self):
+        texts = ["Fail one two. Three four five six. Budget one two three four five. Zoning one two three four five."]
+        client = FirstWordClient()
+        with mock.patch.object(topic_segmentation, "get_llm_client", return_value=client):
+            fitted = topic_segmentation._fit_topic_texts_to_context(texts, self.config())
+        # The failed chunk keeps the sentences fitting a third of the budget
+        self.assertEqual(fitted, ["Fail one two.\nBudget\nZoning"])
+
+
+class FakeSentenceModel:
+    """Embeds sentences mentioning the budget close to the topic centroid."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True):
+        self.calls.append(list(sentences))
+        return np.array([[1.0, 0.1] if "budget" in s.lower() else [0.1, 1.0] for s in sentences])
+
+
+class TestExtractiveCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.model = FakeSentenceModel()
+        service = EmbeddingService()
+        service.register_encoder("paraphrase-MiniLM-L6-v2", self.model)
+        patcher = mock.patch.object(extractive, "get_embedding_service", return_value=service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_keeps_central_sentences_in_order(self):
+        sentences = ["Parks opened.", "The budget grew.", "The budget passed.", "Budget cuts loom.", "Roads closed."]
+        condensed = extractive.select_central_sentences(sentences, 2, lambda text: 1)
+        self.assertEqual(condensed, "The budget grew. The budget passed.")
+
+    def test_text_within_budget_is_unchanged(self):
+        sentences = ["The budget grew.", "Parks opened."]
+        self.assertEqual(extractive.select_central_sentences(sentences, 10, lambda text: 1),
+                         "The budget grew. Parks opened.")
+        self.assertEqual(self.model.calls, [])
+
+    def test_prepare_topic_texts_condenses_each_topic(self):
+        transcript = [
+            {"transcript": "The budget grew.", "topic": 0},
+            {"transcript": "Parks opened.", "topic": 0},
+            {"transcript": "The budget passed.", "topic": 0},
+            {"transcript": "Short topic.", "topic": 1},
+        ]
+        config = TopicConfig(extractive_compression=True, extractive_token_budget=10)
+        texts = topic_segmentation._prepare_topic_texts(transcript, config)
+        self.assertEqual(texts, ["The budget grew. The budget passed.", "Short topic."])
+
+
+
+class FakeTreeSeg:
+    """Splits in a fixed order, embedding every entry on each run like TreeSeg."""
+
+    instances = 0
+    split_order = [6, 3, 8, 1]
+
+    def __init__(self, configs, entries):
+        FakeTreeSeg.instances += 1
+        self.configs = configs
+        self.entries = entries
+
+    def segment_meeting(self, K):
+        embed = self.configs["EMBEDDINGS"].embeddings_func
+        for entry in self.entries:
+            embed(entry["transcript"])
+        transitions = [0] * len(self.entries)
+        for i in self.split_order[:K - 1]:
+            transitions[i] = 1
+        return transitions
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = 0
+        self.embeddings_func = self.embed
+
+    def embed(self, text):
+        self.calls += 1
+        return [float(len(text))]
+
+
+class TestTopicTree(unittest.TestCase):
+
+    def setUp(self):
+        FakeTreeSeg.instances = 0
+        patcher = mock.patch.object(topic_segmentation, "TreeSeg", FakeTreeSeg)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.embeddings = FakeEmbeddings()
+        self.config = {"EMBEDDINGS": self.embeddings, "TEXT_KEY": "transcript"}
+        self.topic_config = TopicConfig(embedding_cache_dir=None)
+        self.transcript = [{"start": i, "end": i + 1, "transcript": f"Sentence {i}."} for i in range(10)]
+
+    def topics(self, result):
+        return [entry["topic"] for entry in result]
+
+    def test_tree_records_split_order(self):
+        tree = topic_segmentation.build_topic_tree(self.transcript, self.config, self.topic_config, max_depth=8)
+        self.assertEqual(tree, {"size": 10, "max_depth": 8, "splits": [6, 3, 8, 1]})
+        self.assertEqual(topic_segmentation.topic_transitions_from_tree(tree, 3),
+                         [0, 0, 0, 1, 0, 0, 1, 0, 0, 0])
+        # Each entry is embedded once across all TreeSeg runs
+        self.assertEqual(self.embeddings.calls, 10)
+
+    def test_other_max_topics_reuse_cached_tree(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            video_path = os.path.join(tmp, "meeting.mp4")
+            result = topic_segmentation.segment_topics(
+                video_path, list(self.transcript), self.config, 2, self.topic_config
+            )
+            self.assertEqual(self.topics(result), [0] * 6 + [1] * 4)
+            save_object_file(get_cache_file(video_path, topic_segmentation.EXTENSION_TOPIC_HEADLINES), ["Old"])
+
+            result = topic_segmentation.segment_topics(
+                video_path, list(self.transcript), self.config, 4, self.topic_config
+            )
+            self.assertEqual(self.topics(result), [0, 0, 0, 1, 1, 1, 2, 2, 3, 3])
+            self.assertEqual(FakeTreeSeg.instances, 1)
+            self.assertEqual(load_object_file(get_cache_file(video_path, topic_segmentation.EXTENSION_TOPICS)), result)
+            # The entries are copied, so the caller's transcript keeps no topics
+            self.assertNotIn("topic", self.transcript[0])
+
+            # Headlines of the previous assignment are not reused for the new one
+            headlines = mock.Mock(return_value=["New"] * 4)
+            with mock.patch.object(topic_segmentation, "_create_outputs_from_transcript_topics", headlines):
+                self.assertEqual(
+                    topic_segmentation.prepare_and_generate_headlines(video_path, result, self.topic_config),
+                    ["New"] * 4,
+                )
+
+            # Other entries or TreeSeg settings build a new tree
+            topic_segmentation.segment_topics(
+                video_path, list(self.transcript), {**self.config, "MIN_SEGMENT_SIZE": 3}, 4, self.topic_config
+            )
+            self.assertEqual(FakeTreeSeg.instances, 2)
+
+    def test_segmentations_must_be_nested(self):
+        # The boundary of two topics moves from entry 6 to entry 3 for three topics
+        def segment_meeting(segmenter, K):
+            return [int(i == (6 if K == 2 else 3)) for i in range(10)]
+
+        with mock.patch.object(FakeTreeSeg, "segment_meeting", segment_meeting):
+            tree = topic_segmentation.build_topic_tree(self.transcript, self.config, self.topic_config, max_depth=8)
+            self.assertEqual(tree, {"size": 10, "max_depth": 2, "splits": [6]})
+
+            # Deeper segmentations fall back to segmenting into max_topics directly
+            with tempfile.TemporaryDirectory() as tmp:
+                video_path = os.path.join(tmp, "meeting.mp4")
+                result = topic_segmentation.segment_topics(
+                    video_path, list(self.transcript), self.config, 3, self.topic_config
+                )
+                self.assertEqual(self.topics(result), [0] * 3 + [1] * 7)
+                result = topic_segmentation.segment_topics(
+                    video_path, list(self.transcript), self.config, 2, self.topic_config
+                )
+                self.assertEqual(self.topics(result), [0] * 6 + [1] * 4)
+
+
+class FakeEmbeddingServer:
+    """Local HTTP server answering Ollama-style /api/embed requests."""
+
+    def __init__(self):
+        self.batches = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.batches.append(body["input"])
+                payload = json.dumps({"embeddings": [[float(len(text)), 1.0] for text in body["input"]]})
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(payload.encode("utf-8"))
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.httpd.server_address[1]}/api/embed"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def http_embeddings(chunk, model, endpoint):
+    request = urllib.request.Request(
+        endpoint, data=json.dumps({"model": model, "input": chunk}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())["embeddings"]
+
+
+class TestCachedEmbeddings(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeEmbeddingServer()
+        self.addCleanup(self.server.close)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = tmp.name
+
+    def adapter(self, model="nomic-embed-text"):
+        return topic_segmentation.CachedEmbeddings(
+            http_embeddings, model=model, cache_dir=self.cache_dir, batch_size=2
+        )
+
+    def test_batches_and_deduplicates(self):
+        embed = self.adapter()
+        vectors = embed(["Roll call.", "Motion.", "Roll call.", "Seconded."], "nomic-embed-text",
+                        endpoint=self.server.endpoint)
+        self.assertEqual(vectors, [[10.0, 1.0], [7.0, 1.0], [10.0, 1.0], [9.0, 1.0]])
+        self.assertEqual(self.server.batches, [["Roll call.", "Motion."], ["Seconded."]])
+        self.assertEqual((embed.hits, embed.misses, embed.requests), (1, 3, 2))
+
+    def test_persisted_vectors_skip_the_server(self):
+        self.adapter()(["Roll call.", "Motion."], "nomic-embed-text", endpoint=self.server.endpoint)
+        embed = self.adapter()
+        vectors = embed(chunk=["Motion.", "Roll call."], model="nomic-embed-text", endpoint=self.server.endpoint)
+        self.assertEqual(vectors, [[7.0, 1.0], [10.0, 1.0]])
+        self.assertEqual(len(self.server.batches), 1)
+
+        # Vectors are keyed on the model as well as the text
+        self.adapter("other-model")(["Motion."], "other-model", endpoint=self.server.endpoint)
+        self.assertEqual(len(self.server.batches), 2)
+
+
+class CharacterEncoder:
+    """Encodes texts by letter counts and records each encode call."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.batch_sizes = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        self.calls.append(list(texts))
+        self.batch_sizes.append(batch_size)
+        time.sleep(self.delay)
+        return np.array([[text.count(c) + 0.1 for c in "aeiou"] for text in texts])
+
+
+class TestEmbeddingService(unittest.TestCase):
+
+    def test_cache_and_shared_model(self):
+        encoder = CharacterEncoder()
+        service = EmbeddingService(EmbeddingConfig(shared_model="shared"))
+        service.register_encoder("minilm", encoder)
+        first = service.encode(["alpha", "beta", "alpha"], "minilm")
+        second = service.encode(["beta", "gamma"], "bge-small")
+        self.assertEqual(encoder.calls, [["alpha", "beta"], ["gamma"]])
+        np.testing.assert_array_equal(first[1], second[0])
+        self.assertEqual((service.hits, service.misses), (2, 3))
+
+    def test_pinned_encoder_is_not_replaced_by_shared_model(self):
+        shared, setfit_body = CharacterEncoder(), CharacterEncoder()
+        service = EmbeddingService(EmbeddingConfig(shared_model="shared"))
+        service.register_encoder("shared", shared)
+        self.assertIs(service.register_encoder("setfit", setfit_body, pinned=True), setfit_body)
+        service.encode(["alpha"], "setfit")
+        service.encode(["beta"], "minilm")
+        self.assertEqual((setfit_body.calls, shared.calls), ([["alpha"]], [["beta"]]))
+
+    def test_concurrent_requests_are_micro_batched(self):
+        encoder = CharacterEncoder(delay=0.05)
+        service = EmbeddingService(EmbeddingConfig(max_wait_ms=50))
+        service.register_encoder("minilm", encoder)
+        texts = [f"text {i}" for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda text: service.encode([text], "minilm"), texts))
+        self.assertEqual([len(r) for r in results], [1] * 8)
+        self.assertLess(len(encoder.calls), 8)
+        self.assertEqual(sorted(t for call in encoder.calls for t in call), sorted(texts))
+
+    def test_standardize_encodes_distinct_words_once(self):
+        encoder = CharacterEncoder()
+        service = EmbeddingService()
+        service.register_encoder("paraphrase-MiniLM-L6-v2", encoder)
+        transcript = [
+            {"start": 0, "end": 1, "transcript": "Welcome to Wayland"},
+            {"start": 1, "end": 2, "transcript": "wayland welcome"},
+        ]
+        with mock.patch.object(standardize, "get_embedding_service", return_value=service):
+            output = standardize.standardize_nouns_ai(transcript, ["wayland"])
+        self.assertEqual([row["transcript"] for row in output], ["Welcome to Wayland", "wayland welcome"])
+        self.assertEqual(encoder.calls, [["wayland"], ["welcome", "to"]])
+
+
+class FlakyLLMClient:
+    """Fails with the given errors before answering."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def chat(self, model, messages, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class TestLLMClientPool(unittest.TestCase):
+
+    def test_clients_are_pooled_by_config(self):
+        config = LLMConfig(openai_base_url="http://localhost:1/v1")
+        client = llm_client.get_llm_client(config)
+        self.assertIs(client, llm_client.get_llm_client(LLMConfig(openai_base_url="http://localhost:1/v1")))
+        self.assertIsNot(client, llm_client.get_llm_client(LLMConfig(openai_base_url="http://localhost:2/v1")))
+        self.assertIsInstance(client.client, llm_client.ScheduledLLMClient)
+        self.assertIsInstance(client.client.client, llm_client.OpenAIClient)
+        self.assertIs(client.client.scheduler, llm_client.get_llm_client(
+            LLMConfig(openai_base_url="http://localhost:1/v1", priority="batch")).client.scheduler)
+
+    def test_transient_errors_are_retried_with_jitter(self):
+        request = httpx.Request("POST", "http://localhost/v1/chat/completions")
+        flaky = FlakyLLMClient([openai.APIConnectionError(request=request), ConnectionError("reset")])
+        waits = []
+        client = llm_client.RetryingLLMClient(flaky, max_retries=3, backoff=1.0, sleep=waits.append)
+        self.assertEqual(client.chat("model", []), "ok")
+        self.assertEqual(flaky.calls, 3)
+        self.assertTrue(0 <= waits[0] <= 1.0 and 0 <= waits[1] <= 2.0)
+        summary = client.metrics.summary()
+        self.assertEqual((summary["requests"], summary["retries"], summary["failures"]), (1, 2, 0))
+        self.assertIn("p95_latency", summary)
+
+    def test_other_errors_are_not_retried(self):
+        flaky = FlakyLLMClient([ValueError("bad request")])
+        client = llm_client.RetryingLLMClient(flaky, sleep=lambda seconds: None)
+        with self.assertRaises(ValueError):
+            client.chat("model", [])
+        self.assertEqual(flaky.calls, 1)
+        self.assertEqual(client.metrics.summary()["failures"], 1)
+
+
+class CountingLLMClient:
+    """Answers with a counter so replayed responses can be told apart."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, model, messages, **kwargs):
+        self.calls += 1
+        return f"answer {self.calls}"
+
+    def parse(self, model, messages, response_model, **kwargs):
+        self.calls += 1
+        return response_model(headline=f"headline {self.calls}", summary="summary")
+
+
+class TestLLMResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "llm.sqlite")
+
+    def client(self, **kwargs):
+        self.inner = CountingLLMClient()
+        return llm_client.CachingLLMClient(self.inner, LLMResponseCache(self.path, **kwargs), "openai")
+
+    def test_identical_requests_are_replayed_across_runs(self):
+        messages = [{"role": "user", "content": "Headline for the budget"}]
+        client = self.client()
+        self.assertEqual(client.chat("glm", messages), "answer 1")
+        self.assertEqual(client.chat("glm", messages), "answer 1")
+        self.assertEqual(client.chat("glm", messages, temperature=0.2), "answer 2")
+        parsed = client.parse("glm", messages, TopicHeadlineSummary)
+
+        client = self.client()
+        self.assertEqual(client.chat("glm", messages), "answer 1")
+        self.assertEqual(client.parse("glm", messages, TopicHeadlineSummary), parsed)
+        self.assertEqual(self.inner.calls, 0)
+        self.assertEqual(client.cache.stats()["hits"], 2)
+
+    def test_request_keys_hash_by_content(self):
+        messages = [{"role": "user", "content": "Names"}]
+        key = request_key("openai", "glm", messages, params={"response_format": NounList})
+        self.assertEqual(key, request_key("openai", "glm", messages, params={"response_format": NounList}))
+        self.assertNotEqual(key, request_key("openai", "glm", messages, params={"response_format": TopicHeadlineSummary}))
+        # A repr may hold a memory address, so objects without a content form are rejected
+        with self.assertRaises(TypeError):
+            request_key("openai", "glm", messages, params={"callback": object()})
+
+    def test_ttl_and_size_cap(self):
+        client = self.client(ttl=60, max_entries=2)
+        for text in ["one", "two", "three"]:
+            client.chat("glm", [{"role": "user", "content": text}])
+        stats = client.cache.stats()
+        self.assertEqual((stats["entries"], stats["evicted"]), (2, 1))
+
+        now = time.time()
+        with mock.patch("time.time", return_value=now + 120):
+            client.chat("glm", [{"role": "user", "content": "three"}])
+        self.assertEqual(self.inner.calls, 4)
+        self.assertEqual(client.cache.stats()["expired"], 1)
+
+
+class AsyncFakeLLMClient(llm_client.LLMClient):
+    """Sync calls echo the prompt, async calls also track concurrency."""
+
+    def __init__(self, delay=0.02, errors=()):
+        self.delay = delay
+        self.errors = list(errors)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cancelled = 0
+
+    def chat(self, model, messages, **kwargs):
+        return messages[-1]["content"]
+
+    def parse(self, model, messages, response_model, **kwargs):
+        return response_model(headline=messages[-1]["content"], summary="")
+
+    async def achat(self, model, messages, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.errors:
+                raise self.errors.pop(0)
+            return messages[-1]["content"].upper()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+
+class TestAsyncLLMClient(unittest.TestCase):
+
+    def test_concurrency_is_limited(self):
+        fake = AsyncFakeLLMClient()
+        client = llm_client.RetryingLLMClient(fake, max_concurrency=3)
+
+        async def run():
+            return await asyncio.gather(*(client.achat("glm", [{"content": f"t{i}"}]) for i in range(10)))
+
+        self.assertEqual(asyncio.run(run()), [f"T{i}" for i in range(10)])
+        self.assertEqual(fake.max_in_flight, 3)
+        self.assertEqual(client.metrics.summary()["requests"], 10)
+
+    def test_transient_errors_are_retried(self):
+        fake = AsyncFakeLLMClient(delay=0, errors=[ConnectionError("reset")])
+        client = llm_client.RetryingLLMClient(fake, backoff=0.001)
+        self.assertEqual(asyncio.run(client.achat("glm", [{"content": "ok"}])), "OK")
+        self.assertEqual(client.metrics.summary()["retries"], 1)
+
+    def test_cancellation_stops_in_flight_requests(self):
+        fake = AsyncFakeLLMClient(delay=10)
+        client = llm_client.RetryingLLMClient(fake, max_concurrency=2)
+
+        async def run():
+            tasks = [asyncio.ensure_future(client.achat("glm", [{"content": "slow"}])) for _ in range(4)]
+            await asyncio.sleep(0.01)
+            for task in tasks:
+                task.cancel()
+            return await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = asyncio.run(run())
+        self.assertTrue(all(isinstance(r, asyncio.CancelledError) for r in results))
+        self.assertEqual(fake.cancelled, 2)
+        self.assertEqual(client.metrics.summary()["requests"], 0)
+
+    def test_sync_clients_get_async_fallbacks(self):
+        fake = AsyncFakeLLMClient()
+        parsed = asyncio.run(fake.aparse("glm", [{"content": "Budget"}], TopicHeadlineSummary))
+        self.assertEqual(parsed.headline, "Budget")
+
+
+class TestLLMScheduler(unittest.TestCase):
+
+    def test_interactive_requests_go_before_batch(self):
+        scheduler = LLMScheduler(max_in_flight=1)
+        order = []
+        scheduler.acquire()
+
+        def request(priority, name):
+            with scheduler.slot(priority):
+                order.append(name)
+
+        threads = [threading.Thread(target=request, args=("batch", "backfill"))]
+        threads[0].start()
+        time.sleep(0.05)
+        threads.append(threading.Thread(target=request, args=("interactive", "editor")))
+        threads[1].start()
+        time.sleep(0.05)
+        self.assertEqual(scheduler.stats()["queue_depth"], 2)
+        scheduler.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ["editor", "backfill"])
+        stats = scheduler.stats()
+        self.assertEqual((stats["max_queue_depth"], stats["batch"]["requests"]), (2, 1))
+        self.assertGreater(stats["batch"]["mean_wait"], stats["interactive"]["mean_wait"])
+
+    def test_request_rate_is_limited(self):
+        scheduler = LLMScheduler(requests_per_second=20)
+        start = time.monotonic()
+        for _ in range(25):
+            with scheduler.slot("batch"):
+                pass
+        # A one second burst of 20, then 5 more at 20 per second
+        self.assertGreater(time.monotonic() - start, 0.2)
+
+    def test_token_rate_is_limited(self):
+        scheduler = LLMScheduler(tokens_per_second=1000)
+        client = llm_client.ScheduledLLMClient(CountingLLMClient(), scheduler, "batch")
+        start = time.monotonic()
+        for _ in range(3):
+            client.chat("glm", [{"role": "user", "content": "x" * 2000}])
+        # About 500 tokens each: two fit the one second burst, the third waits
+        self.assertGreater(time.monotonic() - start, 0.4)
+
+    def test_prompts_larger_than_the_bucket_leave_a_debt(self):
+        scheduler = LLMScheduler(tokens_per_second=1000)
+        start = time.monotonic()
+        with scheduler.slot("batch", tokens=1500):
+            pass
+        # The oversized prompt starts on a full bucket, the next one waits for its 500 token debt
+        self.assertLess(time.monotonic() - start, 0.1)
+        with scheduler.slot("batch", tokens=1):
+            pass
+        self.assertGreater(time.monotonic() - start, 0.45)
+
+    def test_async_slots_wait_on_the_event_loop(self):
+        scheduler = LLMScheduler(max_in_flight=1)
+        order = []
+
+        async def request(priority, name):
+            async with scheduler.aslot(priority):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            scheduler.acquire()
+            backfill = asyncio.create_task(request("batch", "backfill"))
+            cancelled = asyncio.create_task(request("interactive", "cancelled"))
+            editor = asyncio.create_task(request("interactive", "editor"))
+            await asyncio.sleep(0.05)
+            self.assertEqual(scheduler.stats()["queue_depth"], 3)
+            cancelled.cancel()
+            await asyncio.sleep(0)
+            # Released from another thread, as by a synchronous request
+            threading.Thread(target=scheduler.release).start()
+            await asyncio.gather(backfill, editor)
+
+        with mock.patch("asyncio.BaseEventLoop.run_in_executor") as run_in_executor:
+            asyncio.run(run())
+        run_in_executor.assert_not_called()
+        self.assertEqual(order, ["editor", "backfill"])
+        self.assertEqual(scheduler.stats()["in_flight"], 0)
+
+
+class TestLLMStubServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LLMStubServer(fail_first=1).start()
+        self.addCleanup(self.server.stop)
+
+    def test_openai_client_retries_injected_errors(self):
+        client = llm_client.get_llm_client(LLMConfig(openai_base_url=self.server.openai_base_url, retry_backoff=0.01))
+        names = client.parse("glm", [{"role": "user", "content": "Names:\n\n- Bob\n- Alice\n- Bob"}], NounList)
+        self.assertEqual(names.nouns, ["Alice", "Bob"])
+        self.assertEqual(self.server.stats()["errors"], 1)
+        self.assertEqual(client.metrics.summary()["retries"], 1)
+
+    def test_ollama_client_structured_and_async(self):
+        client = llm_client.OllamaClient(host=self.server.url, timeout=5)
+        with self.assertRaises(Exception):
+            client.chat("glm", [{"role": "user", "content": "fails first"}])
+        parsed = client.parse("glm", [{"role": "user", "content": "The budget"}], TopicHeadlineSummary)
+        self.assertEqual(parsed.headline, "headline: The budget")
+        reply = asyncio.run(client.achat("glm", [{"role": "user", "content": "Roll call"}]))
+        self.assertEqual(reply, "reply: Roll call")
+
 
         
 if __name__ == "__main__":
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+from .. import caching, planner, scheduler
+from ..caching import get_cache_file
+from ..transcript import Transcript
+from ...config import TranscriberConfig
+from .fixtures import CacheTestCase
+
+
+class TestPipelinePlanner(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+
+        def transcribe(video_path, config=None):
+            return [{"start": 0.0, "end": 1.0, "transcript": "I'm Pat."}]
+
+        def entities(video_path, transcript, config=None):
+            return {"Person": [{"text": "Pat"}]}
+
+        def final(video_path, transcript, nouns, config=None):
+            return Transcript.from_records([dict(segment, speaker="Pat") for segment in transcript])
+
+        self.steps = [
+            planner.PipelineStep("Transcribe", self.step(".raw_transcript", transcribe), {}, {"config": "transcription"}),
+            planner.PipelineStep("Entities", self.step(".entities", entities),
+                                 {"transcript": ".raw_transcript"}, {"config": "entities"}),
+            planner.PipelineStep("Final",
+                                 self.step(".final", final, encode=Transcript.to_records, decode=Transcript.from_records),
+                                 {"transcript": ".raw_transcript", "nouns": ".entities"}, {"config": "diarization"}),
+        ]
+
+    def run_pipeline(self, config=None):
+        caching.clear_memory_cache()
+        with mock.patch.object(caching.FileCacheBackend, "load", wraps=caching.FileCacheBackend().load) as load:
+            artifacts = planner.PipelinePlanner(config, self.steps).run(self.video_path, [".final", ".entities"])
+        return artifacts, [call.args[1] for call in load.call_args_list if call.args[1] != ".manifest"]
+
+    def test_cached_run_loads_only_the_targets(self):
+        first, _ = self.run_pipeline()
+        self.assertEqual(self.calls, ["transcribe", "entities", "final"])
+        second, loaded = self.run_pipeline()
+        self.assertEqual(self.calls, ["transcribe", "entities", "final"])
+        self.assertEqual(sorted(loaded), [".entities", ".final"])
+        self.assertIsInstance(second[".final"], Transcript)
+        self.assertEqual(second[".final"].to_records(), first[".final"].to_records())
+
+    def test_evicted_intermediates_are_not_needed(self):
+        self.run_pipeline()
+        os.remove(get_cache_file(self.video_path, ".raw_transcript"))
+        self.run_pipeline()
+        self.assertEqual(self.calls, ["transcribe", "entities", "final"])
+
+    def test_changed_config_reruns_only_downstream_steps(self):
+        self.run_pipeline()
+        config = TranscriberConfig(entities={"entity_threshold": 0.9})
+        _, loaded = self.run_pipeline(config)
+        self.assertEqual(self.calls, ["transcribe", "entities", "final", "entities"])
+        # The raw transcript feeds the rerun steps, and the final transcript reproduced the same inputs
+        self.assertEqual(sorted(loaded), [".final", ".raw_transcript"])
+        self.assertEqual(planner.PipelinePlanner(config, self.steps).valid_keys(self.video_path).keys(),
+                         {".raw_transcript", ".entities", ".final"})
+
+
+class TestPipelineScheduler(CacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+        self.barrier = None
+
+        def work(name):
+            with self.lock:
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+            if self.barrier is not None:
+                self.barrier.wait(5)
+            time.sleep(0.05)
+            with self.lock:
+                self.running -= 1
+            return name
+
+        def transcribe(video_path, config=None):
+            return [work("transcript")]
+
+        def diarize(video_path, config=None):
+            return [work("speakers")]
+
+        def final(video_path, transcript, diarization):
+            return transcript + diarization
+
+        self.steps = [
+            planner.PipelineStep("Transcribe", self.step(".raw_transcript", transcribe), {},
+                                 {"config": "transcription"}, ("cpu",)),
+            planner.PipelineStep("Diarize", self.step(".diarization", diarize), {}, {"config": "diarization"}, ("cpu",)),
+            planner.PipelineStep("Final", self.step(".final", final),
+                                 {"transcript": ".raw_transcript", "diarization": ".diarization"}, {}),
+        ]
+
+    def run_pipeline(self, config):
+        pipeline = scheduler.PipelineScheduler(config, self.steps)
+        self.addCleanup(pipeline.shutdown)
+        return pipeline.run(self.video_path, [".final"])
+
+    def test_independent_steps_run_concurrently(self):
+        self.barrier = threading.Barrier(2)
+        artifacts = self.run_pipeline(TranscriberConfig())
+        self.assertEqual(artifacts[".final"], ["transcript", "speakers"])
+        self.assertEqual(self.max_running, 2)
+
+    def test_resource_limits_prevent_oversubscription(self):
+        artifacts = self.run_pipeline(TranscriberConfig(scheduler={"resource_limits": {"cpu": 1}}))
+        self.assertEqual(artifacts[".final"], ["transcript", "speakers"])
+        self.assertEqual(self.max_running, 1)
+
+    def test_step_errors_are_raised(self):
+        def diarize(video_path, config=None):
+            return 1 / 0
+
+        self.steps[1] = self.steps[1]._replace(step=self.step(".diarization", diarize))
+        with self.assertRaises(ZeroDivisionError):
+            self.run_pipeline(TranscriberConfig())
+
+
+if __name__ == "__main__":
+    unittest.main()
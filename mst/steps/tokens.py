@@ -0,0 +1,88 @@
+import re
+from typing import Callable, Dict, List, Optional
+
+"""
+Token length estimates used to keep LLM prompts within model context limits.
+"""
+
+TokenCounter = Callable[[str], int]
+
+_token_counters: Dict[str, TokenCounter] = {}
+
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate of roughly four characters per token.
+
+    Args:
+        text (str): Text to measure.
+
+    Returns:
+        int: Estimated number of tokens.
+    """
+    return len(text) // 4 + 1
+
+
+def register_token_counter(name: str, counter: TokenCounter):
+    """
+    Registers a custom token counter under `name` for use in TopicConfig.tokenizer.
+
+    Args:
+        name (str): Name to register the counter under.
+        counter (TokenCounter): Function returning the token count of a text.
+    """
+    _token_counters[name] = counter
+
+
+def get_token_counter(tokenizer_name: Optional[str] = None) -> TokenCounter:
+    """
+    Gets or initializes the token counter for the given tokenizer name.
+
+    Names that were not registered are loaded as Hugging Face tokenizers.
+
+    Args:
+        tokenizer_name: Registered counter or Hugging Face tokenizer name.
+                        If None, uses the character-based estimate.
+
+    Returns:
+        TokenCounter: Function returning the token count of a text.
+    """
+    if tokenizer_name is None:
+        return estimate_tokens
+    if tokenizer_name not in _token_counters:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+        _token_counters[tokenizer_name] = lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+    return _token_counters[tokenizer_name]
+
+
+def split_text_by_tokens(text: str, max_tokens: int, count_tokens: TokenCounter = estimate_tokens) -> List[str]:
+    """
+    Splits text at sentence boundaries into chunks of at most `max_tokens`.
+
+    A single sentence longer than the budget becomes a chunk on its own.
+
+    Args:
+        text (str): Text to split.
+        max_tokens (int): Token budget of each chunk.
+        count_tokens (TokenCounter): Token counter to measure sentences with.
+
+    Returns:
+        List[str]: The chunks, in order.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for sentence in _SENTENCE_BOUNDARY.split(text.strip()):
+        sentence_tokens = count_tokens(sentence)
+        if current and current_tokens + sentence_tokens > max_tokens:
+            chunks.append(" ".join(current))
+            current = []
+            current_tokens = 0
+        current.append(sentence)
+        current_tokens += sentence_tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
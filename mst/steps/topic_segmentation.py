@@ -1,9 +1,21 @@
-from typing import List, Optional
+import copy
+import hashlib
+import json
+import os
+from collections import Counter
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, List, Optional
 
+import numpy as np
 from treeseg import TreeSeg
 
-from .caching import cached_file_object
-from .llm_client import get_llm_client
+from .caching import cached_file_object, load_step_output, step_key
+from .llm_client import LLMClient, get_llm_client
+from .models import TopicHeadlineSummary
+from .tokens import get_token_counter, split_text_by_tokens
+from .extractive import select_central_sentences
+from .embeddings import get_embedding_service
 from ..config import TopicConfig, LLMConfig
 
 """
@@ -11,6 +23,53 @@ Module for segmenting transcripts into topics using TreeSeg.
 """
 
 EXTENSION_TOPICS = '.topics'
+EXTENSION_TOPIC_HEADLINES = '.topic_headlines'
+EXTENSION_TOPIC_SUMMARY = '.topic_summary'
+EXTENSION_TOPIC_OUTPUTS = '.topic_outputs'
+EXTENSION_TOPIC_TREE = '.topic_tree'
+
+def _generate_topic_output(
+    llm_client: LLMClient,
+    topic_index: int,
+    topic_text: str,
+    llm_prompt_template: str,
+    topic_model: str,
+    fallback: Optional[Callable[[int, str], str]] = None,
+) -> str:
+    """
+    Generates the output for a single topic, returning an error message on failure.
+
+    Args:
+        llm_client (LLMClient): Client shared by all topics.
+        topic_index (int): Index of the topic, used for logging.
+        topic_text (str): Concatenated transcript text of the topic.
+        llm_prompt_template (str): The prompt template; the topic text is appended to it.
+        topic_model (str): The LLM model name to use for generation.
+        fallback (Callable, optional): Called with the topic index and text on
+            failure; its result is returned instead of the error message.
+
+    Returns:
+        str: The generated output, "" for empty topics, or an error message.
+    """
+    if not topic_text.strip():
+        print(f"Topic {topic_index} has no text, skipping LLM generation.")
+        return ""
+
+    print(f"Generating LLM output for topic {topic_index}...")
+    try:
+        # Construct the full prompt using the template and the topic text
+        full_prompt = f"{llm_prompt_template}\n\nTranscript section:\n{topic_text}"
+        output_text = llm_client.chat(
+            model=topic_model,
+            messages=[{'role': 'user', 'content': full_prompt}]
+        ).strip()
+        print(f"Generated LLM output for topic {topic_index}: {output_text}")
+        return output_text
+    except Exception as e:
+        print(f"Error generating LLM output for topic {topic_index}: {e}")
+        if fallback is not None:
+            return fallback(topic_index, topic_text)
+        return f"Error: Could not generate LLM output for topic {topic_index}"
 
 def _generate_topic_outputs(
     video_path: str,
@@ -18,10 +77,16 @@ def _generate_topic_outputs(
     llm_prompt_template: str,
     topic_model: str = "glm-4.7-flash",
     llm_config: Optional[LLMConfig] = None,
+    max_concurrency: int = 4,
+    executor: Optional[Executor] = None,
+    fallback: Optional[Callable[[int, str], str]] = None,
 ) -> List[str]:
     """
     Generates an output (e.g., headline, summary) for each topic's concatenated transcript text using an LLM and a given prompt.
 
+    Topics are generated concurrently, with at most `max_concurrency` requests
+    in flight, unless a shared `executor` is given. Outputs keep topic order.
+
     Args:
         video_path (str): Path to the video file (can be used for context or logging).
         grouped_topic_texts (List[str]): A list where each string is the
@@ -29,38 +94,234 @@ def _generate_topic_outputs(
         llm_prompt_template (str): The prompt template to use for the LLM. The topic text will be appended to this.
         topic_model (str): The LLM model name to use for generation.
         llm_config: LLMConfig instance. If None, uses defaults.
+        max_concurrency (int): Maximum number of concurrent LLM requests.
+        executor (Executor, optional): Shared executor bounding concurrency across several calls.
+        fallback (Callable, optional): Produces the output of a failed topic from
+            its index and text instead of an error message.
 
     Returns:
         List[str]: A list of generated outputs, corresponding to each topic.
     """
-    outputs = []
     if not grouped_topic_texts:
         return []
 
-    for i, topic_text in enumerate(grouped_topic_texts):
-        if not topic_text.strip():
-            # Add an empty output for topics with no text content
-            outputs.append("")
-            print(f"Topic {i} has no text, skipping LLM generation.")
-            continue
+    llm_client = get_llm_client(llm_config)
+    generate = partial(
+        _generate_topic_output,
+        llm_client,
+        llm_prompt_template=llm_prompt_template,
+        topic_model=topic_model,
+        fallback=fallback,
+    )
+    indices = range(len(grouped_topic_texts))
+    if executor is not None:
+        return list(executor.map(generate, indices, grouped_topic_texts))
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        return list(pool.map(generate, indices, grouped_topic_texts))
 
-        print(f"Generating LLM output for topic {i}...")
-        try:
-            # Construct the full prompt using the template and the topic text
-            full_prompt = f"{llm_prompt_template}\n\nTranscript section:\n{topic_text}"
+def _generate_topic_headline_and_summary(
+    llm_client: LLMClient,
+    topic_index: int,
+    topic_text: str,
+    config: TopicConfig,
+) -> tuple:
+    """
+    Generates the headline and summary of one topic with a single structured request.
 
-            llm_client = get_llm_client(llm_config)
-            output_text = llm_client.chat(
-                model=topic_model,
-                messages=[{'role': 'user', 'content': full_prompt}]
-            ).strip()
-            outputs.append(output_text)
-            print(f"Generated LLM output for topic {i}: {output_text}")
-        except Exception as e:
-            print(f"Error generating LLM output for topic {i}: {e}")
-            outputs.append(f"Error: Could not generate LLM output for topic {i}")
-
-    return outputs
+    Falls back to the separate headline and summary prompts if the request
+    fails or the response does not validate.
+
+    Args:
+        llm_client (LLMClient): Client shared by all topics.
+        topic_index (int): Index of the topic, used for logging.
+        topic_text (str): Concatenated transcript text of the topic.
+        config (TopicConfig): Topic configuration with the prompts and model.
+
+    Returns:
+        tuple: The headline and the summary of the topic.
+    """
+    if not topic_text.strip():
+        print(f"Topic {topic_index} has no text, skipping LLM generation.")
+        return "", ""
+
+    print(f"Generating headline and summary for topic {topic_index}...")
+    try:
+        full_prompt = f"{config.combined_prompt}\n\nTranscript section:\n{topic_text}"
+        output = llm_client.parse(
+            model=config.topic_model,
+            messages=[{'role': 'user', 'content': full_prompt}],
+            response_model=TopicHeadlineSummary,
+        )
+        return output.headline.strip(), output.summary.strip()
+    except Exception as e:
+        print(f"Combined generation failed for topic {topic_index}, using separate prompts: {e}")
+        headline = _generate_topic_output(
+            llm_client, topic_index, topic_text, config.headline_prompt, config.topic_model
+        )
+        summary = _generate_topic_output(
+            llm_client, topic_index, topic_text, config.summary_prompt, config.topic_model
+        )
+        return headline, summary
+
+def _group_sentences_by_topic(updated_transcript_with_topics: List[dict]) -> List[List[str]]:
+    """
+    Collects the transcript sentences of each topic.
+
+    Args:
+        updated_transcript_with_topics (List[dict]): Transcript with topic assignments.
+
+    Returns:
+        List[List[str]]: The sentences of each topic index, empty if there are no topics.
+    """
+    # Determine the range of topic numbers
+    topic_numbers = sorted(list(set(
+        entry['topic'] for entry in updated_transcript_with_topics if 'topic' in entry and entry['topic'] is not None
+    )))
+
+    if not topic_numbers:
+        print("No topics found in transcript, skipping LLM output generation.")
+        return []
+
+    # Topics are 0-indexed. If max topic is N, list size is N+1.
+    max_topic_val = topic_numbers[-1]
+    grouped_sentences = [[] for _ in range(max_topic_val + 1)]
+
+    for entry in updated_transcript_with_topics:
+        topic_idx = entry.get('topic')
+        if topic_idx is not None and 0 <= topic_idx <= max_topic_val:
+            if entry['transcript']:
+                grouped_sentences[topic_idx].append(entry['transcript'])
+        elif topic_idx is not None:
+            print(f"Warning: Encountered topic index {topic_idx} outside expected range [0, {max_topic_val}] during text preparation.")
+
+    return grouped_sentences
+
+def _group_texts_by_topic(updated_transcript_with_topics: List[dict]) -> List[str]:
+    """
+    Concatenates the transcript text of each topic.
+
+    Args:
+        updated_transcript_with_topics (List[dict]): Transcript with topic assignments.
+
+    Returns:
+        List[str]: One concatenated text per topic index, empty if there are no topics.
+    """
+    return [" ".join(sentences) for sentences in _group_sentences_by_topic(updated_transcript_with_topics)]
+
+def _topic_token_budget(config: TopicConfig, count_tokens) -> int:
+    """
+    Tokens available for topic text in a single prompt to `config.topic_model`.
+
+    Args:
+        config (TopicConfig): Topic configuration with the context limits and prompts.
+        count_tokens (TokenCounter): Token counter for the prompts.
+
+    Returns:
+        int: The token budget for the transcript text of one prompt.
+    """
+    context_limit = config.context_limits.get(config.topic_model, config.default_context_limit)
+    longest_prompt = max(
+        count_tokens(prompt)
+        for prompt in (config.headline_prompt, config.summary_prompt, config.combined_prompt, config.chunk_prompt)
+    )
+    return max(1, context_limit - config.reserved_output_tokens - longest_prompt)
+
+def _fit_topic_texts_to_context(
+    grouped_topic_texts: List[str],
+    config: TopicConfig,
+    llm_config: Optional[LLMConfig] = None,
+    executor: Optional[Executor] = None,
+    max_rounds: int = 3,
+) -> List[str]:
+    """
+    Map-reduce stage that shrinks topics too long for the model context.
+
+    Each oversized topic is split into chunks that fit the token budget, the
+    chunks of all topics are summarized in parallel, and the partial
+    summaries replace the topic text. The headline and summary prompts then
+    reduce them to the final outputs. Rounds repeat while a topic is still
+    over budget. A chunk whose summary fails is replaced by its leading
+    sentences, up to its share of the budget, so no error message reaches
+    the reduce prompt.
+
+    Args:
+        grouped_topic_texts (List[str]): Concatenated transcript text of each topic.
+        config (TopicConfig): Topic configuration with the context limits and chunk prompt.
+        llm_config: LLMConfig instance. If None, uses defaults.
+        executor (Executor, optional): Shared executor bounding concurrency across several calls.
+        max_rounds (int): Maximum number of map rounds.
+
+    Returns:
+        List[str]: Topic texts that fit the budget, unchanged when already short enough.
+    """
+    count_tokens = get_token_counter(config.tokenizer)
+    budget = _topic_token_budget(config, count_tokens)
+    texts = list(grouped_topic_texts)
+    for _ in range(max_rounds):
+        oversized = [i for i, text in enumerate(texts) if count_tokens(text) > budget]
+        if not oversized:
+            break
+        chunks = [
+            (topic_index, chunk)
+            for topic_index in oversized
+            for chunk in split_text_by_tokens(texts[topic_index], budget, count_tokens)
+        ]
+        print(f"Splitting {len(oversized)} oversized topics into {len(chunks)} chunks")
+        chunk_counts = Counter(topic_index for topic_index, _ in chunks)
+
+        def truncate(chunk_index: int, chunk: str) -> str:
+            share = max(1, budget // chunk_counts[chunks[chunk_index][0]])
+            return split_text_by_tokens(chunk, share, count_tokens)[0]
+
+        summaries = _generate_topic_outputs(
+            None, [chunk for _, chunk in chunks], config.chunk_prompt, topic_model=config.topic_model,
+            llm_config=llm_config, max_concurrency=config.max_concurrency, executor=executor, fallback=truncate,
+        )
+        partials = {topic_index: [] for topic_index in oversized}
+        for (topic_index, _), summary in zip(chunks, summaries):
+            partials[topic_index].append(summary)
+        for topic_index, topic_partials in partials.items():
+            texts[topic_index] = "\n".join(topic_partials)
+    return texts
+
+def _prepare_topic_texts(
+    updated_transcript_with_topics: List[dict],
+    config: TopicConfig,
+    llm_config: Optional[LLMConfig] = None,
+    executor: Optional[Executor] = None,
+) -> List[str]:
+    """
+    Groups the transcript text by topic and optionally condenses it.
+
+    With `config.extractive_compression`, each topic keeps only its most
+    central sentences up to `config.extractive_token_budget`. In map-reduce
+    mode, topics still over the model context are then summarized in chunks.
+
+    Args:
+        updated_transcript_with_topics (List[dict]): Transcript with topic assignments.
+        config (TopicConfig): Topic configuration.
+        llm_config: LLMConfig instance. If None, uses defaults.
+        executor (Executor, optional): Shared executor for the chunk summaries.
+
+    Returns:
+        List[str]: The text to send to the LLM for each topic.
+    """
+    if not updated_transcript_with_topics:
+        return []
+    grouped_sentences = _group_sentences_by_topic(updated_transcript_with_topics)
+    if config.extractive_compression:
+        count_tokens = get_token_counter(config.tokenizer)
+        grouped_topic_texts = [
+            select_central_sentences(
+                sentences, config.extractive_token_budget, count_tokens, config.extractive_model
+            )
+            for sentences in grouped_sentences
+        ]
+    else:
+        grouped_topic_texts = [" ".join(sentences) for sentences in grouped_sentences]
+    if config.map_reduce_generation:
+        grouped_topic_texts = _fit_topic_texts_to_context(grouped_topic_texts, config, llm_config, executor)
+    return grouped_topic_texts
 
 def _create_outputs_from_transcript_topics(
     video_path: str,
@@ -68,6 +329,9 @@ def _create_outputs_from_transcript_topics(
     llm_prompt: str,
     topic_model: str = "glm-4.7-flash",
     llm_config: Optional[LLMConfig] = None,
+    max_concurrency: int = 4,
+    executor: Optional[Executor] = None,
+    topic_texts: Optional[List[str]] = None,
 ) -> List[str] | None:
     """
     Internal helper to prepare transcript text grouped by topic and generate outputs (e.g., headlines)
@@ -77,6 +341,9 @@ def _create_outputs_from_transcript_topics(
         video_path (str): Path to the video file.
         updated_transcript_with_topics (List[dict]): Transcript with topic assignments.
         llm_prompt (str): The prompt to use for LLM generation.
+        max_concurrency (int): Maximum number of concurrent LLM requests.
+        executor (Executor, optional): Shared executor bounding concurrency across several calls.
+        topic_texts (List[str], optional): Prepared text of each topic. If None, grouped from the transcript.
         
     Returns:
         List[str] | None: Generated outputs or None if error.
@@ -85,47 +352,25 @@ def _create_outputs_from_transcript_topics(
         print("No transcript entries to process for LLM outputs.")
         return None
 
-    # Determine the range of topic numbers
-    topic_numbers = sorted(list(set(
-        entry['topic'] for entry in updated_transcript_with_topics if 'topic' in entry and entry['topic'] is not None
-    )))
+    grouped_texts_for_llm = topic_texts
+    if grouped_texts_for_llm is None:
+        grouped_texts_for_llm = _group_texts_by_topic(updated_transcript_with_topics)
+    if not grouped_texts_for_llm:
+        return None
 
-    if not topic_numbers:
-        print("No topics found in transcript, skipping LLM output generation.")
-        grouped_texts_for_llm = []
-    else:
-        # Topics are 0-indexed. If max topic is N, list size is N+1.
-        max_topic_val = topic_numbers[-1]
-        grouped_texts_for_llm = [""] * (max_topic_val + 1)
-
-        for entry in updated_transcript_with_topics:
-            topic_idx = entry.get('topic')
-            if topic_idx is not None and 0 <= topic_idx <= max_topic_val:
-                # Concatenate transcript texts for the same topic
-                if grouped_texts_for_llm[topic_idx]:
-                    grouped_texts_for_llm[topic_idx] += " " + entry['transcript']
-                else:
-                    grouped_texts_for_llm[topic_idx] = entry['transcript']
-            elif topic_idx is not None:
-                print(f"Warning: Encountered topic index {topic_idx} outside expected range [0, {max_topic_val}] during text preparation.")
-
-    if grouped_texts_for_llm:
-        return _generate_topic_outputs(
-            video_path, grouped_texts_for_llm, llm_prompt, topic_model=topic_model, llm_config=llm_config
-        )
-    elif not topic_numbers: # Already printed "No topics found..."
-        # This case implies no topics, so no texts, and thus no outputs.
-        pass
-    else: # topic_numbers existed, but somehow grouped_texts_for_llm is empty
-        print("No text content found for topics, skipping LLM output generation.")
-    return None # Or [] if an empty list is preferred over None for "no output generated"
-
-@cached_file_object('.topic_headlines')
+    return _generate_topic_outputs(
+        video_path, grouped_texts_for_llm, llm_prompt, topic_model=topic_model, llm_config=llm_config,
+        max_concurrency=max_concurrency, executor=executor,
+    )
+
+@cached_file_object(EXTENSION_TOPIC_HEADLINES, ignore=('executor', 'topic_texts'))
 def prepare_and_generate_headlines(
     video_path: str,
     updated_transcript_with_topics: List[dict],
     config: Optional[TopicConfig] = None,
     llm_config: Optional[LLMConfig] = None,
+    executor: Optional[Executor] = None,
+    topic_texts: Optional[List[str]] = None,
 ):
     """
     Prepares transcript text grouped by topic and generates headlines.
@@ -135,27 +380,37 @@ def prepare_and_generate_headlines(
         updated_transcript_with_topics (List[dict]): Transcript with topic assignments.
         config: TopicConfig instance. If None, uses defaults.
         llm_config: LLMConfig instance. If None, uses defaults.
+        executor (Executor, optional): Shared executor for the per-topic LLM requests.
+        topic_texts (List[str], optional): Text of each topic already prepared by the caller
+            from the same transcript and configs; not part of the cache key.
 
     Returns:
         List[str]: Generated headlines for each topic.
     """
     if config is None:
         config = TopicConfig()
+    if topic_texts is None:
+        topic_texts = _prepare_topic_texts(updated_transcript_with_topics, config, llm_config, executor)
     return _create_outputs_from_transcript_topics(
         video_path,
         updated_transcript_with_topics,
         config.headline_prompt,
         topic_model=config.topic_model,
         llm_config=llm_config,
+        max_concurrency=config.max_concurrency,
+        executor=executor,
+        topic_texts=topic_texts,
     )
 
 
-@cached_file_object('.topic_summary')
+@cached_file_object(EXTENSION_TOPIC_SUMMARY, ignore=('executor', 'topic_texts'))
 def prepare_and_generate_summary(
     video_path: str,
     updated_transcript_with_topics: List[dict],
     config: Optional[TopicConfig] = None,
     llm_config: Optional[LLMConfig] = None,
+    executor: Optional[Executor] = None,
+    topic_texts: Optional[List[str]] = None,
 ):
     """
     Prepares transcript text grouped by topic and generates summaries.
@@ -165,42 +420,460 @@ def prepare_and_generate_summary(
         updated_transcript_with_topics (List[dict]): Transcript with topic assignments.
         config: TopicConfig instance. If None, uses defaults.
         llm_config: LLMConfig instance. If None, uses defaults.
+        executor (Executor, optional): Shared executor for the per-topic LLM requests.
+        topic_texts (List[str], optional): Text of each topic already prepared by the caller
+            from the same transcript and configs; not part of the cache key.
 
     Returns:
         List[str]: Generated summaries for each topic.
     """
     if config is None:
         config = TopicConfig()
+    if topic_texts is None:
+        topic_texts = _prepare_topic_texts(updated_transcript_with_topics, config, llm_config, executor)
     return _create_outputs_from_transcript_topics(
         video_path,
         updated_transcript_with_topics,
         config.summary_prompt,
         topic_model=config.topic_model,
         llm_config=llm_config,
+        max_concurrency=config.max_concurrency,
+        executor=executor,
+        topic_texts=topic_texts,
+    )
+
+def prepare_and_generate_headlines_and_summary(
+    video_path: str,
+    updated_transcript_with_topics: List[dict],
+    config: Optional[TopicConfig] = None,
+    llm_config: Optional[LLMConfig] = None,
+) -> tuple:
+    """
+    Generates headlines and summaries for all topics in one concurrent wave.
+
+    Both steps share one executor, so at most `config.max_concurrency` LLM
+    requests are in flight across all topics and both prompt types. Each
+    step still reads and writes its own cache file. With
+    `config.combined_generation`, a single structured request per topic
+    returns both the headline and the summary instead, cached as the
+    `.topic_outputs` step.
+
+    Args:
+        video_path (str): Path to the video file.
+        updated_transcript_with_topics (List[dict]): Transcript with topic assignments.
+        config: TopicConfig instance. If None, uses defaults.
+        llm_config: LLMConfig instance. If None, uses defaults.
+
+    Returns:
+        tuple: The topic headlines and the topic summaries.
+    """
+    if config is None:
+        config = TopicConfig()
+    if config.combined_generation:
+        outputs = prepare_and_generate_combined(video_path, updated_transcript_with_topics, config, llm_config)
+        return outputs['headlines'], outputs['summary']
+    steps = (prepare_and_generate_headlines, prepare_and_generate_summary)
+    cached = _load_topic_outputs(
+        video_path, steps, updated_transcript_with_topics=updated_transcript_with_topics,
+        config=config, llm_config=llm_config,
+    )
+    if cached:
+        return cached
+    with ThreadPoolExecutor(max_workers=config.max_concurrency) as llm_executor, \
+            ThreadPoolExecutor(max_workers=len(steps)) as step_executor:
+        # Prepare the topic texts once so map-reduce chunks are shared by both steps
+        topic_texts = _prepare_topic_texts(updated_transcript_with_topics, config, llm_config, llm_executor)
+        futures = [
+            step_executor.submit(
+                step, video_path, updated_transcript_with_topics,
+                config=config, llm_config=llm_config, executor=llm_executor, topic_texts=topic_texts,
+            )
+            for step in steps
+        ]
+        return tuple(future.result() for future in futures)
+
+def _load_topic_outputs(video_path: str, steps: tuple, **kwargs) -> tuple | None:
+    """
+    Loads the cached outputs of the topic steps when all of them are cached.
+
+    Checking first avoids preparing the topic texts, which may take LLM
+    requests in map-reduce mode, when nothing needs to be generated.
+
+    Args:
+        video_path (str): Path to the video file.
+        steps (tuple): Topic steps decorated with `cached_file_object`.
+        **kwargs: Arguments of the steps that are part of their cache key.
+
+    Returns:
+        tuple | None: The cached output of each step, or None.
+    """
+    if not video_path:
+        return None
+    try:
+        return tuple(load_step_output(step, video_path, step_key(step, video_path, **kwargs)) for step in steps)
+    except KeyError:
+        return None
+
+@cached_file_object(EXTENSION_TOPIC_OUTPUTS)
+def prepare_and_generate_combined(
+    video_path: str,
+    updated_transcript_with_topics: List[dict],
+    config: Optional[TopicConfig] = None,
+    llm_config: Optional[LLMConfig] = None,
+) -> dict:
+    """
+    Generates headlines and summaries with one structured request per topic.
+
+    Args:
+        video_path (str): Path to the video file (used for caching).
+        updated_transcript_with_topics (List[dict]): Transcript with topic assignments.
+        config: TopicConfig instance. If None, uses defaults.
+        llm_config: LLMConfig instance. If None, uses defaults.
+
+    Returns:
+        dict: The topic `headlines` and the topic `summary`, None if there are no topics.
+    """
+    if config is None:
+        config = TopicConfig()
+    headlines, summary = None, None
+    with ThreadPoolExecutor(max_workers=config.max_concurrency) as pool:
+        grouped_texts = _prepare_topic_texts(updated_transcript_with_topics, config, llm_config, pool)
+        if grouped_texts:
+            llm_client = get_llm_client(llm_config)
+            generate = partial(_generate_topic_headline_and_summary, llm_client, config=config)
+            outputs = list(pool.map(generate, range(len(grouped_texts)), grouped_texts))
+            headlines = [headline for headline, _ in outputs]
+            summary = [summary for _, summary in outputs]
+    return {'headlines': headlines, 'summary': summary}
+
+def _is_text_batch(value) -> bool:
+    """Returns True for a text or a non-empty list of texts."""
+    if isinstance(value, str):
+        return True
+    return isinstance(value, (list, tuple)) and bool(value) and all(isinstance(v, str) for v in value)
+
+class CachedEmbeddings:
+    """
+    Embeddings function adapter for TreeSeg that batches, deduplicates and caches.
+
+    Wraps the `embeddings_func` of a TreeSeg `Embeddings` configuration. The
+    texts of each call are deduplicated, looked up in memory and in a
+    content-addressed cache directory keyed on (model, text), and only the
+    missing texts are sent to the wrapped function, `batch_size` at a time.
+    The other arguments of the call are passed through unchanged.
+
+    Attributes:
+        hits (int): Texts served from the cache.
+        misses (int): Texts sent to the wrapped function.
+        requests (int): Calls made to the wrapped function.
+    """
+
+    def __init__(self, embeddings_func, model: str = "", cache_dir: Optional[str] = None, batch_size: int = 64):
+        self.embeddings_func = embeddings_func
+        self.model = model
+        self.cache_dir = os.path.expanduser(cache_dir) if cache_dir else None
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+        self._vectors = {}
+        self._returns_array = False
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _load(self, key: str):
+        if key in self._vectors:
+            return self._vectors[key]
+        if self.cache_dir and os.path.exists(self._path(key)):
+            with open(self._path(key), 'r', encoding='utf-8') as file:
+                self._vectors[key] = json.load(file)
+            return self._vectors[key]
+        return None
+
+    def _store(self, key: str, vector):
+        vector = vector.tolist() if hasattr(vector, "tolist") else list(vector)
+        self._vectors[key] = vector
+        if self.cache_dir:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(vector, file)
+            os.replace(tmp_path, path)
+
+    def embed(self, texts: List[str], call) -> List[List[float]]:
+        """
+        Returns the embeddings of `texts`, calling `call` only for uncached texts.
+
+        Args:
+            texts (List[str]): Texts to embed.
+            call (callable): Embeds a list of texts and returns one vector per text.
+
+        Returns:
+            List[List[float]]: One vector per text, in order.
+        """
+        keys = [self._key(text) for text in texts]
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in missing and self._load(key) is None:
+                missing[key] = text
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        pending = list(missing.items())
+        for i in range(0, len(pending), self.batch_size):
+            batch = pending[i:i + self.batch_size]
+            vectors = call([text for _, text in batch])
+            self.requests += 1
+            self._returns_array = self._returns_array or isinstance(vectors, np.ndarray)
+            for (key, _), vector in zip(batch, vectors):
+                self._store(key, vector)
+        return [self._vectors[key] for key in keys]
+
+    def __call__(self, *args, **kwargs):
+        # The texts are the first argument holding a text or a list of texts
+        for name, value in list(enumerate(args)) + list(kwargs.items()):
+            if _is_text_batch(value):
+                break
+        else:
+            return self.embeddings_func(*args, **kwargs)
+
+        def call(texts):
+            if isinstance(name, int):
+                return self.embeddings_func(*args[:name], texts, *args[name + 1:], **kwargs)
+            return self.embeddings_func(*args, **{**kwargs, name: texts})
+
+        if isinstance(value, str):
+            vectors = self.embed([value], lambda texts: [call(texts[0])])
+            return np.asarray(vectors[0]) if self._returns_array else vectors[0]
+        vectors = self.embed(list(value), call)
+        return np.asarray(vectors) if self._returns_array else vectors
+
+def _cached_embeddings_config(config: dict, topic_config: TopicConfig) -> dict:
+    """
+    Returns a copy of the TreeSeg config whose embeddings function is a `CachedEmbeddings`.
+
+    With `topic_config.local_embedding_model`, the texts are embedded by the
+    shared embedding service instead of the configured remote function.
+
+    Args:
+        config (dict): Configuration dictionary for TreeSeg.
+        topic_config (TopicConfig): Topic configuration with the embedding cache settings.
+
+    Returns:
+        dict: The configuration with a caching embeddings function.
+    """
+    embeddings = config.get("EMBEDDINGS")
+    if embeddings is None or not hasattr(embeddings, "embeddings_func"):
+        return config
+    if isinstance(embeddings.embeddings_func, CachedEmbeddings):
+        return config
+    embeddings = copy.copy(embeddings)
+    model = getattr(embeddings, "model", "")
+    if topic_config.local_embedding_model:
+        # Embed in process with the shared embedding service instead of the remote endpoint
+        service = get_embedding_service()
+        model = service.resolve(topic_config.local_embedding_model)
+        embeddings.embeddings_func = service.embeddings_func(model)
+    embeddings.embeddings_func = CachedEmbeddings(
+        embeddings.embeddings_func,
+        model=model,
+        cache_dir=topic_config.embedding_cache_dir,
+        batch_size=topic_config.embedding_batch_size,
     )
+    return {**config, "EMBEDDINGS": embeddings}
+
+def build_topic_tree(
+    entries: list,
+    config: dict,
+    topic_config: Optional[TopicConfig] = None,
+    max_depth: Optional[int] = None,
+) -> dict:
+    """
+    Records the order in which TreeSeg splits the transcript into topics.
+
+    TreeSeg splits the transcript top-down, always dividing the best leaf
+    next, so the segmentation into k topics is the segmentation into k - 1
+    topics plus one boundary. The tree is stored as the list of boundaries
+    in split order, from which `topic_transitions_from_tree` derives the
+    topics for any `max_topics` up to `max_depth` without running TreeSeg.
+    TreeSeg only returns the final segmentation, so it runs once per depth,
+    and each run is checked to keep the boundaries of the previous one. If
+    a run moves a boundary, no split order exists beyond the previous depth,
+    so the tree stops there and `assign_topics` segments larger numbers of
+    topics directly. Embeddings go through a `CachedEmbeddings` adapter, so
+    the repeated TreeSeg runs, and later re-segmentations, embed each text
+    once.
 
-@cached_file_object(EXTENSION_TOPICS)
-def segment_topics(video_path: str, entries: list, config: dict, max_segments: int) -> list:
+    Args:
+        entries (list): Transcript entries.
+        config (dict): Configuration dictionary for TreeSeg.
+        topic_config: TopicConfig instance. If None, uses defaults.
+        max_depth (int, optional): Largest number of topics to record splits for.
+                                   Defaults to `topic_config.topic_tree_depth`.
+
+    Returns:
+        dict: The number of entries, the depth up to which the splits are
+              valid and the boundary indices in split order.
+    """
+    if topic_config is None:
+        topic_config = TopicConfig()
+    if max_depth is None:
+        max_depth = topic_config.topic_tree_depth
+    config = _cached_embeddings_config(config, topic_config)
+    segmenter = TreeSeg(configs=config, entries=entries)
+    splits, boundaries = [], set()
+    for k in range(2, max_depth + 1):
+        transitions = segmenter.segment_meeting(k)
+        current = {i for i, transition in enumerate(transitions) if transition == 1}
+        if not boundaries <= current:
+            print(f"TreeSeg moved topic boundaries {sorted(boundaries - current)} when segmenting"
+                  f" into {k} topics; recording the topic tree up to {k - 1} topics")
+            max_depth = k - 1
+            break
+        new_splits = sorted(current - boundaries)
+        if not new_splits:
+            # No leaf can be split further
+            break
+        splits.extend(new_splits)
+        boundaries = current
+
+    embeddings_func = getattr(config.get("EMBEDDINGS"), "embeddings_func", None)
+    if isinstance(embeddings_func, CachedEmbeddings):
+        print(f"Embedded {embeddings_func.misses} texts in {embeddings_func.requests} requests"
+              f" ({embeddings_func.hits} served from cache)")
+    return {"size": len(entries), "max_depth": max_depth, "splits": splits}
+
+def _topic_tree_settings(config: dict, topic_config: TopicConfig) -> dict:
+    """Returns the TreeSeg settings the topic tree depends on, with the embeddings reduced to their model."""
+    settings = {key: value for key, value in config.items() if key != "EMBEDDINGS"}
+    embeddings = config.get("EMBEDDINGS")
+    settings["EMBEDDINGS"] = topic_config.local_embedding_model or getattr(embeddings, "model", None)
+    return settings
+
+@cached_file_object(EXTENSION_TOPIC_TREE, ignore=('entries', 'config', 'topic_config'))
+def segment_topic_tree(
+    video_path: str,
+    entries: list,
+    texts: List[str],
+    config: dict,
+    topic_config: TopicConfig,
+    settings: dict,
+    max_depth: int,
+) -> dict:
+    """
+    Builds the topic tree of the transcript, cached per entry texts and settings.
+
+    The entries themselves are not part of the key, so fields TreeSeg does
+    not read, such as speakers or assigned topics, keep the tree.
+
+    Args:
+        video_path (str): Path to the video file (used for caching).
+        entries (list): Transcript entries.
+        texts (List[str]): The `TEXT_KEY` text of each entry, which TreeSeg segments.
+        config (dict): Configuration dictionary for TreeSeg.
+        topic_config (TopicConfig): Topic configuration.
+        settings (dict): The parts of both configs the tree depends on, from `_topic_tree_settings`.
+        max_depth (int): Largest number of topics to record splits for.
+
+    Returns:
+        dict: Topic tree from `build_topic_tree`.
+    """
+    return build_topic_tree(entries, config, topic_config, max_depth)
+
+def topic_transitions_from_tree(topic_tree: dict, max_topics: int) -> List[int]:
+    """
+    Derives the topic transitions for `max_topics` from a stored topic tree.
+
+    Args:
+        topic_tree (dict): Topic tree from `build_topic_tree`.
+        max_topics (int): Maximum number of topics, at most the `max_depth` of the tree.
+
+    Returns:
+        List[int]: 1 where an entry starts a new topic, 0 otherwise.
+    """
+    transitions = [0] * topic_tree["size"]
+    for i in topic_tree["splits"][:max(max_topics - 1, 0)]:
+        transitions[i] = 1
+    return transitions
+
+@cached_file_object(EXTENSION_TOPICS, ignore=('config', 'topic_config'))
+def assign_topics(
+    video_path: str,
+    entries: list,
+    topic_tree: dict,
+    max_topics: int,
+    config: dict,
+    topic_config: TopicConfig,
+    settings: dict,
+) -> list:
+    """
+    Assigns topic numbers to the transcript entries, cached per tree and `max_topics`.
+
+    The topics come from the topic tree. If TreeSeg could not record the
+    tree up to `max_topics`, it segments the entries into `max_topics`
+    topics directly. Headlines and summaries are keyed on the result, so a
+    new assignment does not reuse the outputs of the previous one.
+
+    Args:
+        video_path (str): Path to the video file (used for caching).
+        entries (list): Transcript entries; they are copied, not modified.
+        topic_tree (dict): Topic tree from `segment_topic_tree`.
+        max_topics (int): Maximum number of topics.
+        config (dict): Configuration dictionary for TreeSeg.
+        topic_config (TopicConfig): Topic configuration.
+        settings (dict): The parts of both configs the segmentation depends on, from `_topic_tree_settings`.
+
+    Returns:
+        list: Copies of the entries with a `topic` field.
+    """
+    if max_topics <= topic_tree["max_depth"]:
+        transitions = topic_transitions_from_tree(topic_tree, max_topics)
+    else:
+        print(f"Topic tree only holds {topic_tree['max_depth']} topics; segmenting into {max_topics} topics")
+        segmenter = TreeSeg(configs=_cached_embeddings_config(config, topic_config), entries=entries)
+        transitions = segmenter.segment_meeting(max_topics)
+    return update_transcript_with_topics([dict(entry) for entry in entries], transitions)
+
+def segment_topics(
+    video_path: str,
+    entries: list,
+    config: dict,
+    max_segments: int,
+    topic_config: Optional[TopicConfig] = None,
+) -> list:
     """
     Process transcript entries, assign topic numbers, and generate/cache topic headlines.
     
     This function segments the transcript into topics using TreeSeg and assigns
-    topic numbers to each entry.
+    topic numbers to each entry. The TreeSeg split tree is computed once and
+    cached, so other values of `max_segments` are answered from the tree.
     
     Args:
         video_path (str): Path to the video file.
-        entries (list): List of transcript entries.
+        entries (Transcript | list): Transcript entries.
         config (dict): Configuration dictionary for TreeSeg.
         max_segments (int): Maximum number of segments for topic segmentation.
+        topic_config: TopicConfig instance. If None, uses defaults.
         
     Returns:
         list: Transcript entries with added 'topic' field.
     """
-    segmenter = TreeSeg(configs=config, entries=entries)
-    segments = segmenter.segment_meeting(max_segments)
-    updated_transcript_with_topics = update_transcript_with_topics(entries, segments)
-
-    return updated_transcript_with_topics
+    # TreeSeg works on dicts keyed by TEXT_KEY
+    entries = list(entries)
+    if topic_config is None:
+        topic_config = TopicConfig()
+    texts = [entry.get(config.get("TEXT_KEY", "transcript")) for entry in entries]
+    settings = _topic_tree_settings(config, topic_config)
+    topic_tree = segment_topic_tree(
+        video_path, entries, texts, config, topic_config, settings,
+        max(topic_config.topic_tree_depth, max_segments),
+    )
+    return assign_topics(video_path, entries, topic_tree, max_segments, config, topic_config, settings)
 
 def update_transcript_with_topics(transcript, topic_transitions):
     """
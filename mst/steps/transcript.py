@@ -0,0 +1,330 @@
+from array import array
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Sequence
+
+"""
+Columnar transcript representation shared by the post-processing steps.
+"""
+
+NO_TOPIC = -1
+
+_LABEL_FIELDS = ('speaker', 'speaker_name')
+_SCHEMA_FIELDS = frozenset(('start', 'end', 'transcript', 'duration', 'topic') + _LABEL_FIELDS)
+
+# Marks rows of an extra column whose record did not have the field
+_ABSENT = object()
+
+
+def _float_column(values: Iterable[float]) -> memoryview:
+    return memoryview(array('d', values))
+
+
+def _int_column(values: Iterable[int]) -> memoryview:
+    return memoryview(array('q', values))
+
+
+class _Interner:
+    """Interns string labels into a lookup table and a column of row ids."""
+
+    def __init__(self):
+        self.table = []
+        self.ids = array('q')
+        self._index = {}
+
+    def add(self, value: Optional[str]):
+        if value not in self._index:
+            self._index[value] = len(self.table)
+            self.table.append(value)
+        self.ids.append(self._index[value])
+
+
+class Transcript:
+    """
+    A transcript stored as parallel columns instead of a list of dicts.
+
+    Start, end and duration are float arrays, speaker and speaker name are
+    interned into small lookup tables with an integer id per row, topics are
+    an integer array (NO_TOPIC when unassigned) and the text of every row
+    lives in one shared buffer addressed by start/end offsets.
+
+    Columns are memoryviews, so slicing returns a view that shares storage
+    with its parent. Rows are only turned into dicts in the existing JSON
+    schema when iterated, indexed or passed through `to_records`.
+    Optional columns (duration, speaker, speaker_name, topic) are None when
+    the transcript does not carry that field. Fields outside the schema are
+    kept as plain lists in `extra`, so records round-trip unchanged.
+    """
+
+    def __init__(
+        self,
+        start: memoryview,
+        end: memoryview,
+        text: str,
+        text_start: memoryview,
+        text_end: memoryview,
+        duration: Optional[memoryview] = None,
+        speaker_table: Optional[List[str]] = None,
+        speaker_ids: Optional[memoryview] = None,
+        speaker_name_table: Optional[List[str]] = None,
+        speaker_name_ids: Optional[memoryview] = None,
+        topic: Optional[memoryview] = None,
+        extra: Optional[Dict[str, list]] = None,
+    ):
+        self.start = start
+        self.end = end
+        self.duration = duration
+        self.topic = topic
+        self._text = text
+        self._text_start = text_start
+        self._text_end = text_end
+        self._speaker_table = speaker_table
+        self.speaker_ids = speaker_ids
+        self._speaker_name_table = speaker_name_table
+        self.speaker_name_ids = speaker_name_ids
+        self.extra = extra or {}
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "Transcript":
+        """
+        Builds a columnar transcript from transcript dicts in a single pass.
+
+        The transcript schema fields (start, end, transcript, speaker,
+        duration, speaker_name, topic) become typed columns. An optional field
+        becomes a column when any record has it; rows without it get a default
+        (end - start for duration, None for labels and topic). Other fields
+        are kept in `extra` and only appear in the rows that had them. Records
+        may come from a generator, so a streamed transcript is never held as a
+        list of dicts.
+
+        Args:
+            records (Iterable[Dict[str, Any]]): Transcript entries.
+
+        Returns:
+            Transcript: The columnar transcript.
+        """
+        start = array('d')
+        end = array('d')
+        duration = None
+        labels: Dict[str, _Interner] = {}
+        topic = None
+        extra: Dict[str, list] = {}
+        text_parts = []
+        text_start = array('q')
+        text_end = array('q')
+        offset = 0
+
+        for row, record in enumerate(records):
+            # Columns appearing late are filled with defaults for the earlier rows
+            if duration is None and 'duration' in record:
+                duration = array('d', (e - s for s, e in zip(start, end)))
+            for field in _LABEL_FIELDS:
+                if field in record and field not in labels:
+                    labels[field] = _Interner()
+                    for _ in range(row):
+                        labels[field].add(None)
+            if topic is None and 'topic' in record:
+                topic = array('q', [NO_TOPIC]) * row
+            for field in record.keys() - _SCHEMA_FIELDS:
+                if field not in extra:
+                    extra[field] = [_ABSENT] * row
+
+            start.append(record['start'])
+            end.append(record['end'])
+            if duration is not None:
+                duration.append(record.get('duration', record['end'] - record['start']))
+            for field, interner in labels.items():
+                interner.add(record.get(field))
+            if topic is not None:
+                topic.append(NO_TOPIC if record.get('topic') is None else record['topic'])
+            for field, values in extra.items():
+                values.append(record.get(field, _ABSENT))
+            text_parts.append(record['transcript'])
+            text_start.append(offset)
+            offset += len(record['transcript'])
+            text_end.append(offset)
+
+        columns = {}
+        for field, interner in labels.items():
+            columns[field + '_table'] = interner.table
+            columns[field + '_ids'] = memoryview(interner.ids)
+        return cls(
+            start=memoryview(start),
+            end=memoryview(end),
+            text=''.join(text_parts),
+            text_start=memoryview(text_start),
+            text_end=memoryview(text_end),
+            duration=None if duration is None else memoryview(duration),
+            topic=None if topic is None else memoryview(topic),
+            extra=extra,
+            **columns,
+        )
+
+    @classmethod
+    def coerce(cls, transcript) -> "Transcript":
+        """
+        Returns `transcript` as a Transcript, converting a list of dicts if needed.
+
+        Args:
+            transcript (Transcript | list): A transcript in either form.
+
+        Returns:
+            Transcript: The columnar transcript.
+        """
+        if isinstance(transcript, cls):
+            return transcript
+        return cls.from_records(transcript or [])
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self.record(i) for i in range(len(self)))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._view(key)
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("transcript index out of range")
+        return self.record(key)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Transcript, list)):
+            return self.to_records() == list(other)
+        return NotImplemented
+
+    def _view(self, key: slice) -> "Transcript":
+        def cut(column):
+            return None if column is None else column[key]
+
+        return Transcript(
+            start=self.start[key],
+            end=self.end[key],
+            text=self._text,
+            text_start=self._text_start[key],
+            text_end=self._text_end[key],
+            duration=cut(self.duration),
+            speaker_table=self._speaker_table,
+            speaker_ids=cut(self.speaker_ids),
+            speaker_name_table=self._speaker_name_table,
+            speaker_name_ids=cut(self.speaker_name_ids),
+            topic=cut(self.topic),
+            extra={field: values[key] for field, values in self.extra.items()},
+        )
+
+    def text(self, i: int) -> str:
+        """Returns the transcript text of row `i`."""
+        return self._text[self._text_start[i]:self._text_end[i]]
+
+    def speaker(self, i: int) -> Optional[str]:
+        """Returns the speaker id of row `i`, or None without a speaker column."""
+        if self.speaker_ids is None:
+            return None
+        return self._speaker_table[self.speaker_ids[i]]
+
+    def speaker_name(self, i: int) -> Optional[str]:
+        """Returns the speaker name of row `i`, or None without a speaker_name column."""
+        if self.speaker_name_ids is None:
+            return None
+        return self._speaker_name_table[self.speaker_name_ids[i]]
+
+    def topic_at(self, i: int) -> Optional[int]:
+        """Returns the topic of row `i`, or None if unassigned."""
+        if self.topic is None or self.topic[i] == NO_TOPIC:
+            return None
+        return self.topic[i]
+
+    def record(self, i: int) -> Dict[str, Any]:
+        """
+        Materializes row `i` as a dict in the transcript JSON schema.
+
+        Args:
+            i (int): Row index.
+
+        Returns:
+            Dict[str, Any]: The transcript entry.
+        """
+        record = {
+            'start': self.start[i],
+            'end': self.end[i],
+            'transcript': self.text(i),
+        }
+        if self.speaker_ids is not None:
+            record['speaker'] = self.speaker(i)
+        if self.duration is not None:
+            record['duration'] = self.duration[i]
+        if self.speaker_name_ids is not None:
+            record['speaker_name'] = self.speaker_name(i)
+        if self.topic is not None:
+            record['topic'] = self.topic_at(i)
+        for field, values in self.extra.items():
+            if values[i] is not _ABSENT:
+                record[field] = values[i]
+        return record
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Converts the transcript to a list of dicts in the JSON schema."""
+        return list(self)
+
+    def take(self, rows: Sequence[int], **columns) -> "Transcript":
+        """
+        Gathers `rows` into a new transcript, optionally replacing columns.
+
+        The text buffer and label tables are shared with this transcript.
+
+        Args:
+            rows (Sequence[int]): Row indices to keep, in output order.
+            **columns: Replacement columns for the gathered rows, keyed by
+                       constructor argument name (e.g. end, duration,
+                       speaker_ids).
+
+        Returns:
+            Transcript: The gathered transcript.
+        """
+        def gather(column, make):
+            return None if column is None else make(column[i] for i in rows)
+
+        gathered = dict(
+            start=gather(self.start, _float_column),
+            end=gather(self.end, _float_column),
+            text=self._text,
+            text_start=gather(self._text_start, _int_column),
+            text_end=gather(self._text_end, _int_column),
+            duration=gather(self.duration, _float_column),
+            speaker_table=self._speaker_table,
+            speaker_ids=gather(self.speaker_ids, _int_column),
+            speaker_name_table=self._speaker_name_table,
+            speaker_name_ids=gather(self.speaker_name_ids, _int_column),
+            topic=gather(self.topic, _int_column),
+            extra={field: [values[i] for i in rows] for field, values in self.extra.items()},
+        )
+        gathered.update(columns)
+        return Transcript(**gathered)
+
+    def with_speaker_names(self, speaker_to_name: Dict[str, str]) -> "Transcript":
+        """
+        Returns a view of this transcript with a speaker_name column.
+
+        Names are resolved once per distinct speaker, falling back to the
+        speaker id, and the speaker id column is reused for the names.
+
+        Args:
+            speaker_to_name (Dict[str, str]): Mapping of speaker ids to names.
+
+        Returns:
+            Transcript: The transcript with speaker names.
+        """
+        return Transcript(
+            start=self.start,
+            end=self.end,
+            text=self._text,
+            text_start=self._text_start,
+            text_end=self._text_end,
+            duration=self.duration,
+            speaker_table=self._speaker_table,
+            speaker_ids=self.speaker_ids,
+            speaker_name_table=[speaker_to_name.get(s, s) for s in self._speaker_table],
+            speaker_name_ids=self.speaker_ids,
+            topic=self.topic,
+            extra=self.extra,
+        )
@@ -1,21 +1,23 @@
 import json
 import logging
 import traceback
-from typing import List, Dict, Any, Optional
-from faster_whisper import WhisperModel
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 
 
 from .caching import cached_file, cached_file_object
 from ..config import TranscriptionConfig
 
+if TYPE_CHECKING:
+    from faster_whisper import WhisperModel
+
 """
 Performs transcription of audio to raw text using Whisper model.
 """
 
-_whisper_models: Dict[str, WhisperModel] = {}
+_whisper_models: Dict[str, "WhisperModel"] = {}
 
 
-def get_whisper_model(model_name: str = "distil-large-v3") -> WhisperModel:
+def get_whisper_model(model_name: str = "distil-large-v3") -> "WhisperModel":
     """
     Gets or initializes the Whisper model for the given model name.
 
@@ -26,6 +28,9 @@ def get_whisper_model(model_name: str = "distil-large-v3") -> WhisperModel:
         WhisperModel: The initialized Whisper model instance.
     """
     if model_name not in _whisper_models:
+        # Imported on first use, so runs answered from the cache never load it
+        from faster_whisper import WhisperModel
+
         model = WhisperModel(model_name)
         model.logger.setLevel(logging.WARNING)
         _whisper_models[model_name] = model
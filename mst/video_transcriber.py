@@ -3,7 +3,9 @@ from typing import List, Dict, Any, Optional
 from .steps import *
 from .steps.topic_segmentation import EXTENSION_TOPICS
 from .steps.format import EXTENSION_MARKDOWN
-from .steps.caching import get_cache_file, load_object_file
+from .steps.caching import clear_memory_cache, configure_cache, flush_cache_writes, get_cache_backend
+from .steps.embeddings import configure_embedding_service
+from .steps.scheduler import PipelineScheduler
 from .config import TranscriberConfig
 
 
@@ -38,22 +40,56 @@ class VideoTranscriber:
         if config is None:
             config = TranscriberConfig.from_env()
         self.config = config
+        configure_embedding_service(config.embeddings)
+        configure_cache(config.cache)
+        self.scheduler = PipelineScheduler(config)
 
     def transcribe_video(self, video_path: str, transcribe: bool = True) -> tuple:
         """
         Processes a video file through the complete transcription pipeline.
 
+        See `transcribe_video_columnar` for the steps; this returns the final
+        transcript as a JSON-serializable list of dicts.
+
+        Args:
+            video_path (str): The file path to the video or audio file.
+            transcribe(bool): False to skip audio transcription, default True
+
+        Returns:
+            tuple: A tuple containing:
+                - transcript_final (list): The final processed transcript with speaker information.
+                - nouns_list (list): A list of extracted nouns and entities.
+        """
+        transcript_final, nouns_list = self.transcribe_video_columnar(video_path, transcribe)
+        return transcript_final.to_records(), nouns_list
+
+    def transcribe_video_columnar(self, video_path: str, transcribe: bool = True) -> tuple:
+        """
+        Processes a video file through the complete transcription pipeline,
+        returning the final transcript as a columnar `Transcript`.
+
         The pipeline includes:
         1. Initial transcription using a speech-to-text model.
         2. Merging transcript segments into sentences.
         3. Extracting nouns and important terms.
         4. Correcting the transcript using the extracted nouns.
         5. Identifying speakers (diarization).
-        6. Merging diarization information with the transcript.
-        7. Compressing the transcript by combining consecutive segments from the same speaker.
-        8. Finding speaker introductions in the raw transcript.
-        9. Creating a map of speaker IDs to actual names based on introductions.
-        10. Applying the speaker names to the final transcript.
+        6. Finding speaker introductions in the raw transcript.
+        7. Creating a map of speaker IDs to actual names based on introductions.
+        8. In a single streaming pass, merging diarization information with the
+           transcript, compressing consecutive segments from the same speaker and
+           applying the speaker names. The intermediate `.merged` and `.compressed`
+           artifacts are only cached when enabled in `TranscriberConfig.cache`.
+
+        The pipeline is planned backwards from the final transcript and the
+        entities. Cached artifacts still valid for the current configuration
+        are loaded instead of rerunning their steps, so a fully cached video
+        loads just those two artifacts and no model. The remaining steps run
+        as a DAG: each starts once its inputs are ready, so diarization runs
+        alongside transcription, within the limits of
+        `TranscriberConfig.scheduler`. With
+        `CacheConfig.write_behind`, the artifacts are stored in the background
+        while the pipeline continues, and all of them are stored on return.
 
         Args:
             video_path (str): The file path to the video or audio file.
@@ -61,48 +97,15 @@ class VideoTranscriber:
 
         Returns:
             tuple: A tuple containing:
-                - transcript_final (list): The final processed transcript with speaker information.
+                - transcript_final (Transcript): The final processed transcript with speaker information.
+                  Use `to_records()` for the list of dicts `transcribe_video` returns.
                 - nouns_list (list): A list of extracted nouns and entities.
         """
-        cfg = self.config
-
-        if transcribe:
-            print('Step 1: Initial transcription')
-            raw_transcript = initial_transcription(video_path, config=cfg.transcription)
-        else:
-            # assume transcription already completed
-            print('Skipping transcription step')
-            # Load the cached raw transcript
-            cache_file = get_cache_file(video_path, '.raw_transcript')
-            raw_transcript = load_object_file(cache_file)
-
-        print('Step 2: Merge Sentences')
-        merged_segments = merge_transcript_segments(video_path, raw_transcript, config=cfg.merge_sentences)
-
-        print('Step 3: Entity extraction')
-        nouns_list = extract_nouns(video_path, merged_segments, config=cfg.entities, llm_config=cfg.llm)
-
-        print('Step 4: Transcript correction')
-        corrected_transcript = correct_transcript(video_path, merged_segments, nouns_list, config=cfg.standardize)
-
-        print('Step 5: Diarization / Speaker identification')
-        speaker_mapping = identify_speakers(video_path, corrected_transcript, config=cfg.diarization)
-
-        print('Step 6: Merge transcript and diarization')
-        merged_transcript = merge_transcript_diarization(video_path, corrected_transcript, speaker_mapping)
-
-        print('Step 7: Compress merged transcript')
-        compressed_transcript = compress_transcript(video_path, merged_transcript)
-
-        print('Step 8: Filter transcript by speaker introductions')
-        # Use raw transcript as sentence merge can cause timing mismatch
-        speaker_introductions = find_introductions(video_path, raw_transcript, config=cfg.introductions)
-
-        print('Step 9: Extract persons from introductions')
-        speaker_map = create_speaker_map(video_path, speaker_introductions, speaker_mapping, config=cfg.introductions)
-
-        print('Step 10: Map speaker names')
-        transcript_final = map_speakers(video_path, compressed_transcript, speaker_map)
+        artifacts = self.scheduler.run(
+            video_path, ['.final', '.entities'], skip=() if transcribe else ['.raw_transcript']
+        )
+        transcript_final, nouns_list = artifacts['.final'], artifacts['.entities']
+        flush_cache_writes()
 
         return transcript_final, nouns_list
 
@@ -111,10 +114,12 @@ class VideoTranscriber:
         Segments the transcript into topics and generates headlines and summaries for them.
 
         If `topic_config` was not provided during initialization, this step is skipped.
+        The TreeSeg split tree is cached, so other values of `max_topics` are
+        answered without segmenting again.
 
         Args:
             video_path (str): The file path to the video or audio file, used for caching.
-            transcript (list): The transcript to be segmented (typically the output of `transcribe_video`).
+            transcript (Transcript | list): The transcript to be segmented (typically the output of `transcribe_video`).
             max_topics (int): The maximum number of topics to segment the transcript into.
 
         Returns:
@@ -127,14 +132,14 @@ class VideoTranscriber:
         if not self.topic_config:
             print('No topic segmentation configuration. Skipping topic segmentation')
             return transcript, [], []
-        processed_transcript = segment_topics(video_path, transcript, self.topic_config, max_topics)
-        # Generate and cache topic headlines
-        topic_headlines = prepare_and_generate_headlines(
-            video_path, processed_transcript, config=self.config.topic, llm_config=self.config.llm
+        processed_transcript = segment_topics(
+            video_path, transcript, self.topic_config, max_topics, topic_config=self.config.topic
         )
-        topic_summary = prepare_and_generate_summary(
+        # Generate and cache topic headlines and summaries concurrently
+        topic_headlines, topic_summary = prepare_and_generate_headlines_and_summary(
             video_path, processed_transcript, config=self.config.topic, llm_config=self.config.llm
         )
+        flush_cache_writes()
 
         return processed_transcript, topic_headlines, topic_summary
 
@@ -151,13 +156,14 @@ class VideoTranscriber:
 
         Args:
             video_path (str): The file path to the video or audio file, used for caching.
-            transcript (list): The final transcript data.
+            transcript (Transcript | list): The final transcript data.
             nouns_list (Dict[str, List[Dict[str, Any]]]): A dictionary of extracted nouns/entities.
             topic_headlines (list): A list of topic headlines.
             topic_summary (list): A list of topic summaries.
         """
         transcript_formatted = format_transcript(video_path, transcript)
         transcript_markdown = format_markdown(video_path, transcript, nouns_list, topic_headlines, topic_summary)
+        flush_cache_writes()
 
     def retrieve_json(self, video_path: str) -> str | None:
         """
@@ -171,8 +177,7 @@ class VideoTranscriber:
         Returns:
             str | None: The JSON string content of the cached topics file, or None if not found.
         """
-        path = get_cache_file(video_path, EXTENSION_TOPICS)
-        return load_text_file(path)
+        return get_cache_backend().load_text(video_path, EXTENSION_TOPICS)
 
     def retrieve_markdown(self, video_path: str) -> Any | None:
         """
@@ -185,10 +190,9 @@ class VideoTranscriber:
 
         Returns:
             Any | None: The content of the cached Markdown file (often a string),
-                        or None if not found. The return type depends on `load_object_file`.
+                        or None if not found.
         """
-        path = get_cache_file(video_path, EXTENSION_MARKDOWN)
-        return load_text_file(path)
+        return get_cache_backend().load_text(video_path, EXTENSION_MARKDOWN)
 
     def clear(self, video_path: str):
         """
@@ -197,4 +201,6 @@ class VideoTranscriber:
         Args:
             video_path (str): The file path to the video or audio file whose cache should be cleared.
         """
-        return clear_cache_directory(video_path)
+        flush_cache_writes()
+        clear_memory_cache(video_path)
+        return get_cache_backend().clear(video_path)